@@ -0,0 +1,221 @@
+# pylint: disable=all
+"""api_server.py – Local HTTP API: submit mark files as async jobs, poll status, stream results, fetch marksheets.
+
+Run:  python api_server.py [--host 127.0.0.1] [--port 8765] [--workers 4] [--db result_processor.db]
+
+    POST /jobs?tenant=<dept>&filename=<marks.csv>     body = raw CSV/XLSX bytes   → 202 {job_id, status_url}
+    GET  /jobs/<id>                                   → job status JSON
+    GET  /jobs/<id>/{results|errors|pending}?format=csv|json   (streamed)
+    GET  /jobs/<id>/marksheets/<student_id>.pdf
+    GET  /health
+    GET  /metrics                                     → Prometheus text format
+"""
+
+import argparse, io, json, os, queue, tempfile, threading, time, traceback, uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+import pandas as pd
+from config import (SQLITE_DB_FILE, API_HOST, API_PORT, API_WORKERS, API_QUEUE_SIZE, API_MAX_UPLOAD_MB,
+                    API_JOB_RETENTION, API_STREAM_CHUNK, API_TOKEN)
+from logic import LogicMixin
+from reports import ReportsMixin
+from tenancy import normalize_tenant, tenant_table, tenant_cache, tenant_slot
+from metrics import METRICS, stage
+from readers import read_table
+from sqlitestore import connect, write_frame
+
+
+class HeadlessProcessor(LogicMixin, ReportsMixin):
+    """The app's processing mixins without a Tk window – one instance per job."""
+
+    def __init__(self, df, tenant, db_file=SQLITE_DB_FILE):
+        self.df = df; self.tenant = tenant; self.db_file = db_file
+        self.valid_df = self.error_df = self.pending_df = self.results_df = None
+
+    def tenant_cache(self):
+        return tenant_cache(self.tenant)
+
+
+class Job:
+    def __init__(self, tenant, filename, payload):
+        self.id = uuid.uuid4().hex; self.tenant = tenant; self.filename = filename
+        self.payload = payload; self.status = 'queued'; self.error = None; self.proc = None; self.sizes = {}
+        self.created = time.time(); self.started = self.finished = None
+
+    def to_dict(self):
+        p = self.proc
+        counts = {n: (len(getattr(p, n)) if p is not None and getattr(p, n) is not None else self.sizes.get(n))
+                  for n in ('df', 'valid_df', 'error_df', 'pending_df', 'results_df')}
+        return {'job_id': self.id, 'tenant': self.tenant, 'filename': self.filename, 'status': self.status,
+                'error': self.error, 'created': self.created, 'started': self.started, 'finished': self.finished,
+                'rows': counts['df'], 'valid': counts['valid_df'], 'errors': counts['error_df'],
+                'pending': counts['pending_df'], 'results': counts['results_df']}
+
+
+class JobManager:
+    """Bounded job queue feeding a fixed worker pool. A full queue rejects new work instead of growing latency."""
+
+    def __init__(self, db_file=SQLITE_DB_FILE, workers=API_WORKERS, queue_size=API_QUEUE_SIZE):
+        self.db_file = db_file
+        self._q    = queue.Queue(maxsize=queue_size)
+        self._jobs = OrderedDict(); self._lock = threading.Lock()
+        self._workers = [threading.Thread(target=self._run, name=f"api-worker-{i}", daemon=True) for i in range(workers)]
+        for t in self._workers: t.start()
+
+    def submit(self, tenant, filename, payload):
+        job = Job(normalize_tenant(tenant), filename, payload)
+        self._q.put_nowait(job)   # raises queue.Full → 503
+        with self._lock:
+            self._jobs[job.id] = job
+            extra = len(self._jobs) - API_JOB_RETENTION   # oldest finished jobs go; queued/running ones are never dropped
+            for old in [k for k, j in self._jobs.items() if j.finished][:max(0, extra)]: del self._jobs[old]
+        return job
+
+    def get(self, job_id):
+        with self._lock: return self._jobs.get(job_id)
+
+    def queue_depth(self):
+        return self._q.qsize()
+
+    def _run(self):
+        while True:
+            job = self._q.get()
+            try:
+                with tenant_slot(job.tenant):
+                    job.status = 'running'; job.started = time.time()
+                    METRICS.count('api_jobs_started', tenant=job.tenant)
+                    with stage('api_job') as st:
+                        st['tenant'] = job.tenant; self.process(job)
+                        st['rows'] = job.sizes.get('df', 0)
+                    job.status = 'done'
+            except Exception as e:
+                traceback.print_exc(); job.status = 'failed'; job.error = str(e)
+                METRICS.error("API", f"job {job.id}", e)
+            finally:
+                job.payload = None; job.finished = time.time(); self._q.task_done()
+
+    def process(self, job):
+        with stage('ingestion', rows=None) as st:
+            proc = HeadlessProcessor(read_table(io.BytesIO(job.payload), job.filename), job.tenant, self.db_file); job.proc = proc
+            st['rows'] = len(proc.df); st['bytes'] = len(job.payload)
+        proc.perform_validation_fast()
+        try: proc.results_df = proc.compute_results()
+        except ValueError: proc.results_df = pd.DataFrame()
+        self.persist(proc)
+        job.sizes = {n: len(getattr(proc, n)) for n in ('df', 'valid_df') if getattr(proc, n) is not None}
+        proc.df = proc.valid_df = None   # persisted; only the frames the GET endpoints serve stay in memory
+
+    def persist(self, proc):
+        """Store the job's results in the tenant's tables of the local SQLite database."""
+        con = connect(self.db_file)
+        try:
+            for frame, base in [('results_df', 'results'), ('valid_df', 'validated_records')]:
+                df = getattr(proc, frame)
+                if df is not None and not df.empty: write_frame(df, tenant_table(proc.tenant, base), con=con)
+        finally: con.close()
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    manager = None   # set by create_server
+    server_version = "ResultProcessorAPI/1.0"
+
+    # ── Routing ───────────────────────────────────────────────────────────
+    def do_GET(self):
+        if not self._authorized(): return
+        url = urlparse(self.path); parts = [unquote(p) for p in url.path.strip('/').split('/') if p]
+        qs  = parse_qs(url.query)
+        if parts == ['health']:
+            return self._json(200, {'status': 'ok', 'queued': self.manager.queue_depth()})
+        if parts == ['metrics']:
+            body = METRICS.to_prometheus().encode()
+            self.send_response(200); self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body))); self.end_headers(); self.wfile.write(body); return
+        if len(parts) < 2 or parts[0] != 'jobs': return self._json(404, {'error': 'not found'})
+        job = self.manager.get(parts[1])
+        if job is None: return self._json(404, {'error': 'unknown job'})
+        if len(parts) == 2: return self._json(200, job.to_dict())
+        if job.status != 'done': return self._json(409, {'error': f"job is {job.status}", 'status': job.status})
+        frame = {'results': 'results_df', 'errors': 'error_df', 'pending': 'pending_df'}.get(parts[2])
+        if frame and len(parts) == 3:
+            return self._stream_frame(getattr(job.proc, frame), qs.get('format', ['json'])[0])
+        if parts[2] == 'marksheets' and len(parts) == 4 and parts[3].endswith('.pdf'):
+            return self._marksheet(job, parts[3][:-4])
+        self._json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if not self._authorized(): return
+        url = urlparse(self.path); qs = parse_qs(url.query)
+        if url.path.rstrip('/') != '/jobs': return self._json(404, {'error': 'not found'})
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0: return self._json(400, {'error': 'empty body'})
+        if length > API_MAX_UPLOAD_MB * 1024 * 1024: return self._json(413, {'error': 'file too large'})
+        payload  = self.rfile.read(length)
+        filename = qs.get('filename', [self.headers.get('X-Filename', 'upload.csv')])[0]
+        try: job = self.manager.submit(qs.get('tenant', ['default'])[0], filename, payload)
+        except queue.Full:
+            return self._json(503, {'error': 'job queue full, retry later'}, {'Retry-After': '5'})
+        self._json(202, {'job_id': job.id, 'status_url': f"/jobs/{job.id}"}, {'Location': f"/jobs/{job.id}"})
+
+    # ── Responses ─────────────────────────────────────────────────────────
+    def _authorized(self):
+        if not API_TOKEN or self.headers.get('Authorization') == f"Bearer {API_TOKEN}": return True
+        self._json(401, {'error': 'unauthorized'}); return False
+
+    def _json(self, code, obj, headers=None):
+        body = json.dumps(obj, default=str).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json'); self.send_header('Content-Length', str(len(body)))
+        for k, v in (headers or {}).items(): self.send_header(k, v)
+        self.end_headers(); self.wfile.write(body)
+
+    def _stream_frame(self, df, fmt):
+        """Write the frame in API_STREAM_CHUNK-row slices so large results never sit in memory as one string."""
+        df = df if df is not None else pd.DataFrame()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv' if fmt == 'csv' else 'application/json')
+        self.end_headers()   # HTTP/1.0: body ends when the connection closes
+        if fmt == 'csv':
+            for i in range(0, max(len(df), 1), API_STREAM_CHUNK):
+                self.wfile.write(df.iloc[i:i+API_STREAM_CHUNK].to_csv(index=False, header=(i == 0)).encode())
+            return
+        self.wfile.write(b'[')
+        for i in range(0, len(df), API_STREAM_CHUNK):
+            chunk = df.iloc[i:i+API_STREAM_CHUNK].to_json(orient='records')[1:-1]
+            if chunk: self.wfile.write((b',' if i else b'') + chunk.encode())
+        self.wfile.write(b']')
+
+    def _marksheet(self, job, student_id):
+        proc = job.proc
+        if proc.results_df is None or proc.results_df.empty: return self._json(404, {'error': 'no results'})
+        sid_col, sname_c, roll_c = proc.marksheet_columns()
+        match = proc.results_df[proc.results_df[sid_col].astype(str) == student_id] if sid_col else proc.results_df.iloc[:0]
+        if match.empty: return self._json(404, {'error': 'unknown student'})
+        fd, path = tempfile.mkstemp(suffix='.pdf'); os.close(fd)
+        try:
+            proc.write_marksheet_pdf(path, match.iloc[0], sid_col, sname_c, roll_c)
+            with open(path, 'rb') as f: body = f.read()
+        finally: os.remove(path)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/pdf'); self.send_header('Content-Length', str(len(body)))
+        self.end_headers(); self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        print(f"[API] {self.address_string()} {fmt % args}")
+
+
+def create_server(host=API_HOST, port=API_PORT, db_file=SQLITE_DB_FILE, workers=API_WORKERS):
+    """Build (not start) the HTTP server; port 0 picks a free port – handy for offline tests."""
+    handler = type('BoundApiHandler', (ApiHandler,), {'manager': JobManager(db_file, workers)})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Result Processor local HTTP API")
+    ap.add_argument('--host', default=API_HOST); ap.add_argument('--port', type=int, default=API_PORT)
+    ap.add_argument('--workers', type=int, default=API_WORKERS); ap.add_argument('--db', default=SQLITE_DB_FILE)
+    a = ap.parse_args()
+    srv = create_server(a.host, a.port, a.db, a.workers)
+    print(f"[API] listening on http://{a.host}:{srv.server_address[1]}  ({a.workers} workers)")
+    try: srv.serve_forever()
+    except KeyboardInterrupt: srv.server_close()
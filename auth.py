@@ -0,0 +1,198 @@
+# pylint: disable=all
+"""auth.py – User store and authentication: salted scrypt/PBKDF2 hashes, roles, lockout, cached sessions."""
+
+import base64, hashlib, hmac, os, sqlite3, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from config import (SQLITE_DB_FILE, DEFAULT_ADMIN, DEFAULT_TENANT, AUTH_ALGORITHM, AUTH_SCRYPT_PARAMS, AUTH_PBKDF2_ITERATIONS,
+                    AUTH_MAX_FAILED, AUTH_LOCKOUT_MINUTES, AUTH_SESSION_TTL)
+
+ROLES = ('admin', 'operator', 'viewer')
+EDIT_ROLES = ('admin', 'operator')            # may change, save and export data; viewers only look
+
+
+class AuthError(Exception):
+    pass
+
+
+def _b64(b):  return base64.b64encode(b).decode()
+def _unb64(s): return base64.b64decode(s.encode())
+
+
+def hash_password(password, algorithm=AUTH_ALGORITHM):
+    """Encode as 'scrypt$n$r$p$salt$hash' or 'pbkdf2_sha256$iterations$salt$hash'."""
+    salt = os.urandom(16)
+    if algorithm == 'scrypt' and hasattr(hashlib, 'scrypt'):
+        n, r, p = AUTH_SCRYPT_PARAMS
+        dk = hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256*n*r)
+        return f"scrypt${n}${r}${p}${_b64(salt)}${_b64(dk)}"
+    dk = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, AUTH_PBKDF2_ITERATIONS)
+    return f"pbkdf2_sha256${AUTH_PBKDF2_ITERATIONS}${_b64(salt)}${_b64(dk)}"
+
+
+def verify_password(password, stored):
+    """Constant-time check; also accepts legacy unsalted sha256 hex digests."""
+    parts = stored.split('$')
+    if parts[0] == 'scrypt':
+        n, r, p = map(int, parts[1:4])
+        dk = hashlib.scrypt(password.encode(), salt=_unb64(parts[4]), n=n, r=r, p=p, maxmem=256*n*r)
+        return hmac.compare_digest(dk, _unb64(parts[5]))
+    if parts[0] == 'pbkdf2_sha256':
+        dk = hashlib.pbkdf2_hmac('sha256', password.encode(), _unb64(parts[2]), int(parts[1]))
+        return hmac.compare_digest(dk, _unb64(parts[3]))
+    return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+
+
+def needs_rehash(stored):
+    parts = stored.split('$')
+    if AUTH_ALGORITHM == 'scrypt' and hasattr(hashlib, 'scrypt'):
+        return parts[0] != 'scrypt' or tuple(map(int, parts[1:4])) != tuple(AUTH_SCRYPT_PARAMS)
+    return parts[0] != 'pbkdf2_sha256' or int(parts[1]) != AUTH_PBKDF2_ITERATIONS
+
+
+class AuthService:
+    """SQLite-backed user store. Hash verification runs on a small worker pool (authenticate_async),
+    and successful verifications are cached for AUTH_SESSION_TTL so re-auth for privileged actions is cheap."""
+
+    def __init__(self, db_file=SQLITE_DB_FILE):
+        self.db_file  = db_file
+        self._pool    = ThreadPoolExecutor(max_workers=2, thread_name_prefix="auth")
+        self._key     = os.urandom(32)             # per-process key for session cache entries
+        self._cache   = {}                         # (username, hmac(password)) -> (user, expires)
+        self._lock    = threading.Lock()
+        self.ensure_schema()
+
+    def _con(self):
+        return sqlite3.connect(self.db_file)
+
+    def ensure_schema(self):
+        con = self._con(); cur = con.cursor()
+        have = {r[1] for r in cur.execute("PRAGMA table_info(users)")}
+        for col, ddl in [('failed_attempts', "INTEGER DEFAULT 0"), ('locked_until', "TEXT"),
+                         ('last_login', "TEXT"), ('is_active', "INTEGER DEFAULT 1"),
+                         ('tenant', f"TEXT DEFAULT '{DEFAULT_TENANT}'")]:
+            if col not in have: cur.execute(f"ALTER TABLE users ADD COLUMN {col} {ddl}")
+        if not cur.execute("SELECT COUNT(*) FROM users").fetchone()[0]:
+            cur.execute("INSERT INTO users(username,password_hash,role) VALUES(?,?,?)",
+                        (DEFAULT_ADMIN[0], hash_password(DEFAULT_ADMIN[1]), 'admin'))
+        con.commit(); con.close()
+
+    # ── Authentication ────────────────────────────────────────────────────
+    def authenticate(self, username, password):
+        """Return a user dict or raise AuthError. Blocks for one hash verification – prefer authenticate_async."""
+        cached = self._cached(username, password)
+        if cached: return cached
+        con = self._con(); cur = con.cursor()
+        row = cur.execute("SELECT user_id,username,role,password_hash,failed_attempts,locked_until,is_active,tenant"
+                          " FROM users WHERE username=?", (username,)).fetchone()
+        if not row:
+            con.close(); verify_password(password, self._dummy_hash())   # equalise timing for unknown users
+            raise AuthError("Invalid username or password")
+        uid, uname, role, stored, failed, locked_until, active, tenant = row
+        now = datetime.now()
+        if not active: con.close(); raise AuthError("Account disabled")
+        if locked_until and datetime.fromisoformat(locked_until) > now:
+            con.close(); raise AuthError(f"Account locked until {locked_until[:16].replace('T',' ')}")
+        if not verify_password(password, stored):
+            failed = (failed or 0) + 1
+            lock = (now + timedelta(minutes=AUTH_LOCKOUT_MINUTES)).isoformat() if failed >= AUTH_MAX_FAILED else None
+            cur.execute("UPDATE users SET failed_attempts=?, locked_until=? WHERE user_id=?",
+                        (0 if lock else failed, lock, uid))
+            con.commit(); con.close()
+            raise AuthError(f"Too many failed attempts – locked for {AUTH_LOCKOUT_MINUTES} min" if lock
+                            else "Invalid username or password")
+        if needs_rehash(stored):
+            cur.execute("UPDATE users SET password_hash=? WHERE user_id=?", (hash_password(password), uid))
+        cur.execute("UPDATE users SET failed_attempts=0, locked_until=NULL, last_login=? WHERE user_id=?",
+                    (now.isoformat(timespec='seconds'), uid))
+        con.commit(); con.close()
+        user = {'user_id': uid, 'username': uname, 'role': role, 'tenant': tenant or DEFAULT_TENANT, 'login_time': now}
+        with self._lock:
+            self._cache[self._cache_key(username, password)] = (user, time.monotonic() + AUTH_SESSION_TTL)
+        return user
+
+    def authenticate_async(self, username, password):
+        """Run authenticate() on the auth worker pool; returns a Future."""
+        return self._pool.submit(self.authenticate, username, password)
+
+    def reauthenticate(self, username, password):
+        """Confirm a logged-in user's password for a privileged action; cache hit skips the hash."""
+        return self.authenticate(username, password)
+
+    def _dummy_hash(self):
+        if not hasattr(self, '_dummy'): self._dummy = hash_password(os.urandom(8).hex())
+        return self._dummy
+
+    def require_role(self, user, *roles):
+        if not user or user.get('role') not in roles:
+            raise AuthError(f"Requires role: {' / '.join(roles)}")
+
+    def _cache_key(self, username, password):
+        return username, hmac.new(self._key, password.encode(), 'sha256').digest()
+
+    def _cached(self, username, password):
+        """Cached user for a recent verification, with its role re-read; a disabled or deleted user misses."""
+        key = self._cache_key(username, password)
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit and hit[1] <= time.monotonic(): self._cache.pop(key, None); hit = None
+        if not hit: return None
+        con = self._con(); row = con.execute("SELECT role, is_active FROM users WHERE username=?", (username,)).fetchone(); con.close()
+        if not row or not row[1]: self.invalidate(username); return None
+        return dict(hit[0], role=row[0])
+
+    def invalidate(self, username):
+        with self._lock:
+            for k in [k for k in self._cache if k[0] == username]: del self._cache[k]
+
+    # ── User management ───────────────────────────────────────────────────
+    def list_users(self):
+        con = self._con()
+        rows = con.execute("SELECT user_id,username,role,tenant,is_active,failed_attempts,locked_until,last_login,created_at"
+                           " FROM users ORDER BY username").fetchall()
+        con.close(); return rows
+
+    def create_user(self, username, password, role='operator', tenant=DEFAULT_TENANT):
+        if role not in ROLES: raise AuthError(f"Unknown role '{role}'")
+        if not username or not password: raise AuthError("Username and password required")
+        con = self._con()
+        try:
+            con.execute("INSERT INTO users(username,password_hash,role,tenant) VALUES(?,?,?,?)",
+                        (username, hash_password(password), role, tenant)); con.commit()
+        except sqlite3.IntegrityError: raise AuthError(f"User '{username}' already exists")
+        finally: con.close()
+
+    def set_password(self, username, password):
+        self._update(username, "password_hash=?, failed_attempts=0, locked_until=NULL", hash_password(password))
+
+    def set_role(self, username, role):
+        if role not in ROLES: raise AuthError(f"Unknown role '{role}'")
+        if role != 'admin': self._keep_admin(username, "demote")
+        self._update(username, "role=?", role)
+
+    def set_active(self, username, active):
+        if not active: self._keep_admin(username, "deactivate")
+        self._update(username, "is_active=?", 1 if active else 0)
+
+    def unlock(self, username):
+        self._update(username, "failed_attempts=0, locked_until=NULL")
+
+    def delete_user(self, username):
+        self._keep_admin(username, "delete")
+        con = self._con(); con.execute("DELETE FROM users WHERE username=?", (username,)); con.commit(); con.close()
+        self.invalidate(username)
+
+    def _keep_admin(self, username, action):
+        """Refuse to remove `username` from the admins if no other active admin would be left."""
+        con = self._con()
+        others = con.execute("SELECT COUNT(*) FROM users WHERE role='admin' AND is_active=1 AND username<>?", (username,)).fetchone()[0]
+        is_admin = con.execute("SELECT COUNT(*) FROM users WHERE role='admin' AND username=?", (username,)).fetchone()[0]
+        con.close()
+        if is_admin and not others: raise AuthError(f"Cannot {action} the last admin")
+
+    def _update(self, username, assignments, *params):
+        con = self._con()
+        n = con.execute(f"UPDATE users SET {assignments} WHERE username=?", (*params, username)).rowcount
+        con.commit(); con.close()
+        self.invalidate(username)
+        if not n: raise AuthError(f"No such user '{username}'")
@@ -0,0 +1,153 @@
+# pylint: disable=all
+"""bench.py – Pipeline benchmark: synthetic cohort generator + per-stage timing/peak memory, stored as JSON.
+
+    python bench.py                                   # default sizes, writes bench_results/<stamp>.json
+    python bench.py --sizes 1e3,1e5,5e6 --subjects 6 --error-rate .02 --missing-rate .05
+    python bench.py --compare bench_results/old.json  # exit 1 if any stage got >25% slower
+    python bench.py --mysql host=localhost,user=root,password=x,database=bench   # include the resumable MySQL save
+"""
+
+import argparse, gc, json, os, platform, subprocess, sys, tempfile, time, tracemalloc
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from config import BENCH_DIR, BENCH_SIZES, BENCH_MARKSHEET_SAMPLE, BENCH_REGRESSION_RATIO
+
+SUBJECT_POOL = ['Maths','Physics','Chemistry','English','Computer','Biology','History','Geography','Economics','Art']
+
+
+def generate_cohort(rows, subjects=5, error_rate=0.01, missing_rate=0.02, seed=42):
+    """Row-per-subject marks frame with ~`rows` rows, shaped like a real upload.
+
+    error_rate   – fraction of rows with a negative, over-max or non-numeric mark
+    missing_rate – fraction of (student, subject) rows dropped, leaving students pending
+    """
+    rng  = np.random.default_rng(seed)
+    subj = SUBJECT_POOL[:subjects]
+    n_students = max(1, int(round(rows / len(subj) / (1 - missing_rate))))
+    sid  = np.repeat(np.arange(1, n_students + 1), len(subj))
+    keep = rng.random(len(sid)) >= missing_rate
+    sid  = sid[keep]; n = len(sid)
+    marks = np.clip(rng.normal(62, 18, n).round(), 0, 100).astype(object)
+    bad = np.flatnonzero(rng.random(n) < error_rate)
+    kind = rng.integers(0, 3, len(bad))
+    marks[bad[kind == 0]] = -rng.integers(1, 20, (kind == 0).sum())
+    marks[bad[kind == 1]] = rng.integers(101, 150, (kind == 1).sum())
+    marks[bad[kind == 2]] = 'AB'
+    ids = pd.Series(sid).map('S{:07d}'.format)
+    return pd.DataFrame({
+        'student_id':     ids.to_numpy(),
+        'student_name':   ('Student ' + pd.Series(sid).astype(str)).to_numpy(),
+        'roll_no':        ('R' + pd.Series(sid).astype(str)).to_numpy(),
+        'subject':        np.tile(np.array(subj, dtype=object), n_students)[keep],
+        'marks_obtained': marks,
+        'max_marks':      100,
+    })
+
+
+def _measure(fn, memory=True):
+    gc.collect()
+    if memory: tracemalloc.start()
+    t = time.perf_counter()
+    try: fn()
+    finally:
+        dt = time.perf_counter() - t
+        peak = tracemalloc.get_traced_memory()[1] if memory else None
+        if memory: tracemalloc.stop()
+    return {'seconds': round(dt, 6), 'peak_mb': round(peak / 2**20, 2) if peak is not None else None}
+
+
+def run_size(rows, args):
+    from api_server import HeadlessProcessor
+    df = generate_cohort(rows, args.subjects, args.error_rate, args.missing_rate, args.seed)
+    proc = HeadlessProcessor(df, 'bench'); out = {'rows': len(df), 'stages': {}}
+    st = out['stages']
+
+    st['validation'] = _measure(lambda: proc.perform_validation_fast(detect_pending=False), args.memory)
+    st['pending_detection'] = _measure(proc.detect_pending_students, args.memory)
+    st['calculate_results'] = _measure(lambda: setattr(proc, 'results_df', proc.compute_results()), args.memory)
+    out.update(valid=len(proc.valid_df), errors=len(proc.error_df), students=len(proc.results_df))
+
+    if args.mysql:                                       # the app's save path, minus the Tk error dialogs
+        import mysql.connector
+        from bulksave import resumable_save, text_table
+        connect = lambda: mysql.connector.connect(**args.mysql)
+        with tempfile.TemporaryDirectory() as d:
+            ckpt = os.path.join(d, 'bench.db'); box = {'con': connect()}
+            def save():
+                box['con'] = resumable_save(connect, 'bench_validated_records', proc.valid_df.reset_index(drop=True),
+                                            *text_table(proc.valid_df), con=box['con'], db_file=ckpt)[0]
+            st['mysql_write'] = _measure(save, args.memory)
+            box['con'].close()
+
+    sample = proc.results_df.head(args.marksheets)
+    if len(sample):
+        sid_col, sname_c, roll_c = proc.marksheet_columns()
+        with tempfile.TemporaryDirectory() as d:
+            m = _measure(lambda: [proc.write_marksheet_pdf(os.path.join(d, f"{i}.pdf"), r, sid_col, sname_c, roll_c)
+                                  for i, (_, r) in enumerate(sample.iterrows())], args.memory)
+        m['pages'] = len(sample); m['per_page_ms'] = round(m['seconds'] / len(sample) * 1000, 3)
+        m['projected_seconds_all'] = round(m['seconds'] / len(sample) * len(proc.results_df), 2)
+        st['marksheets'] = m
+    return out
+
+
+def _version():
+    try: return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError: return None
+
+
+def compare(current, baseline_path, ratio=BENCH_REGRESSION_RATIO):
+    """Print per-stage speed ratios vs a previous run; return list of regressions."""
+    with open(baseline_path) as f: base = {r['rows_requested']: r for r in json.load(f)['runs']}
+    regressions = []
+    for run in current['runs']:
+        old = base.get(run['rows_requested'])
+        if not old: continue
+        for stage, m in run['stages'].items():
+            o = old['stages'].get(stage)
+            if not o or not o['seconds']: continue
+            r = m['seconds'] / o['seconds']
+            flag = '  ◀ REGRESSION' if r > ratio else ''
+            print(f"  {run['rows_requested']:>10,} {stage:<20} {o['seconds']:>9.3f}s → {m['seconds']:>9.3f}s  ×{r:.2f}{flag}")
+            if flag: regressions.append((run['rows_requested'], stage, r))
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--sizes', default=BENCH_SIZES, help="comma-separated row counts, e.g. 1e3,1e4,1e5")
+    ap.add_argument('--subjects', type=int, default=5)
+    ap.add_argument('--error-rate', type=float, default=0.01)
+    ap.add_argument('--missing-rate', type=float, default=0.02)
+    ap.add_argument('--seed', type=int, default=42)
+    ap.add_argument('--marksheets', type=int, default=BENCH_MARKSHEET_SAMPLE, help="marksheets rendered per size (0 = skip)")
+    ap.add_argument('--no-memory', dest='memory', action='store_false', help="skip tracemalloc (faster, no peak_mb)")
+    ap.add_argument('--mysql', type=lambda s: dict(kv.split('=', 1) for kv in s.split(',')), default=None)
+    ap.add_argument('--out', default=None); ap.add_argument('--compare', default=None)
+    args = ap.parse_args(argv)
+
+    result = {'version': _version(), 'timestamp': datetime.now().isoformat(timespec='seconds'),
+              'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+              'machine': platform.machine(), 'params': {k: v for k, v in vars(args).items() if k not in ('out', 'compare', 'mysql')},
+              'runs': []}
+    for size in [int(float(s)) for s in args.sizes.split(',')]:
+        print(f"[Bench] {size:,} rows …", flush=True)
+        run = run_size(size, args); run['rows_requested'] = size
+        for stage, m in run['stages'].items():
+            print(f"  {stage:<20} {m['seconds']:>9.3f}s  peak {m['peak_mb']} MB")
+        result['runs'].append(run)
+
+    out = args.out or os.path.join(BENCH_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'w') as f: json.dump(result, f, indent=2)
+    print(f"[Bench] saved {out}")
+    if args.compare:
+        regs = compare(result, args.compare)
+        if regs: print(f"[Bench] {len(regs)} regression(s)"); return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
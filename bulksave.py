@@ -0,0 +1,127 @@
+# pylint: disable=all
+"""bulksave.py – Resumable, chunked MySQL table saves: staging table, per-chunk retry, atomic swap.
+
+A save never touches the live table until the very end. Rows go into a staging table in chunks of
+MYSQL_SAVE_CHUNK, and each chunk is one executemany plus a commit. Row i of the frame is stored with id i+1,
+so MAX(id) of the staging table is the committed resume point. It is re-read before every chunk, which
+also covers a commit that went through just before the connection died.
+
+When a chunk fails, the save reconnects and retries with exponential backoff and jitter, up to
+MYSQL_SAVE_RETRIES times. Progress is checkpointed in the local SQLite bulk_saves table. The staging table
+is named after a digest of the frame, so saving the same frame again, even after a restart, continues
+where it stopped; a different frame drops the stale staging table and starts over. When every row is in,
+a single RENAME TABLE swaps staging and live atomically, and the old table is dropped.
+"""
+
+import hashlib, json, random, sqlite3, time
+from datetime import datetime
+import pandas as pd
+from config import SQLITE_DB_FILE, MYSQL_SAVE_CHUNK, MYSQL_SAVE_RETRIES, MYSQL_SAVE_BACKOFF, MYSQL_SAVE_BACKOFF_MAX
+from metrics import METRICS
+
+
+def ensure_table(cur):
+    cur.execute("CREATE TABLE IF NOT EXISTS bulk_saves (target TEXT PRIMARY KEY, job TEXT NOT NULL, staging TEXT NOT NULL,"
+                " total_rows INTEGER, done_rows INTEGER DEFAULT 0, started_at TEXT, updated_at TEXT)")
+
+
+def _local(db_file, sql, params=()):
+    con = sqlite3.connect(db_file)
+    try:
+        with con: ensure_table(con.cursor()); return con.execute(sql, params).fetchone()
+    finally: con.close()
+
+
+def checkpoint(target, db_file=SQLITE_DB_FILE):
+    """(job, staging, total_rows, done_rows) of an unfinished save into `target`, or None."""
+    return _local(db_file, "SELECT job, staging, total_rows, done_rows FROM bulk_saves WHERE target=?", (target,))
+
+
+def job_id(target, df, columns):
+    h = hashlib.sha256(json.dumps([target, [str(c) for c in columns]]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:12]
+
+
+def text_table(df):
+    """(columns, create, values) storing every column of `df` as TEXT under a MySQL-safe name, NA → NULL."""
+    names  = {c: ''.join(x if x.isalnum() or x == '_' else '_' for x in str(c).replace(' ', '_').replace('-', '_')) for c in df.columns}
+    cols   = ', '.join(f"`{v}` TEXT" for v in names.values())
+    create = lambda cur, name: cur.execute(f"CREATE TABLE IF NOT EXISTS `{name}` (id INT AUTO_INCREMENT PRIMARY KEY, {cols},"
+                                           " upload_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+    values = lambda part: zip(*[part[c].astype(str).where(part[c].notna(), None).tolist() for c in df.columns])
+    return list(names.values()), create, values
+
+
+def _exists(cur, name):
+    cur.execute("SELECT COUNT(*) FROM information_schema.tables WHERE table_schema=DATABASE() AND table_name=%s", (name,))
+    return cur.fetchone()[0] > 0
+
+
+def _connected(con):
+    try: return con is not None and con.is_connected()
+    except Exception: return False
+
+
+def resumable_save(connect, target, df, columns, create, values, *, con=None, retry_on=(Exception,), fatal=(),
+                   db_file=SQLITE_DB_FILE, chunk=MYSQL_SAVE_CHUNK, retries=MYSQL_SAVE_RETRIES, progress=None):
+    """Replace MySQL table `target` with the rows of `df` → (connection now in use, rows written, rows resumed).
+
+    connect()           a fresh connection (used after a drop; `con` is tried first)
+    columns             target column names the rows fill, after `id`
+    create(cur, name)   CREATE TABLE IF NOT EXISTS `name` with an `id` primary key plus `columns`
+    values(part)        iterable of value tuples (in `columns` order) for a slice of df
+    retry_on / fatal    exception types that are retried / re-raised at once (fatal wins)
+    progress(done, n)   after every committed chunk
+
+    When it gives up, the exception propagates; the staging table and checkpoint stay so the next call resumes."""
+    job  = job_id(target, df, columns); base = target[:40]
+    stg, old = f"{base}__stage_{job[:8]}", f"{base}__old_{job[:8]}"
+    prev = checkpoint(target, db_file); n = len(df); now = datetime.now().isoformat(timespec='seconds')
+    state = {'con': con, 'trips': 0}
+
+    def attempt(step):
+        for i in range(retries + 1):
+            try:
+                if not _connected(state['con']): state['con'] = connect()
+                return step(state['con'].cursor())
+            except retry_on as e:
+                if isinstance(e, fatal) or i == retries: raise
+                METRICS.count('db_retries', 1, table=target)
+                try: state['con'].close()
+                except Exception: pass
+                state['con'] = None
+                time.sleep(min(MYSQL_SAVE_BACKOFF_MAX, MYSQL_SAVE_BACKOFF * 2 ** i) * random.uniform(0.5, 1.0))
+
+    def prepare(cur):
+        if prev and prev[0] != job: cur.execute(f"DROP TABLE IF EXISTS `{prev[1]}`")
+        create(cur, stg); state['con'].commit(); state['trips'] += 1
+        cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM `{stg}`"); return int(cur.fetchone()[0])
+
+    def next_chunk(cur):
+        cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM `{stg}`"); done = int(cur.fetchone()[0])
+        part = df.iloc[done:done + chunk]
+        cur.executemany(f"INSERT INTO `{stg}` (id, {', '.join(f'`{c}`' for c in columns)}) VALUES(%s{', %s' * len(columns)})",
+                        [(done + i + 1, *row) for i, row in enumerate(values(part))])
+        state['con'].commit(); state['trips'] += 2
+        return done + len(part)
+
+    def swap(cur):
+        if _exists(cur, stg):
+            cur.execute(f"CREATE TABLE IF NOT EXISTS `{target}` LIKE `{stg}`")
+            cur.execute(f"DROP TABLE IF EXISTS `{old}`")
+            cur.execute(f"RENAME TABLE `{target}` TO `{old}`, `{stg}` TO `{target}`")
+        cur.execute(f"DROP TABLE IF EXISTS `{old}`"); state['con'].commit(); state['trips'] += 4
+
+    resumed = done = attempt(prepare)
+    if not prev or prev[0] != job:
+        _local(db_file, "INSERT OR REPLACE INTO bulk_saves VALUES(?,?,?,?,?,?,?)", (target, job, stg, n, done, now, now))
+    while done < n:
+        done = attempt(next_chunk)
+        _local(db_file, "UPDATE bulk_saves SET done_rows=?, updated_at=? WHERE target=?",
+               (done, datetime.now().isoformat(timespec='seconds'), target))
+        if progress: progress(done, n)
+    attempt(swap)
+    _local(db_file, "DELETE FROM bulk_saves WHERE target=?", (target,))
+    METRICS.count('db_round_trips', state['trips'], table=target)
+    return state['con'], n - resumed, resumed
@@ -0,0 +1,175 @@
+# pylint: disable=all
+"""catalogue.py – Programme subject catalogue and vectorised completeness checks.
+
+A programme lists its required subjects and its electives, and says how many electives a student must
+take. The catalogue comes from the department's subject_catalogue table, else SUBJECT_CATALOGUE_FILE:
+
+    {"default": {"required": ["Maths", "English"], "electives": ["Art", "Music"], "min_electives": 1},
+     "PCM":     ["Maths", "Physics", "Chemistry", "English"]}
+
+Each subject gets one bit. A programme becomes required/elective bitmasks, and each student's valid rows
+OR together into one "has" mask. Then a whole cohort is checked in one pass:
+- missing = required & ~has;
+- electives taken = popcount(has & electives).
+Students whose programme is missing or unknown use the "default" programme. If there is none, the
+default is inferred from the upload: subjects taken by at least CATALOGUE_INFER_SHARE of the students
+are required.
+"""
+
+import json, os, sqlite3
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from config import SQLITE_DB_FILE, DEFAULT_TENANT, SUBJECT_CATALOGUE_FILE, PROGRAMME_COLUMNS, CATALOGUE_INFER_SHARE
+
+Programme         = namedtuple('Programme', 'required electives min_electives')
+Completeness      = namedtuple('Completeness', 'catalogue keys programme complete missing short')
+DEFAULT_PROGRAMME = 'default'
+_POPCOUNT         = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _key(name):
+    return str(name).strip().casefold()
+
+
+def programme_column(columns):
+    return next((c for c in columns if str(c).strip().lower() in PROGRAMME_COLUMNS), None)
+
+
+def _parse(spec):
+    if isinstance(spec, (list, tuple)): return Programme(tuple(spec), (), 0)
+    return Programme(tuple(spec.get('required', ())), tuple(spec.get('electives', ())), int(spec.get('min_electives', 0)))
+
+
+def load_programmes(tenant=DEFAULT_TENANT, db_file=SQLITE_DB_FILE, path=SUBJECT_CATALOGUE_FILE):
+    """{programme: Programme} from the department's subject_catalogue rows, else the JSON file, else {}."""
+    try:
+        con = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)    # read-only: never creates the file
+        try: rows = con.execute("SELECT programme, subject, kind, min_electives FROM subject_catalogue WHERE tenant=?"
+                                " ORDER BY rowid", (tenant,)).fetchall()
+        finally: con.close()
+    except sqlite3.Error: rows = []    # no database or no table yet (databases from before the catalogue)
+    if rows:
+        progs = {}
+        for prog, subj, kind, n in rows:
+            req, el, k = progs.get(prog, ((), (), 0))
+            progs[prog] = (req, el + (subj,), max(k, n or 0)) if kind == 'elective' else (req + (subj,), el, max(k, n or 0))
+        return {p: Programme(*v) for p, v in progs.items()}
+    if path and os.path.exists(path):
+        with open(path, encoding='utf-8') as f: return {str(p): _parse(s) for p, s in json.load(f).items()}
+    return {}
+
+
+def _codes(s, table):
+    """Row codes of `s` through `table` (normalised name → code); -1 for missing or unknown values."""
+    raw, uniq = pd.factorize(s, use_na_sentinel=True)
+    m = np.array([table.get(_key(u), -1) for u in uniq], dtype=np.int64)
+    return np.where(raw < 0, -1, m[raw] if len(m) else raw)
+
+
+def popcount(a):
+    """Set bits per row of a (n, W) uint64 array."""
+    return _POPCOUNT[np.ascontiguousarray(a).view(np.uint8)].reshape(len(a), -1).sum(axis=1, dtype=np.int64)
+
+
+class SubjectCatalogue:
+    """Programmes compiled to bitmasks over one subject numbering."""
+
+    def __init__(self, programmes):
+        self.names, self.index = [], {}
+        for s in [s for p in programmes.values() for s in p.required + p.electives]:
+            if _key(s) not in self.index: self.index[_key(s)] = len(self.names); self.names.append(str(s).strip())
+        self.words = max(1, -(-len(self.names) // 64))
+        self.programmes, self.specs = list(programmes), list(programmes.values())
+        self.prog_index = {_key(p): i for i, p in enumerate(self.programmes)}
+        self.required = np.zeros((len(programmes), self.words), dtype=np.uint64)
+        self.elective = np.zeros((len(programmes), self.words), dtype=np.uint64)
+        self.min_electives = np.array([p.min_electives for p in programmes.values()], dtype=np.int64)
+        for i, p in enumerate(programmes.values()):
+            self.required[i] = self.mask(p.required); self.elective[i] = self.mask(p.electives)
+        self.default = self.prog_index.get(DEFAULT_PROGRAMME, 0)
+
+    def mask(self, subjects):
+        m = np.zeros(self.words, dtype=np.uint64)
+        for s in subjects:
+            j = self.index[_key(s)]; m[j // 64] |= np.uint64(1) << np.uint64(j % 64)
+        return m
+
+    def subject_codes(self, s):
+        return _codes(s, self.index)
+
+    def programme_codes(self, s):
+        c = _codes(s, self.prog_index); c[c < 0] = self.default
+        return c
+
+    def has_masks(self, students, subjects, n):
+        """(n, W) masks: bit j of row i set when student code i has a row with subject code j."""
+        ok = (students >= 0) & (subjects >= 0); st, sc = students[ok], subjects[ok].astype(np.uint64)
+        has = np.zeros((n, self.words), dtype=np.uint64)
+        np.bitwise_or.at(has, (st, (sc // np.uint64(64)).astype(np.int64)), np.uint64(1) << (sc % np.uint64(64)))
+        return has
+
+    def check(self, has, programme):
+        """→ (complete, missing required masks, electives still needed) for students on `programme` codes."""
+        missing = self.required[programme] & ~has
+        short   = np.maximum(self.min_electives[programme] - popcount(has & self.elective[programme]), 0)
+        return ~missing.any(axis=1) & (short == 0), missing, short
+
+    def missing_pairs(self, missing):
+        """(student code, subject code) pairs for every set bit of `missing`, grouped by student."""
+        rows, cols = [], []
+        for j in range(len(self.names)):
+            hit = np.flatnonzero((missing[:, j // 64] >> np.uint64(j % 64)) & np.uint64(1))
+            rows.append(hit); cols.append(np.full(len(hit), j, dtype=np.int64))
+        st = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        sj = np.concatenate(cols) if cols else np.empty(0, dtype=np.int64)
+        o  = np.argsort(st, kind='stable'); return st[o], sj[o]
+
+
+def infer_programme(frame, sid, subj):
+    """Programme implied by an upload: subjects taken by at least CATALOGUE_INFER_SHARE of students are required."""
+    pairs = frame[[sid, subj]].dropna().drop_duplicates()
+    if pairs.empty: return Programme((), (), 0)
+    share = pairs[subj].astype(str).str.strip().value_counts() / pairs[sid].nunique()
+    return Programme(tuple(share.index[share >= CATALOGUE_INFER_SHARE]), tuple(share.index[share < CATALOGUE_INFER_SHARE]), 0)
+
+
+def student_keys(*series):
+    """Student code per row for each series (IDs compared as trimmed text) and the key of every code."""
+    parts = [pd.factorize(s, use_na_sentinel=True) for s in series]
+    inv, keys = pd.factorize(np.array([str(u).strip() for _, uniq in parts for u in uniq], dtype=object))
+    out, at = [], 0
+    for raw, uniq in parts:
+        m = inv[at:at + len(uniq)]; at += len(uniq)
+        out.append(np.where(raw < 0, -1, m[raw] if len(m) else raw))
+    return out, np.asarray(keys, dtype=object)
+
+
+def key_codes(s, keys):
+    """Student codes of `s` against the keys returned by student_keys (-1 for students not among them)."""
+    lookup = {k: i for i, k in enumerate(keys)}
+    raw, uniq = pd.factorize(s, use_na_sentinel=True)
+    m = np.array([lookup.get(str(u).strip(), -1) for u in uniq], dtype=np.int64)
+    return np.where(raw < 0, -1, m[raw] if len(m) else raw)
+
+
+def assess(valid_df, all_df=None, tenant=DEFAULT_TENANT, programmes=None):
+    """Completeness of every student in valid_df (and all_df: students whose rows all failed validation count
+    as having nothing) → (Completeness, [student code per valid_df row, per all_df row])."""
+    frames = [f for f in (valid_df, all_df) if f is not None]
+    cols   = list(frames[0].columns)
+    sid    = next((c for c in cols if 'student' in c.lower() and 'id' in c.lower()), None)
+    subj   = next((c for c in cols if 'subject' in c.lower() and 'id' not in c.lower()), None)
+    if not sid or not subj: raise ValueError("Could not find student-ID and subject columns")
+    frames = [f for f in frames if sid in f.columns and subj in f.columns]
+    codes, keys = student_keys(*[f[sid] for f in frames])
+    progs = dict(load_programmes(tenant) if programmes is None else programmes)
+    if DEFAULT_PROGRAMME not in progs: progs[DEFAULT_PROGRAMME] = infer_programme(frames[-1], sid, subj)
+    cat  = SubjectCatalogue(progs)
+    prog = np.full(len(keys), cat.default, dtype=np.int64)
+    pcol = programme_column(cols)
+    for f, c in zip(frames[::-1], codes[::-1]):        # valid rows win over raw upload rows
+        if pcol in f.columns: prog[c[c >= 0]] = cat.programme_codes(f[pcol])[c >= 0]
+    has = cat.has_masks(codes[0], cat.subject_codes(frames[0][subj]), len(keys))
+    complete, missing, short = cat.check(has, prog)
+    return Completeness(cat, keys, prog, complete, missing, short), codes
@@ -0,0 +1,196 @@
+# pylint: disable=all
+"""checkpoint.py – Crash-safe session snapshots: periodic delta checkpoints of the working frames + audit replay."""
+
+import json, os, shutil, sqlite3, threading, traceback, weakref
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from tkinter import messagebox
+from config import (SQLITE_DB_FILE, ARROW_AVAILABLE, CHECKPOINT_DIR,
+                    CHECKPOINT_INTERVAL_MS, CHECKPOINT_MAX_SEGMENTS)
+from tenancy import normalize_tenant
+from metrics import METRICS, stage
+from logic import ERROR_COLUMNS
+from framestore import write_arrow
+
+CHECKPOINT_FRAMES = ('df', 'valid_df', 'error_df', 'pending_df', 'results_df')
+_MANIFEST = "session.json"
+_EXT      = ".arrow" if ARROW_AVAILABLE else ".pkl"
+
+
+def _row_keys(df):
+    """One uint64 per row: content hash salted with its occurrence number, so duplicate rows stay distinct."""
+    if df.empty: return np.empty(0, dtype='uint64')
+    h = pd.util.hash_pandas_object(df.astype(object).where(df.notna(), None).astype(str), index=False).to_numpy()
+    occ = pd.Series(h).groupby(h).cumcount().to_numpy().astype('uint64')
+    return h ^ (occ * np.uint64(0x9E3779B97F4A7C15))
+
+
+def _write_frame(df, path):
+    if not ARROW_AVAILABLE: df.reset_index(drop=True).to_pickle(path); return
+    write_arrow(df, path)
+
+
+def _read_frame(path):
+    return pd.read_feather(path) if path.endswith('.arrow') else pd.read_pickle(path)
+
+
+class CheckpointMixin:
+
+    # ── Periodic writer ───────────────────────────────────────────────────
+    def start_checkpointing(self):
+        """Schedule periodic checkpoints; the UI thread only grabs frame references, the worker writes."""
+        self.reset_checkpoint_state()
+        self._ckpt_lock = threading.Lock()
+        self.root.after(CHECKPOINT_INTERVAL_MS, self._checkpoint_tick)
+
+    def _checkpoint_tick(self):
+        try: self.checkpoint_now()
+        finally: self.root.after(CHECKPOINT_INTERVAL_MS, self._checkpoint_tick)
+
+    def checkpoint_now(self, wait=False):
+        frames = {n: getattr(self, n, None) for n in CHECKPOINT_FRAMES}
+        if all(f is None for f in frames.values()): return
+        clean = getattr(self, '_ckpt_clean', None)
+        if clean and all(clean[n]() is f for n, f in frames.items()): return   # nothing changed since the last save
+        if not self._ckpt_lock.acquire(blocking=wait): return   # previous write still running – skip this tick
+        t = threading.Thread(target=self._write_checkpoint, args=(frames, self.checkpoint_dir()), daemon=True); t.start()
+        if wait: t.join()
+
+    def checkpoint_dir(self):
+        return os.path.join(CHECKPOINT_DIR, normalize_tenant(getattr(self, 'tenant', None)))
+
+    def reset_checkpoint_state(self):
+        """Forget in-memory delta state (e.g. after switching department)."""
+        self._ckpt_keys = {}; self._ckpt_manifest = None; self._ckpt_clean = None
+
+    def clear_checkpoint(self):
+        """Delete the department's checkpoint once its session is saved, exported, declined or logged out of.
+        The frames as they are now count as clean: checkpointing resumes only when one of them is replaced."""
+        lock = getattr(self, '_ckpt_lock', None)
+        if lock: lock.acquire()                      # let a running write finish first
+        try:
+            shutil.rmtree(self.checkpoint_dir(), ignore_errors=True)
+            self.reset_checkpoint_state()
+            self._ckpt_clean = {n: (weakref.ref(f) if f is not None else (lambda: None))
+                                for n, f in ((n, getattr(self, n, None)) for n in CHECKPOINT_FRAMES)}
+        finally:
+            if lock: lock.release()
+
+    def _write_checkpoint(self, frames, cdir):
+        try:
+            with stage('checkpoint'): self._write_checkpoint_files(frames, cdir)
+        except Exception as e:
+            METRICS.error("Checkpoint", "write", e); traceback.print_exc()
+        finally:
+            self._ckpt_lock.release()
+
+    def _write_checkpoint_files(self, frames, cdir):
+        os.makedirs(cdir, exist_ok=True)
+        man = self._ckpt_manifest or self._load_manifest(cdir) or {'frames': {}}
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        for name, df in frames.items():
+            entry = man['frames'].get(name)
+            if df is None:
+                if entry: self._drop_files(entry, cdir); man['frames'].pop(name)
+                self._ckpt_keys.pop(name, None); continue
+            keys = _row_keys(df)
+            prev = self._ckpt_keys.get(name)
+            if (entry is not None and prev is not None and list(map(str, df.columns)) == entry['columns']
+                    and len(entry['segments']) < CHECKPOINT_MAX_SEGMENTS):
+                added   = ~np.isin(keys, prev)
+                removed = prev[~np.isin(prev, keys)]
+                if not added.any() and not len(removed): continue
+                if added.sum() + len(removed) < len(df) // 2:
+                    seg = f"{name}_{stamp}"
+                    _write_frame(df[added], os.path.join(cdir, seg + _EXT))
+                    np.save(os.path.join(cdir, seg + ".removed.npy"), removed)
+                    entry['segments'].append(seg); self._ckpt_keys[name] = keys
+                    continue
+            # Full base: first checkpoint, schema change, or deltas grew too big
+            base = f"{name}_{stamp}_base"
+            _write_frame(df, os.path.join(cdir, base + _EXT))
+            if entry: self._drop_files(entry, cdir)
+            man['frames'][name] = {'base': base, 'segments': [], 'columns': list(map(str, df.columns))}
+            self._ckpt_keys[name] = keys
+        man['saved_at'] = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        tmp = os.path.join(cdir, _MANIFEST + ".tmp")
+        with open(tmp, 'w') as f: json.dump(man, f)
+        os.replace(tmp, os.path.join(cdir, _MANIFEST))   # atomic: a crash mid-write keeps the old manifest
+        self._ckpt_manifest = man
+
+    def _drop_files(self, entry, cdir):
+        for seg in [entry['base']] + entry['segments']:
+            for suffix in (_EXT, ".removed.npy"):
+                try: os.remove(os.path.join(cdir, seg + suffix))
+                except OSError: pass
+
+    def _load_manifest(self, cdir=None):
+        try:
+            with open(os.path.join(cdir or self.checkpoint_dir(), _MANIFEST)) as f: return json.load(f)
+        except (OSError, ValueError): return None
+
+    # ── Recovery ──────────────────────────────────────────────────────────
+    def load_checkpoint(self):
+        """Rebuild frames from base + delta segments. Returns (frames, saved_at) or (None, None)."""
+        cdir = self.checkpoint_dir(); man = self._load_manifest(cdir)
+        if not man or not man.get('frames'): return None, None
+        frames = {}
+        for name, entry in man['frames'].items():
+            df = _read_frame(os.path.join(cdir, entry['base'] + _EXT))
+            for seg in entry['segments']:
+                removed = np.load(os.path.join(cdir, seg + ".removed.npy"))
+                if len(removed): df = df[~np.isin(_row_keys(df), removed)]
+                df = pd.concat([df, _read_frame(os.path.join(cdir, seg + _EXT))], ignore_index=True)
+            frames[name] = df.reset_index(drop=True)
+            self._ckpt_keys[name] = _row_keys(frames[name])
+        self._ckpt_manifest = man
+        return frames, man.get('saved_at')
+
+    def replay_fixed_errors(self, since):
+        """Re-apply audit rows logged after the checkpoint onto error_df; rows that now validate move to valid_df."""
+        if self.error_df is None or self.error_df.empty: return 0
+        if getattr(self, 'events', None): self.events.flush()
+        con = sqlite3.connect(SQLITE_DB_FILE)
+        fixes = con.execute("SELECT student_id,subject,field_name,new_value FROM fixed_errors"
+                            " WHERE tenant=? AND fixed_at >= ? ORDER BY fix_id",
+                            (normalize_tenant(self.tenant), since or '')).fetchall()
+        con.close()
+        if not fixes: return 0
+        cols   = list(self.error_df.columns)
+        sid_c  = next((c for c in cols if 'student' in c.lower() and 'id' in c.lower()), None)
+        subj_c = next((c for c in cols if 'subject' in c.lower() and 'id' not in c.lower()), None)
+        if not sid_c or not subj_c: return 0
+        touched = set(); applied = 0
+        for sid, subj, field, new in fixes:
+            if field not in cols: continue
+            m = (self.error_df[sid_c].astype(str) == sid) & (self.error_df[subj_c].astype(str) == subj)
+            if not m.any(): continue
+            self.error_df[field] = self.error_df[field].astype(object)
+            self.error_df.loc[m, field] = new; touched.update(self.error_df.index[m]); applied += 1
+        rec = [c for c in cols if c not in ERROR_COLUMNS]
+        ok  = [i for i in touched if self.validate_single_record([self.error_df.at[i, c] for c in rec], rec)]
+        if ok and self.valid_df is not None:
+            moved = self.error_df.loc[ok, [c for c in rec if c in self.valid_df.columns]]
+            self.valid_df = pd.concat([self.valid_df, moved], ignore_index=True)
+            self.error_df = self.error_df.drop(ok).reset_index(drop=True)
+        return applied
+
+    def offer_checkpoint_recovery(self):
+        try:
+            man = self._load_manifest()
+            if not man or not man.get('frames'): return
+            if not messagebox.askyesno("Recover Session",
+                    f"An unsaved session from {man.get('saved_at','?')} UTC was found.\nRestore it?"):
+                self.clear_checkpoint(); return
+            frames, saved_at = self.load_checkpoint()
+            for name, df in frames.items(): setattr(self, name, df)
+            replayed = self.replay_fixed_errors(saved_at)
+            for page, frame in [('upload','df'),('validate','df'),('results','valid_df'),('fix_errors','error_df'),
+                                ('pending','results_df'),('reports','results_df')]:
+                if getattr(self, frame) is not None: self.unlock_page(page)
+            messagebox.showinfo("Recovered", f"✓ Session restored ({replayed} logged fixes replayed).\n"
+                                f"Valid: {len(self.valid_df) if self.valid_df is not None else 0}  "
+                                f"Errors: {len(self.error_df) if self.error_df is not None else 0}")
+        except Exception as e:
+            traceback.print_exc(); messagebox.showerror("Recovery Failed", str(e))
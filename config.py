@@ -34,11 +34,149 @@ try:
 except ImportError:
     MYSQL_AVAILABLE = False
 
+# ── Arrow availability (optional: fast columnar checkpoints) ──────────────
+try:
+    import pyarrow as _pa
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+# ── Calamine availability (optional: fast xlsx reader, pandas ≥ 2.2) ─────
+try:
+    import python_calamine as _cal
+    import pandas as _pd
+    CALAMINE_AVAILABLE = tuple(int(x) for x in _pd.__version__.split('.')[:2]) >= (2, 2)
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
 # ── App constants ─────────────────────────────────────────────────────────
 APP_TITLE, APP_GEOMETRY, APP_MIN_SIZE = "Result Processing System", "1400x900", (1200, 700)
 SQLITE_DB_FILE   = "result_processor.db"
 DEFAULT_ADMIN    = ("admin", "admin123")
-EXPECTED_SUBJECTS = 5
+
+# ── Departments (tenants) ─────────────────────────────────────────────────
+DEFAULT_TENANT     = "default"        # keeps the original unprefixed table names
+TENANT_MAX_WORKERS = 2                # concurrent heavy jobs per department
+TENANT_CACHE_SIZE  = 256
+
+# ── Authentication ────────────────────────────────────────────────────────
+AUTH_ALGORITHM         = "scrypt"          # or "pbkdf2_sha256" (used automatically if scrypt is unavailable)
+AUTH_SCRYPT_PARAMS     = (2**14, 8, 1)     # n, r, p
+AUTH_PBKDF2_ITERATIONS = 600_000
+AUTH_MAX_FAILED        = 5
+AUTH_LOCKOUT_MINUTES   = 15
+AUTH_SESSION_TTL       = 15 * 60           # seconds a verified password stays cached
+
+# ── Session checkpoints ───────────────────────────────────────────────────
+CHECKPOINT_DIR          = "checkpoints"
+CHECKPOINT_INTERVAL_MS  = 30_000
+CHECKPOINT_MAX_SEGMENTS = 20      # compact base + deltas after this many segments
+
+# ── Background event logging ─────────────────────────────────────────────
+EVENTLOG_QUEUE_SIZE  = 10_000
+EVENTLOG_BATCH_SIZE  = 500
+EVENTLOG_PUT_TIMEOUT = 0.5        # seconds before a producer warns and blocks (backpressure)
+EVENTLOG_BULK_CHUNK  = 5_000      # rows per executemany – keeps MySQL packets under max_allowed_packet
+
+# ── Validation error taxonomy ─────────────────────────────────────────────
+# Validation sets one bit per problem in error_df['ErrorCode']. Order = priority for error_logs.error_type.
+# The pattern re-derives codes from the 'Errors' text of frames saved before codes existed.
+ERROR_CODES = {
+    'CONFLICTING_MARKS': (128, 'Conflicting Marks', r'conflicting marks'),
+    'NEGATIVE_MARKS':    (1,   'Negative Marks',    r'negative'),
+    'EXCEEDS_MAX':       (2,   'Marks Exceed Max',  r'exceeds max'),
+    'NON_NUMERIC':       (4,   'Non-numeric',       r'non-numeric'),
+    'MISSING_MARKS':     (8,   'Missing Data',      r'missing (?!student id|student name|roll no)'),
+    'MISSING_ID':        (16,  'Missing Data',      r'missing student id'),
+    'MISSING_NAME':      (32,  'Missing Data',      r'missing student name'),
+    'MISSING_ROLL':      (64,  'Missing Data',      r'missing roll no'),
+    'DUPLICATE_ENTRY':   (256, 'Duplicate Entry',   r'duplicate entry'),
+}
+
+# ── Local HTTP API (api_server.py) ────────────────────────────────────────
+API_HOST, API_PORT  = "127.0.0.1", 8765
+API_WORKERS         = 4
+API_QUEUE_SIZE      = 32          # jobs waiting beyond this get 503 + Retry-After
+API_MAX_UPLOAD_MB   = 512
+API_JOB_RETENTION   = 200         # finished jobs kept in memory
+API_STREAM_CHUNK    = 50_000      # rows per streamed CSV/JSON slice
+API_TOKEN           = None        # set to require "Authorization: Bearer <token>"
+
+# ── Benchmarks (bench.py) ─────────────────────────────────────────────────
+BENCH_DIR              = "bench_results"
+BENCH_SIZES            = "1e3,1e4,1e5,1e6"   # up to 5e6 via --sizes
+BENCH_MARKSHEET_SAMPLE = 50                  # marksheets rendered per size; total is extrapolated
+BENCH_REGRESSION_RATIO = 1.25
+
+# ── Metrics / diagnostics (metrics.py) ────────────────────────────────────
+METRICS_DIR            = "metrics"        # metrics.json, metrics.prom, profiles/*.prof
+METRICS_FLUSH_INTERVAL = 5                # seconds between automatic file snapshots
+METRICS_RECENT         = 200              # stage runs / errors kept for the diagnostics page
+METRICS_PROFILE_STAGES = ()               # stage names to cProfile, or ('*',) for all
+METRICS_HTTP_PORT      = None             # e.g. 9108 to expose /metrics for Prometheus
+
+# ── Multi-file ingestion (ingest.py) ──────────────────────────────────────
+INGEST_EXTENSIONS    = ('.csv', '.xlsx', '.xls')
+INGEST_WORKERS       = None            # parser processes; None → os.cpu_count()
+INGEST_SOURCE_COLUMN = "source_file"   # provenance column added to merged frames
+
+# ── Watch-folder daemon (watcher.py) ──────────────────────────────────────
+WATCH_POLL_SECONDS     = 5       # idle loop sleeps this long between directory scans
+WATCH_DEBOUNCE_SECONDS = 3       # a file must keep the same size/mtime this long before it is read
+WATCH_NICE             = 10      # POSIX niceness for the daemon process
+
+# ── Reader engines (readers.py) ───────────────────────────────────────────
+READER_CSV_ENGINE   = "auto"      # 'pyarrow' (multi-threaded) | 'pandas' | 'auto' → pyarrow when installed
+READER_XLSX_ENGINE  = "auto"      # 'calamine' | 'openpyxl' | 'auto' → calamine when installed
+READER_ARROW_DTYPES = True        # keep Arrow-backed columns from the pyarrow reader (no conversion copy)
+READER_BLOCK_SIZE   = 16 << 20    # bytes per CSV block; blocks are parsed in parallel
+
+# ── Shared frames for worker processes (framestore.py) ────────────────────
+SHARED_FRAME_DIR       = None     # None → /dev/shm when present, else the temp dir
+MARKSHEET_PROCESSES    = None     # marksheet worker processes; None → os.cpu_count()
+MARKSHEET_PARALLEL_MIN = 200      # fewer marksheets than this render in-process
+MARKSHEET_RENDERER     = "template"  # 'template' (cached page layout, values stamped) | 'platypus' (full layout)
+EXPORT_MANIFEST        = ".manifest.json"   # per-folder digests: re-exports rebuild only changed files
+
+# ── Export-all scheduler (scheduler.py) ───────────────────────────────────
+EXPORT_THREADS          = 4        # threads for I/O-bound reports (history, summary, the marksheet driver)
+EXPORT_PROCESSES        = None     # worker processes for large workbooks; None → os.cpu_count()
+EXPORT_PROCESS_MIN_ROWS = 20_000   # smaller frames are written on a thread: a process would cost more to start
+
+# ── Rankings and merit lists (ranking.py) ─────────────────────────────────
+RANK_POLICY           = "competition"   # 'competition' (1,2,2,4) | 'dense' (1,2,2,3) | 'subject_priority'
+RANK_SUBJECT_PRIORITY = ()              # tie-break subject order for 'subject_priority'; () → column order
+RANK_MERIT_TOP        = 10              # students per section (or class) on the merit list
+RANK_SECTION_COLUMNS  = ('section', 'class_section', 'division')   # carried into results, ranked within
+
+# ── SQLite result storage (sqlitestore.py) ────────────────────────────────
+SQLITE_WRITE_CHUNK = 50_000   # rows converted and passed to one executemany call
+SQLITE_READ_CHUNK  = 50_000   # rows per fetchmany when streaming a stored frame back
+
+# ── Resumable MySQL saves (bulksave.py) ───────────────────────────────────
+MYSQL_SAVE_CHUNK       = 5_000   # rows per executemany + commit into the staging table
+MYSQL_SAVE_RETRIES     = 6       # reconnect-and-retry attempts per chunk before the save gives up (resumable later)
+MYSQL_SAVE_BACKOFF     = 0.5     # seconds before the first retry, doubled each time, with jitter
+MYSQL_SAVE_BACKOFF_MAX = 30.0
+
+# ── Fixed-errors history (history.py) ─────────────────────────────────────
+HISTORY_PAGE_SIZE    = 200     # audit rows per page in the history viewer
+HISTORY_EXPORT_CHUNK = 5_000   # rows per fetchmany when streaming the history to Excel
+
+# ── Undo / redo of corrections (corrections.py) ───────────────────────────
+UNDO_HISTORY_LIMIT = 500   # corrections kept undoable per session (a bulk fix counts as one)
+
+# ── Grid search (searchindex.py) ──────────────────────────────────────────
+SEARCH_DEBOUNCE_MS = 120   # quiet time after the last keystroke before the grids are re-filtered
+
+# ── Subject catalogue (catalogue.py) ──────────────────────────────────────
+SUBJECT_CATALOGUE_FILE = "subject_catalogue.json"    # used when the department has no subject_catalogue rows
+PROGRAMME_COLUMNS      = ('programme', 'program', 'course', 'stream')
+CATALOGUE_INFER_SHARE  = 0.5    # no 'default' programme: subjects taken by at least this share of students are required
+
+# ── Static result-lookup site (resultsite.py) ─────────────────────────────
+RESULT_SITE_SHARD_SIZE = 256                  # target students per JSON shard (shard count is a power of two)
+RESULT_SITE_TITLE      = "Examination Results"
 
 COLORS = {
     'sidebar': '#2C3E50', 'sidebar_active': '#34495E', 'sidebar_hover': '#3D566E',
@@ -55,4 +193,19 @@ PAGES_CONFIG = [
     {'id': 'results',    'icon': '📊', 'title': 'Calculate Results', 'locked': True},
     {'id': 'pending',    'icon': '⏳', 'title': 'Pending Students',  'locked': True},
     {'id': 'reports',    'icon': '📄', 'title': 'Generate Reports',  'locked': True},
+    {'id': 'history',    'icon': '📜', 'title': 'Fixes History',     'locked': True},
+    {'id': 'users',      'icon': '👥', 'title': 'Manage Users',      'locked': True},
+    {'id': 'diagnostics','icon': '🩺', 'title': 'Diagnostics',       'locked': True},
 ]
+
+# Pages kept alive between visits → the data frames they render. A page is only rebuilt (or partially
+# refreshed) when one of these frames has been replaced since it was drawn. Pages not listed always rebuild.
+PAGE_CACHE_DEPENDENCIES = {
+    'database':   (),
+    'upload':     ('df',),
+    'validate':   ('df', 'valid_df', 'error_df'),
+    'fix_errors': ('error_df',),
+    'results':    ('valid_df', 'results_df'),
+    'pending':    ('pending_df',),
+    'reports':    ('results_df',),
+}
@@ -0,0 +1,147 @@
+# pylint: disable=all
+"""corrections.py – Undo/redo for error corrections, kept as a log of deltas rather than frame snapshots.
+
+A Correction holds only what it touched:
+- the error_df rows it removed, with their positions;
+- the rows it appended to valid_df;
+- the changed cells it wrote to the fixed_errors audit trail under its id.
+Undoing or redoing any run of corrections, up to the whole session, rebuilds each frame once. The run's
+row moves are combined on an integer row-order array, and the valid_df appends are trimmed off the end.
+"""
+
+import uuid, weakref
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from tkinter import messagebox
+from config import UNDO_HISTORY_LIMIT
+
+# positions: ascending error_df positions of the removed rows, in the frame the correction was applied to
+# removed:   those rows as an error_df slice (None if none) · added: rows appended to valid_df (None if none)
+# cells:     [(student_id, student_name, subject, field, old, new, error_message)] as logged to fixed_errors
+Correction = namedtuple('Correction', 'id label positions removed added cells')
+
+
+def _ref(df):
+    return weakref.ref(df) if df is not None else (lambda: None)
+
+
+def _insert_rows(order, positions, codes):
+    """Row order with `codes` put back at `positions` of the longer frame – the inverse of np.delete."""
+    out  = np.empty(len(order) + len(positions), dtype=np.int64)
+    mask = np.zeros(len(out), dtype=bool); mask[positions] = True
+    out[~mask] = order; out[mask] = codes
+    return out
+
+
+class CorrectionsMixin:
+
+    # ── Log state ─────────────────────────────────────────────────────────
+    def reset_corrections(self):
+        self._undo_log, self._redo_log, self._corr_frames = [], [], None
+
+    def _corrections_current(self):
+        """The log only describes the frames it produced; a re-upload, revalidation or session recovery
+        replaces error_df / valid_df and with that clears it."""
+        st = self._corr_frames
+        if st is not None and (st[0]() is not self.error_df or st[1]() is not self.valid_df): self.reset_corrections()
+
+    def can_undo(self):
+        self._corrections_current(); return bool(self._undo_log)
+
+    def can_redo(self):
+        self._corrections_current(); return bool(self._redo_log)
+
+    # ── Apply / revert ────────────────────────────────────────────────────
+    def apply_correction(self, label, positions=(), added=None, cells=()):
+        """Remove the error_df rows at `positions`, append `added` to valid_df and audit `cells` → Correction."""
+        self._corrections_current()
+        positions = np.unique(np.asarray(positions, dtype=np.int64))
+        c = Correction(uuid.uuid4().hex[:12], label, positions,
+                       self.error_df.iloc[positions] if len(positions) else None,
+                       added if added is not None and len(added) else None, list(cells))
+        self._move([c], forward=True); self._audit(c, 'apply')
+        self._undo_log.append(c); del self._undo_log[:-UNDO_HISTORY_LIMIT]; self._redo_log.clear()
+        return c
+
+    def undo_correction(self, everything=False):
+        """Revert the latest correction (or the whole session) → the corrections reverted, newest first."""
+        self._corrections_current()
+        batch = self._undo_log[::-1] if everything else self._undo_log[-1:]
+        if not batch: return []
+        del self._undo_log[len(self._undo_log) - len(batch):]
+        self._move(batch, forward=False); self._redo_log.extend(batch)
+        for c in batch: self._audit(c, 'undo')
+        return batch
+
+    def redo_correction(self, everything=False):
+        """Re-apply the last undone correction (or all of them) → the corrections re-applied, oldest first."""
+        self._corrections_current()
+        batch = self._redo_log[::-1] if everything else self._redo_log[-1:]
+        if not batch: return []
+        del self._redo_log[len(self._redo_log) - len(batch):]
+        self._move(batch, forward=True); self._undo_log.extend(batch)
+        for c in batch: self._audit(c, 'redo')
+        return batch
+
+    def _move(self, batch, forward):
+        """forward: `batch` oldest first, drop removed rows / append added ones. Backward: newest first, the inverse."""
+        err, val = self.error_df, self.valid_df
+        n_err = 0 if err is None else len(err)
+        order = np.arange(n_err); n_add = sum(len(c.added) for c in batch if c.added is not None)
+        if forward:
+            for c in batch:
+                if c.removed is not None: order = np.delete(order, c.positions)
+            if len(order) != n_err:
+                self.error_df = err.iloc[order].reset_index(drop=True)
+                self.remap_search_index('error_df', err, self.error_df, order)
+            if n_add:
+                added = pd.concat([c.added for c in batch if c.added is not None], ignore_index=True)
+                self.valid_df = pd.concat([val, added], ignore_index=True)
+                self.remap_search_index('valid_df', val, self.valid_df, np.arange(len(self.valid_df)), added)
+        else:
+            removed = []
+            for c in batch:
+                if c.removed is None: continue
+                order = _insert_rows(order, c.positions, np.arange(len(order), len(order) + len(c.positions)))
+                removed.append(c.removed)
+            if len(order) != n_err:
+                removed = pd.concat(removed, ignore_index=True)
+                self.error_df = pd.concat([err, removed] if err is not None else [removed], ignore_index=True).iloc[order].reset_index(drop=True)
+                self.remap_search_index('error_df', err, self.error_df, order, removed)
+            if n_add:
+                self.valid_df = val.iloc[:len(val) - n_add].reset_index(drop=True)
+                self.remap_search_index('valid_df', val, self.valid_df, np.arange(len(self.valid_df)))
+        self._corr_frames = (_ref(self.error_df), _ref(self.valid_df))
+
+    def _audit(self, c, action):
+        """Each changed cell goes to fixed_errors under the correction's id; an undo logs old and new swapped."""
+        for sid, sname, subj, field, old, new, msg in c.cells:
+            if action == 'undo': old, new = new, old
+            self.log_fixed_error(sid, sname, subj, field, old, new,
+                                 msg if action == 'apply' else f"{action} of correction {c.id}: {msg}", correction_id=c.id)
+
+    # ── GUI actions ───────────────────────────────────────────────────────
+    def undo_last_fix(self, everything=False):
+        if not self.may_edit(): return
+        n = len(self._undo_log) if self.can_undo() else 0
+        if not n: messagebox.showinfo("Undo","Nothing to undo"); return
+        if everything and not messagebox.askyesno("Undo All",f"Revert all {n} correction(s) made this session?"): return
+        done = self.undo_correction(everything)
+        self._after_correction_change(f"↶ Reverted: {done[0].label}" if len(done) == 1 else f"↶ Reverted {len(done)} corrections")
+
+    def redo_last_fix(self):
+        if not self.may_edit(): return
+        done = self.redo_correction()
+        if not done: messagebox.showinfo("Redo","Nothing to redo"); return
+        self._after_correction_change(f"↷ Re-applied: {done[0].label}")
+
+    def _after_correction_change(self, msg):
+        if self.current_page == 'fix_errors': self.show_page('fix_errors'); self.update_undo_buttons()
+        messagebox.showinfo("Corrections", f"{msg}\nValid: {len(self.valid_df) if self.valid_df is not None else 0}  "
+                                           f"Errors: {len(self.error_df) if self.error_df is not None else 0}")
+
+    def update_undo_buttons(self):
+        for name, ok in [('undo_btn', self.can_undo()), ('undo_all_btn', self.can_undo()), ('redo_btn', self.can_redo())]:
+            b = getattr(self, name, None)
+            if b is not None and b.winfo_exists(): b.config(state='normal' if ok else 'disabled')
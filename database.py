@@ -1,22 +1,41 @@
 # pylint: disable=all
-"""database.py – All DB operations: SQLite init, MySQL connect, save, logging."""
+"""database.py – All DB operations: SQLite init, MySQL connect, save (MySQL when connected, else SQLite), logging."""
 
-import hashlib, json, sqlite3, socket, traceback
+import sqlite3, threading, traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import pandas as pd
 from tkinter import messagebox
-from config import SQLITE_DB_FILE, DEFAULT_ADMIN, MYSQL_AVAILABLE
+from config import SQLITE_DB_FILE, MYSQL_AVAILABLE
+from checkpoint import CHECKPOINT_FRAMES
+from bulksave import resumable_save, text_table, checkpoint as save_checkpoint, ensure_table as ensure_bulk_saves
+from auth import AuthService
+from tenancy import normalize_tenant, tenant_table, tenant_cache
+from metrics import METRICS, stage
+from eventlog import EventLogger
+from logic import ERROR_COLUMNS, classify_errors
+from sqlitestore import write_frame
+from history import ensure_indexes as ensure_history_indexes
 
 if MYSQL_AVAILABLE:
     import mysql.connector
-    from mysql.connector import Error as MySQLError
+    from mysql.connector import Error as MySQLError, ProgrammingError as MySQLProgrammingError
 else:
     class _FC:
         class Error(Exception): pass
         @staticmethod
         def connect(**kw): raise RuntimeError("mysql-connector-python not installed.")
     mysql = type("mysql", (), {"connector": _FC})()
-    MySQLError = _FC.Error
+    MySQLError = MySQLProgrammingError = _FC.Error
+
+
+class SaveCancelled(Exception):
+    pass
+
+
+def _close(con):
+    try: con.close()
+    except Exception: pass
 
 
 class DatabaseMixin:
@@ -33,63 +52,80 @@ class DatabaseMixin:
                 CREATE TABLE IF NOT EXISTS login_logs (
                     log_id INTEGER PRIMARY KEY AUTOINCREMENT,
                     username TEXT NOT NULL, login_time TEXT NOT NULL,
-                    status TEXT, ip_address TEXT);
+                    status TEXT, ip_address TEXT, tenant TEXT DEFAULT 'default');
                 CREATE TABLE IF NOT EXISTS fixed_errors (
                     fix_id INTEGER PRIMARY KEY AUTOINCREMENT,
                     student_id TEXT NOT NULL, student_name TEXT, subject TEXT NOT NULL,
                     field_name TEXT NOT NULL, old_value TEXT, new_value TEXT,
                     error_message TEXT, fixed_by TEXT,
-                    fixed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+                    fixed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, tenant TEXT DEFAULT 'default',
+                    correction_id TEXT);
+                CREATE TABLE IF NOT EXISTS error_logs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    student_id TEXT, student_name TEXT, roll_no TEXT, error_type TEXT,
+                    error_code INTEGER, error_codes TEXT, error_description TEXT, record_data TEXT,
+                    tenant TEXT DEFAULT 'default', created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+                CREATE INDEX IF NOT EXISTS idx_error_logs_tenant ON error_logs(tenant, error_code);
+                CREATE TABLE IF NOT EXISTS subject_catalogue (
+                    programme TEXT NOT NULL, subject TEXT NOT NULL,
+                    kind TEXT NOT NULL DEFAULT 'required' CHECK (kind IN ('required','elective')),
+                    min_electives INTEGER DEFAULT 0, tenant TEXT DEFAULT 'default',
+                    PRIMARY KEY (tenant, programme, subject));
             """)
-            h = hashlib.sha256(DEFAULT_ADMIN[1].encode()).hexdigest()
-            cur.execute("INSERT OR IGNORE INTO users (username,password_hash,role) VALUES(?,?,?)",
-                        (DEFAULT_ADMIN[0], h, 'admin'))
+            for tbl in ('login_logs', 'fixed_errors'):   # pre-tenant databases
+                if 'tenant' not in {r[1] for r in cur.execute(f"PRAGMA table_info({tbl})")}:
+                    cur.execute(f"ALTER TABLE {tbl} ADD COLUMN tenant TEXT DEFAULT 'default'")
+            if 'correction_id' not in {r[1] for r in cur.execute("PRAGMA table_info(fixed_errors)")}:   # pre-undo databases
+                cur.execute("ALTER TABLE fixed_errors ADD COLUMN correction_id TEXT")
+            ensure_history_indexes(cur); ensure_bulk_saves(cur)
             con.commit(); con.close()
+            self.auth = AuthService(SQLITE_DB_FILE)   # migrates users table, seeds DEFAULT_ADMIN only if empty
         except Exception as e:
-            print(f"[DB] init error: {e}")
+            METRICS.error("DB", "init", e)
+        self.events = EventLogger(SQLITE_DB_FILE)
+
+    # ── Department scoping ────────────────────────────────────────────────
+    def set_tenant(self, name):
+        """Switch department: data tables, checkpoints, caches and audit rows are all keyed by it. Loaded data
+        belongs to the old department, so switching closes that session (its checkpoint is written first and
+        kept) → True if the department changed."""
+        t = normalize_tenant(name)
+        if t == getattr(self, 'tenant', None): return False
+        if any(getattr(self, n, None) is not None for n in CHECKPOINT_FRAMES):
+            if not messagebox.askyesno("Switch Department", f"The loaded data belongs to '{self.tenant}'.\n"
+                                       f"Close it and switch to '{t}'? Its checkpoint is kept for when you switch back."):
+                return False
+            if getattr(self, '_ckpt_lock', None): self.checkpoint_now(wait=True)
+            self.df = self.valid_df = self.error_df = self.pending_df = self.results_df = None
+            self.reset_corrections(); self.reset_search()
+            for page in ('validate', 'fix_errors', 'results', 'pending', 'reports'): self.lock_page(page)
+        self.tenant = t
+        self.db_table_name = tenant_table(t, 'results')
+        self.reset_checkpoint_state(); self.clear_page_cache()
+        return True
+
+    def tenant_cache(self):
+        return tenant_cache(self.tenant)
 
     # ── Audit trail ───────────────────────────────────────────────────────
     def log_fixed_error(self, student_id, student_name, subject, field_name,
-                        old_value, new_value, error_message):
+                        old_value, new_value, error_message, correction_id=None):
+        """Queue one audit row; the event logger writes it to SQLite (and MySQL when connected) off the UI thread."""
         by = self.logged_in_user["username"] if self.logged_in_user else "unknown"
-        args = (str(student_id), str(student_name), str(subject), str(field_name),
-                str(old_value), str(new_value), str(error_message), by)
         try:
-            if hasattr(self,'db_connection') and self.db_connection and self.db_connection.is_connected():
-                cur = self.db_connection.cursor()
-                cur.execute("INSERT INTO fixed_errors (student_id,student_name,subject,field_name,"
-                            "old_value,new_value,error_message,fixed_by) VALUES(%s,%s,%s,%s,%s,%s,%s,%s)", args)
-                self.db_connection.commit()
-                return True, "MySQL", None
-            else:
-                con = sqlite3.connect(SQLITE_DB_FILE); cur = con.cursor()
-                cur.execute("INSERT INTO fixed_errors (student_id,student_name,subject,field_name,"
-                            "old_value,new_value,error_message,fixed_by) VALUES(?,?,?,?,?,?,?,?)", args)
-                con.commit(); con.close()
-                return True, f"SQLite ({SQLITE_DB_FILE})", None
+            self.events.log('fixed_errors', student_id=str(student_id), student_name=str(student_name),
+                            subject=str(subject), field_name=str(field_name), old_value=str(old_value),
+                            new_value=str(new_value), error_message=str(error_message), fixed_by=by,
+                            tenant=self.tenant, correction_id=correction_id)
+            return True, ("SQLite + MySQL" if self.events.mysql_config else f"SQLite ({SQLITE_DB_FILE})"), None
         except Exception as e:
             traceback.print_exc()
             return False, None, str(e)
 
     # ── Login logging ─────────────────────────────────────────────────────
-    def try_log_to_mysql(self, username, status):
-        if not MYSQL_AVAILABLE or not hasattr(self, 'db_config'): return
-        try:
-            con = mysql.connector.connect(**self.db_config); cur = con.cursor()
-            cur.execute("INSERT INTO login_logs(username,login_time,status,ip_address) VALUES(%s,%s,%s,%s)",
-                        (username, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), status, 'localhost'))
-            con.commit(); con.close()
-        except Exception: pass
-
-    def log_login_to_mysql(self, username, status):
-        if not self.db_connection or not self.db_connection.is_connected(): return
-        try:
-            ip = socket.gethostbyname(socket.gethostname())
-            cur = self.db_connection.cursor()
-            cur.execute("INSERT INTO login_logs(username,login_time,status,ip_address,session_info) VALUES(%s,%s,%s,%s,%s)",
-                        (username, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), status, ip, f"Host:{socket.gethostname()}"))
-            self.db_connection.commit()
-        except Exception as e: print(f"[DB] login log failed: {e}")
+    def log_login(self, username, status):
+        self.events.log('login_logs', username=username, status=status, tenant=self.tenant,
+                        login_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
 
     # ── MySQL connect (DB setup page) ─────────────────────────────────────
     def test_db_connection(self):
@@ -106,7 +142,14 @@ class DatabaseMixin:
             self.db_status_label.config(text="✗ Failed", fg=self.colors['danger'])
             messagebox.showerror("Error", f"Connection failed:\n{e}")
 
+    def _apply_department(self):
+        if getattr(self, 'db_tenant', None) and str(self.db_tenant.cget('state')) != 'disabled':
+            if self.set_tenant(self.db_tenant.get()): self.offer_checkpoint_recovery()
+            elif normalize_tenant(self.db_tenant.get()) != self.tenant:   # switch declined
+                self.db_tenant.delete(0, 'end'); self.db_tenant.insert(0, self.tenant)
+
     def save_db_and_continue(self):
+        self._apply_department()
         if not MYSQL_AVAILABLE:
             messagebox.showwarning("MySQL N/A",
                 "mysql-connector-python not available.\nContinuing in SQLite mode.\nRun: pip install mysql-connector-python")
@@ -119,7 +162,7 @@ class DatabaseMixin:
             cur = con.cursor()
             db  = self.db_name.get()
             tbl = getattr(self, 'db_table', None)
-            tbl = tbl.get() if tbl else 'results'
+            tbl = tenant_table(self.tenant, tbl.get() if tbl else 'results')
             cur.execute(f"CREATE DATABASE IF NOT EXISTS `{db}`")
             cur.execute(f"USE `{db}`")
             cur.executemany("SELECT 1", [])  # flush
@@ -129,29 +172,37 @@ class DatabaseMixin:
                 " role VARCHAR(20) DEFAULT 'user', created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)",
                 "CREATE TABLE IF NOT EXISTS login_logs (id INT AUTO_INCREMENT PRIMARY KEY,"
                 " username VARCHAR(100), login_time VARCHAR(50), status VARCHAR(20),"
-                " ip_address VARCHAR(50), session_info TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)",
+                " ip_address VARCHAR(50), session_info TEXT, tenant VARCHAR(64) DEFAULT 'default',"
+                " created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)",
                 f"CREATE TABLE IF NOT EXISTS `{tbl}` (id INT AUTO_INCREMENT PRIMARY KEY,"
                 " student_id VARCHAR(50), student_name VARCHAR(100), roll_no VARCHAR(50),"
                 " total_marks FLOAT, percentage FLOAT, grade VARCHAR(5), result VARCHAR(10),"
                 " created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)",
                 "CREATE TABLE IF NOT EXISTS error_logs (id INT AUTO_INCREMENT PRIMARY KEY,"
                 " student_id VARCHAR(50), student_name VARCHAR(100), roll_no VARCHAR(50),"
-                " error_type VARCHAR(100), error_description TEXT, record_data JSON,"
-                " created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)",
+                " error_type VARCHAR(100), error_code INT, error_codes VARCHAR(255), error_description TEXT, record_data JSON,"
+                " tenant VARCHAR(64) DEFAULT 'default', created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,"
+                " INDEX idx_error_logs_tenant (tenant))",
                 "CREATE TABLE IF NOT EXISTS fixed_errors (id INT AUTO_INCREMENT PRIMARY KEY,"
                 " student_id VARCHAR(50), student_name VARCHAR(100), subject VARCHAR(100),"
                 " field_name VARCHAR(100), old_value VARCHAR(255), new_value VARCHAR(255),"
-                " error_message TEXT, fixed_by VARCHAR(100), fixed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)",
+                " error_message TEXT, fixed_by VARCHAR(100), fixed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,"
+                " tenant VARCHAR(64) DEFAULT 'default', correction_id VARCHAR(32), INDEX idx_fixed_errors_tenant (tenant))",
             ]:
                 cur.execute(sql)
-            h = hashlib.sha256(DEFAULT_ADMIN[1].encode()).hexdigest()
-            try: cur.execute("INSERT INTO users(username,password_hash,role) VALUES(%s,%s,%s)",
-                             (DEFAULT_ADMIN[0], h, 'admin'))
-            except mysql.connector.IntegrityError: pass
+            for t in ('login_logs', 'error_logs', 'fixed_errors'):   # pre-tenant databases
+                try: cur.execute(f"ALTER TABLE {t} ADD COLUMN tenant VARCHAR(64) DEFAULT 'default'")
+                except MySQLError: pass   # column already exists
+            for ddl in ("ADD COLUMN error_code INT", "ADD COLUMN error_codes VARCHAR(255)"):   # pre-taxonomy databases
+                try: cur.execute(f"ALTER TABLE error_logs {ddl}")
+                except MySQLError: pass
+            try: cur.execute("ALTER TABLE fixed_errors ADD COLUMN correction_id VARCHAR(32)")   # pre-undo databases
+            except MySQLError: pass
             con.commit()
             self.db_connection = con; self.db_table_name = tbl
             self.db_config = {'host': self.db_host.get(), 'port': int(self.db_port.get() or 3306),
                               'user': self.db_user.get(), 'password': self.db_pass.get(), 'database': db}
+            self.events.configure_mysql(self.db_config)
             self.db_status_label.config(text=f"✓ Connected to '{db}'", fg=self.colors['success'])
             messagebox.showinfo("Success", f"✓ Database '{db}' ready!")
             self.unlock_page('upload'); self.navigate_to('upload')
@@ -161,10 +212,12 @@ class DatabaseMixin:
                 self.skip_database()
 
     def skip_database(self):
+        self._apply_department()
         self.unlock_page('upload'); self.navigate_to('upload')
 
     # ── Save / auto-save ──────────────────────────────────────────────────
     def save_to_database(self):
+        if not self.may_edit(): return
         if self.results_df is None or self.results_df.empty:
             messagebox.showerror("Error", "No results to save"); return
         try:
@@ -175,78 +228,123 @@ class DatabaseMixin:
                 messagebox.showinfo("Success", "Results saved!"); con.close(); self.navigate_to('reports')
         except MySQLError as e: messagebox.showerror("Error", str(e))
 
+    def mysql_connected(self):
+        """MySQL mode: set up on the database page. No ping – the Tk thread never touches a save connection."""
+        return self.db_config is not None
+
     def save_error_logs_to_database(self):
-        if self.error_df is None or self.error_df.empty: return
-        if not self.db_connection or not self.db_connection.is_connected(): return
+        """Quietly queue one error_logs row per invalid record; SQLite always, MySQL too when connected."""
+        if self.error_df is None or self.error_df.empty or not self.may_edit(quiet=True): return
         try:
-            cur = self.db_connection.cursor()
-            for _, row in self.error_df.iterrows():
-                sid  = str(row.get('student_id', row.get('Student_ID', 'Unknown')))
-                sname= str(row.get('student_name', row.get('Student_Name', 'Unknown')))
-                roll = str(row.get('roll_no', row.get('Roll_No', 'Unknown')))
-                desc = str(row.get('Errors', 'Validation error'))
-                etype= ('Negative Marks' if 'negative' in desc.lower() else
-                        'Marks Exceed Max' if 'exceed' in desc.lower() else
-                        'Non-numeric' if 'non-numeric' in desc.lower() else
-                        'Missing Data' if 'missing' in desc.lower() else 'Validation Error')
-                cur.execute("INSERT INTO error_logs(student_id,student_name,roll_no,error_type,error_description,record_data)"
-                            " VALUES(%s,%s,%s,%s,%s,%s)",
-                            (sid, sname, roll, etype, desc, json.dumps({k: str(v) for k,v in row.items() if k!='Errors'})))
-            self.db_connection.commit()
-            messagebox.showinfo("Success", f"✓ {len(self.error_df)} error logs saved!")
+            edf = self.error_df
+            sid, sname, roll, _ = self._validation_columns(list(edf.columns))
+            code, label, names = classify_errors(edf)
+            record = edf.drop(columns=[c for c in ERROR_COLUMNS if c in edf.columns]).astype(str)
+            def col(c): return edf[c].astype(str) if c in edf.columns else 'Unknown'
+            rows = pd.DataFrame({
+                'student_id': col(sid), 'student_name': col(sname), 'roll_no': col(roll),
+                'error_type': label, 'error_code': code.astype(int), 'error_codes': names,
+                'error_description': edf['Errors'].astype(str) if 'Errors' in edf.columns else 'Validation error',
+                'record_data': record.to_json(orient='records', lines=True, force_ascii=False).splitlines(),
+                'tenant': self.tenant}, index=edf.index).to_dict('records')
+            self.events.log_many('error_logs', rows)
         except Exception as e: messagebox.showerror("Error", str(e))
 
     def save_uploaded_to_database(self):
+        if not self.may_edit(): return
         if self.df is None or self.df.empty: messagebox.showerror("Error","No data"); return
-        if not self.db_connection or not self.db_connection.is_connected():
-            messagebox.showerror("Error","No DB connection"); return
-        self._write_df_to_mysql(self.df, "uploaded_student_data", show_success=True)
+        self._save_frame(self.df, "uploaded_student_data", show_success=True)
 
     def auto_save_uploaded_data(self):
-        if self.df is None or not (self.db_connection and self.db_connection.is_connected()): return
-        self._write_df_to_mysql(self.df, "uploaded_student_data")
+        if self.df is not None: self._save_frame(self.df, "uploaded_student_data")
 
     def auto_save_validation_results(self):
-        if not (self.db_connection and self.db_connection.is_connected()): return
         if self.valid_df is not None and not self.valid_df.empty:
-            self._write_df_to_mysql(self.valid_df, "validated_records")
+            self._save_frame(self.valid_df, "validated_records")
+
+    def _save_frame(self, df, base, *, show_success=False):
+        if not self.may_edit(quiet=True): return
+        table = tenant_table(self.tenant, base)
+        if self.mysql_connected(): self._write_df_to_mysql(df, table, show_success=show_success)
+        else: self._write_df_to_sqlite(df, table, show_success=show_success)
 
     def auto_save_results(self):
-        if self.results_df is None or self.results_df.empty: return
-        if not (self.db_connection and self.db_connection.is_connected()): return
-        tbl = getattr(self, 'db_table_name', 'results')
-        try:
-            cur = self.db_connection.cursor()
-            cur.execute(f"DELETE FROM `{tbl}`")
-            for _, row in self.results_df.iterrows():
-                pct = float(str(row.get('Percentage','0%')).replace('%','') or 0)
-                cur.execute(f"INSERT INTO `{tbl}`(student_id,student_name,roll_no,total_marks,percentage,grade,result)"
-                            " VALUES(%s,%s,%s,%s,%s,%s,%s)",
-                            (str(row.get('student_id','')), str(row.get('student_name','')),
-                             str(row.get('roll_no','')), float(row.get('Total',0)), pct,
-                             str(row.get('Grade','F')), str(row.get('Result','FAIL'))))
-            self.db_connection.commit()
-        except Exception as e: print(f"[DB] auto_save_results: {e}")
+        """MySQL: the fixed-schema results table. SQLite mode: the full results frame (subjects, ranks) in the tenant's results table."""
+        if self.results_df is None or self.results_df.empty or not self.may_edit(quiet=True): return
+        if not self.mysql_connected():
+            if self._write_df_to_sqlite(self.results_df, tenant_table(self.tenant, 'results')): self.clear_checkpoint()
+            return
+        tbl = getattr(self, 'db_table_name', 'results'); res = self.results_df
+        def col(c, d): return res[c] if c in res.columns else pd.Series(d, index=res.index)
+        rows = pd.DataFrame({
+            'student_id': col('student_id','').astype(str), 'student_name': col('student_name','').astype(str),
+            'roll_no': col('roll_no','').astype(str),
+            'total_marks': pd.to_numeric(col('Total',0), errors='coerce').fillna(0).astype(float),
+            'percentage': pd.to_numeric(col('Percentage','0').astype(str).str.rstrip('%'), errors='coerce').fillna(0).astype(float),
+            'grade': col('Grade','F').astype(str), 'result': col('Result','FAIL').astype(str)})
+        self._resumable_mysql_save(rows, tbl, list(rows.columns),
+                                   lambda cur, name: cur.execute(f"CREATE TABLE IF NOT EXISTS `{name}` LIKE `{tbl}`"),
+                                   lambda part: part.itertuples(index=False, name=None), where="auto_save_results",
+                                   on_done=self.clear_checkpoint)
 
     def _write_df_to_mysql(self, df, table_name, *, show_success=False):
+        return self._resumable_mysql_save(df, table_name, *text_table(df), show_success=show_success, where="_write_df_to_mysql")
+
+    def _resumable_mysql_save(self, df, table, columns, create, values, *, show_success=False, where="mysql_save", on_done=None):
+        """Chunked staging-table save with retry/backoff and an atomic swap (bulksave.py), run on the single DB
+        worker so a flaky link never blocks the window. The worker keeps its own connection, built from a copy
+        of db_config taken now; saves queue in order on it. Outcomes come back through root.after, where
+        on_done() runs after a successful save. On failure or stop_db_worker() the staging rows and the
+        checkpoint are kept, and saving the same data again resumes from there. → Future"""
+        cfg = dict(self.db_config)
+        if getattr(self, '_db_worker', None) is None:
+            self._db_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-save"); self._db_cancel = threading.Event()
+        cancel = self._db_cancel
+        def stop_if_cancelled(done, n):
+            if cancel.is_set(): raise SaveCancelled(f"stopped after {done:,} of {n:,} rows")
+        def run():
+            if cancel.is_set(): return
+            link = getattr(self, '_save_link', None); self._save_link = None   # (config, connection) – worker thread only
+            if link and link[0] != cfg: _close(link[1]); link = None
+            try:
+                with stage('db_write', rows=len(df)) as st:
+                    st['table'] = table
+                    con, written, resumed = resumable_save(
+                        lambda: mysql.connector.connect(**cfg), table, df.reset_index(drop=True), columns, create, values,
+                        con=link and link[1], retry_on=(MySQLError, OSError), fatal=(MySQLProgrammingError,), progress=stop_if_cancelled)
+                    st['resumed_rows'] = resumed
+                self._save_link = (cfg, con)
+                self.root.after(0, lambda: done(None, resumed))
+            except SaveCancelled: pass
+            except Exception as e:
+                ck = save_checkpoint(table)
+                kept = f"\n{ck[3]:,} of {ck[2]:,} rows are staged; saving again resumes from there." if ck and ck[3] else ""
+                METRICS.error("DB", where, f"{e}{kept}"); msg = f"{e}{kept}"
+                self.root.after(0, lambda: done(msg, 0))
+        def done(error, resumed):
+            if error is None and on_done: on_done()
+            if not show_success: return
+            if error is None: messagebox.showinfo("Success", f"✓ Saved {len(df):,} rows to '{table}'" + (f" (resumed after {resumed:,})" if resumed else ""))
+            else: messagebox.showerror("Error", error)
+        return self._db_worker.submit(run)
+
+    def stop_db_worker(self):
+        """Drop queued saves, stop the running one at its next chunk (its checkpoint stays) and wait for it."""
+        w = getattr(self, '_db_worker', None)
+        if w is None: return
+        self._db_cancel.set(); w.shutdown(wait=True, cancel_futures=True); self._db_worker = None
+        link, self._save_link = getattr(self, '_save_link', None), None
+        if link: _close(link[1])
+
+    def _write_df_to_sqlite(self, df, table_name, *, show_success=False):
         try:
-            cur = self.db_connection.cursor()
-            cur.execute(f"DROP TABLE IF EXISTS `{table_name}`")
-            col_map = {}
-            for c in df.columns:
-                s = ''.join(x if x.isalnum() or x=='_' else '_' for x in str(c).replace(' ','_').replace('-','_'))
-                col_map[c] = s
-            cols_sql = ', '.join(f"`{v}` TEXT" for v in col_map.values())
-            cur.execute(f"CREATE TABLE `{table_name}` (id INT AUTO_INCREMENT PRIMARY KEY, {cols_sql},"
-                        " upload_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
-            for _, row in df.iterrows():
-                ph  = ','.join(['%s']*len(row))
-                cs  = ','.join(f"`{col_map[c]}`" for c in df.columns)
-                cur.execute(f"INSERT INTO `{table_name}` ({cs}) VALUES({ph})",
-                            tuple(str(v) if not pd.isna(v) else None for v in row))
-            self.db_connection.commit()
+            with stage('db_write', rows=len(df)) as st:
+                st['table'] = table_name; st['backend'] = 'sqlite'
+                write_frame(df, table_name, SQLITE_DB_FILE)
             if show_success:
-                messagebox.showinfo("Success", f"✓ Saved {len(df)} rows to '{table_name}'")
+                messagebox.showinfo("Success", f"✓ Saved {len(df):,} rows to '{table_name}' ({SQLITE_DB_FILE})")
+            return True
         except Exception as e:
             if show_success: messagebox.showerror("Error", str(e))
-            else: print(f"[DB] _write_df_to_mysql: {e}")
+            METRICS.error("DB", "_write_df_to_sqlite", e)
+            return False
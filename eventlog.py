@@ -0,0 +1,142 @@
+# pylint: disable=all
+"""eventlog.py – Non-blocking audit/event logging: bounded queue + background batch writer (SQLite & MySQL)."""
+
+import atexit, functools, queue, socket, sqlite3, threading, traceback
+from datetime import datetime
+from metrics import METRICS
+from config import (SQLITE_DB_FILE, MYSQL_AVAILABLE, EVENTLOG_QUEUE_SIZE, EVENTLOG_BATCH_SIZE, EVENTLOG_PUT_TIMEOUT,
+                    EVENTLOG_BULK_CHUNK)
+
+if MYSQL_AVAILABLE:
+    import mysql.connector
+
+# Columns written per table and backend; tables missing for a backend are skipped there.
+_COLUMNS = {
+    'login_logs':   {'sqlite': ('username','login_time','status','ip_address','tenant'),
+                     'mysql':  ('username','login_time','status','ip_address','session_info','tenant')},
+    'fixed_errors': {'sqlite': ('student_id','student_name','subject','field_name','old_value','new_value','error_message','fixed_by','tenant',
+                                'correction_id'),
+                     'mysql':  ('student_id','student_name','subject','field_name','old_value','new_value','error_message','fixed_by','tenant',
+                                'correction_id')},
+    'error_logs':   {'sqlite': ('student_id','student_name','roll_no','error_type','error_code','error_codes',
+                                'error_description','record_data','tenant'),
+                     'mysql':  ('student_id','student_name','roll_no','error_type','error_code','error_codes',
+                                'error_description','record_data','tenant')},
+}
+
+
+@functools.lru_cache(maxsize=1)
+def host_info():
+    """(ip, hostname) resolved once per process – gethostbyname can stall for seconds on a bad resolver."""
+    name = socket.gethostname()
+    try: return socket.gethostbyname(name), name
+    except OSError: return '127.0.0.1', name
+
+
+class EventLogger:
+    """Producers call log()/log_many() and return at once; one daemon thread drains the queue in batches,
+    grouping rows by table into a single executemany + commit. SQLite is written first; the MySQL mirror
+    gets the same batches on its own thread, so a slow or unreachable server never holds up SQLite or flush()."""
+
+    def __init__(self, sqlite_file=SQLITE_DB_FILE):
+        self.sqlite_file  = sqlite_file
+        self.mysql_config = None
+        self._q      = queue.Queue(maxsize=EVENTLOG_QUEUE_SIZE)
+        self._mysql  = None
+        self._mirror_q = queue.Queue(maxsize=EVENTLOG_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._run, name="event-logger", daemon=True)
+        self._mirror = threading.Thread(target=self._run_mirror, name="event-mirror", daemon=True)
+        self._thread.start(); self._mirror.start()
+        atexit.register(self.close)
+
+    def configure_mysql(self, cfg):
+        """Mirror events to MySQL from now on (cfg as passed to mysql.connector.connect, or None to stop)."""
+        self._q.put(('__mysql__', cfg))
+
+    def log(self, table, **row):
+        return self.log_many(table, [row])
+
+    def log_many(self, table, rows):
+        if not rows: return True
+        try: self._q.put((table, rows), timeout=EVENTLOG_PUT_TIMEOUT)
+        except queue.Full:
+            # Writer is badly behind – apply backpressure rather than drop audit rows.
+            print(f"[EventLog] queue full, waiting to enqueue {len(rows)} {table} row(s)")
+            self._q.put((table, rows))
+        return True
+
+    def flush(self):
+        """Block until everything queued so far is in SQLite; the MySQL mirror may still be catching up."""
+        self._q.join()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._q.put(None); self._thread.join(timeout=10)
+        if self._mirror.is_alive(): self._mirror.join(timeout=10)
+
+    # ── Writer thread ─────────────────────────────────────────────────────
+    def _run(self):
+        while True:
+            items = [self._q.get()]
+            while len(items) < EVENTLOG_BATCH_SIZE:
+                try: items.append(self._q.get_nowait())
+                except queue.Empty: break
+            batch, stop = {}, False
+            for it in items:
+                if it is None: stop = True
+                elif it[0] == '__mysql__':
+                    if batch: self._write(batch); batch = {}
+                    self.mysql_config = it[1]; self._mirror_q.put(it)
+                else: batch.setdefault(it[0], []).extend(it[1])
+            if batch: self._write(batch)
+            for _ in items: self._q.task_done()
+            if stop: self._mirror_q.put(None); return
+
+    def _write(self, batch):
+        ip, host = host_info() if 'login_logs' in batch else (None, None)
+        for r in batch.get('login_logs', []):
+            r.setdefault('login_time', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            r.setdefault('ip_address', ip); r.setdefault('session_info', f"Host:{host}")
+        self._write_backend('sqlite', batch)
+        if self.mysql_config and MYSQL_AVAILABLE:
+            try: self._mirror_q.put_nowait(('__batch__', batch))
+            except queue.Full:   # mirror far behind (server down): the rows are safe in SQLite, skip the copy
+                METRICS.error("EventLog", "mysql mirror", f"queue full, {sum(map(len, batch.values()))} row(s) not mirrored")
+
+    def _run_mirror(self):
+        cfg = None
+        while True:
+            it = self._mirror_q.get()
+            if it is None: self._close_mysql(); return
+            if it[0] == '__mysql__': self._close_mysql(); cfg = it[1]
+            elif cfg: self._write_backend('mysql', it[1], cfg)
+
+    def _write_backend(self, backend, batch, cfg=None):
+        ph = '?' if backend == 'sqlite' else '%s'
+        try:
+            con = sqlite3.connect(self.sqlite_file) if backend == 'sqlite' else self._mysql_con(cfg)
+            cur = con.cursor()
+            for table, rows in batch.items():
+                cols = _COLUMNS.get(table, {}).get(backend)
+                if not cols: continue
+                sql = f"INSERT INTO {table}({','.join(cols)}) VALUES({','.join([ph]*len(cols))})"
+                for i in range(0, len(rows), EVENTLOG_BULK_CHUNK):
+                    cur.executemany(sql, [tuple(r.get(c) for c in cols) for r in rows[i:i+EVENTLOG_BULK_CHUNK]])
+                METRICS.count('events_written', len(rows), table=table, backend=backend)
+            con.commit()
+            if backend == 'sqlite': con.close()
+        except Exception as e:
+            METRICS.error("EventLog", f"{backend} write", e); traceback.print_exc()
+            if backend == 'mysql': self._close_mysql()
+
+    def _mysql_con(self, cfg):
+        """Mirror thread only."""
+        if self._mysql is None or not self._mysql.is_connected():
+            self._mysql = mysql.connector.connect(**cfg)
+        return self._mysql
+
+    def _close_mysql(self):
+        try:
+            if self._mysql is not None: self._mysql.close()
+        except Exception: pass
+        self._mysql = None
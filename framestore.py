@@ -0,0 +1,97 @@
+# pylint: disable=all
+"""framestore.py – Zero-copy frame sharing with worker processes via memory-mapped Arrow IPC files.
+
+The owner publish()es a frame once and passes the small FrameHandle to workers; each worker attach()es
+read-only through a memory map, so N workers share one copy in the page cache instead of each unpickling
+its own. Without pyarrow the same API falls back to pickle files (one copy per worker).
+"""
+
+import atexit, itertools, os, tempfile, threading
+from collections import namedtuple
+import pandas as pd
+from config import ARROW_AVAILABLE, SHARED_FRAME_DIR
+
+if ARROW_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+FrameHandle = namedtuple('FrameHandle', 'name path rows')
+
+_lock      = threading.Lock()
+_versions  = itertools.count(1)
+_published = {}     # name -> FrameHandle (owner side)
+_attached  = {}     # path -> DataFrame (worker side)
+_dir       = None
+
+
+def shared_dir():
+    global _dir
+    if _dir is None:
+        base = SHARED_FRAME_DIR or ('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir())
+        _dir = os.path.join(base, f"rp_frames_{os.getpid()}"); os.makedirs(_dir, exist_ok=True)
+    return _dir
+
+
+def write_arrow(df, path, compression=None):
+    """Feather/Arrow IPC write; mixed-type object columns (85 next to 'abc') are stored as text."""
+    df = df.reset_index(drop=True)
+    df.columns = [str(c) for c in df.columns]
+    kw = {} if compression is None else {'compression': compression}
+    try: feather.write_feather(df, path, **kw)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        obj = df.select_dtypes('object').columns
+        df[obj] = df[obj].astype(str).where(df[obj].notna(), None)
+        feather.write_feather(df, path, **kw)
+
+
+def publish(df, name):
+    """Write `df` as an uncompressed Arrow IPC file (mappable without decoding) and return its handle.
+    Re-publishing a name replaces the previous version."""
+    path = os.path.join(shared_dir(), f"{name}_{next(_versions)}.arrow" if ARROW_AVAILABLE else f"{name}_{next(_versions)}.pkl")
+    tmp  = path + '.tmp'
+    if ARROW_AVAILABLE: write_arrow(df, tmp, compression='uncompressed')
+    else: df.to_pickle(tmp)
+    os.replace(tmp, path)
+    handle = FrameHandle(name, path, len(df))
+    with _lock: old = _published.get(name); _published[name] = handle
+    if old: _unlink(old.path)
+    return handle
+
+
+def attach(handle):
+    """Read-only view of a published frame, cached per process. Arrow columns point into the memory map."""
+    with _lock:
+        if handle.path in _attached: return _attached[handle.path]
+    if handle.path.endswith('.arrow'):
+        tbl = pa.ipc.open_file(pa.memory_map(handle.path, 'r')).read_all()
+        df  = tbl.to_pandas(types_mapper=pd.ArrowDtype)
+    else: df = pd.read_pickle(handle.path)
+    with _lock:
+        for p in [p for p in _attached if os.path.basename(p).startswith(handle.name + '_')]: del _attached[p]
+        _attached[handle.path] = df
+    return df
+
+
+def release(name=None):
+    """Unlink one published frame (or all of them). Workers that already attached keep their mapping on POSIX."""
+    with _lock:
+        handles = list(_published.values()) if name is None else [h for h in [_published.get(name)] if h]
+        for h in handles: _published.pop(h.name, None)
+    for h in handles: _unlink(h.path)
+
+
+def _unlink(path):
+    try: os.remove(path)
+    except OSError: pass    # still mapped on Windows – removed with the directory at exit
+
+
+def _cleanup():
+    release()
+    if _dir is None: return
+    try:
+        for f in os.listdir(_dir): _unlink(os.path.join(_dir, f))
+        os.rmdir(_dir)
+    except OSError: pass
+
+
+atexit.register(_cleanup)
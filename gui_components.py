@@ -1,9 +1,10 @@
 # pylint: disable=all
 """gui_components.py – Sidebar, navigation, and reusable widget factories."""
 
+import weakref
 import tkinter as tk
 from tkinter import ttk
-from config import COLORS, PAGES_CONFIG
+from config import COLORS, PAGES_CONFIG, PAGE_CACHE_DEPENDENCIES, SEARCH_DEBOUNCE_MS
 
 
 class GUIComponentsMixin:
@@ -32,12 +33,16 @@ class GUIComponentsMixin:
         self.create_navigation_menu()
         footer = tk.Frame(self.sidebar, bg=self.colors['sidebar'])
         footer.pack(side='bottom', fill='x', pady=20)
+        tk.Button(footer, text="🚪 Logout", font=('Segoe UI',10), bg=self.colors['sidebar'], fg='white',
+                  activebackground=self.colors['sidebar_hover'], activeforeground='white', relief='flat',
+                  cursor='hand2', command=self.logout).pack(fill='x', padx=20, pady=(0,10))
         tk.Label(footer, text="v1.0 • 2026", font=('Segoe UI',9),
                  bg=self.colors['sidebar'], fg='#7F8C8D').pack()
 
-        # Content area
-        self.content_area = tk.Frame(self.main_container, bg=self.colors['bg'])
-        self.content_area.grid(row=0, column=1, sticky='nsew')
+        # Content area – one child frame per page; content_area points at the visible one
+        self.content_host = tk.Frame(self.main_container, bg=self.colors['bg'])
+        self.content_host.grid(row=0, column=1, sticky='nsew')
+        self.content_area = None; self.page_cache = {}
         self.sidebar_visible = False
         self.sidebar.grid_remove()
         self.show_page('login')
@@ -76,6 +81,16 @@ class GUIComponentsMixin:
                 for w in btn.winfo_children(): w.destroy()
                 break
 
+    def lock_page(self, page_id):
+        for p in self.pages_config:
+            if p['id'] == page_id and not p['locked']:
+                p['locked'] = True
+                btn = self.nav_buttons[page_id]
+                btn.config(fg='#7F8C8D', bg=self.colors['sidebar'], cursor='arrow', command=lambda: None)
+                tk.Label(btn, text="🔒", font=('Segoe UI',10),
+                         bg=self.colors['sidebar'], fg='#7F8C8D').place(relx=0.92, rely=0.5, anchor='center')
+                break
+
     def navigate_to(self, page_id):
         if page_id != 'login': self._ensure_sidebar_visible()
         for pid, btn in self.nav_buttons.items():
@@ -97,14 +112,56 @@ class GUIComponentsMixin:
         if page_id != 'login':
             self._ensure_sidebar_visible()
             self.root.after(100, self.force_sidebar_visible)
-        for w in self.content_area.winfo_children(): w.destroy()
         dispatch = {
             'login': self.show_login_page, 'database': self.show_database_page,
             'upload': self.show_upload_page, 'validate': self.show_validate_page,
             'fix_errors': self.show_fix_errors_page, 'results': self.show_results_page,
             'pending': self.show_pending_page, 'reports': self.show_reports_page,
+            'history': self.show_fixed_history_page, 'users': self.show_users_page,
+            'diagnostics': self.show_diagnostics_page,
         }
-        if page_id in dispatch: dispatch[page_id]()
+        refreshers = {'validate': self.refresh_validate_tables, 'fix_errors': self.refresh_fix_errors_table}
+        if page_id not in dispatch: return
+        for pid, (frm, _) in self.page_cache.items():
+            if pid != page_id: frm.pack_forget()
+        deps = PAGE_CACHE_DEPENDENCIES.get(page_id)
+        frm, stamp = self.page_cache.get(page_id) or (None, None)
+        if frm is None or not frm.winfo_exists():
+            frm = tk.Frame(self.content_host, bg=self.colors['bg']); stamp = None
+        frm.pack(fill='both', expand=True); self.content_area = frm
+        if deps is not None and stamp is not None:
+            stale = self._stale_frames(stamp)
+            if not stale: return
+            if page_id in refreshers and refreshers[page_id](stale):
+                self.page_cache[page_id] = (frm, self._data_stamp(deps)); return
+        for w in frm.winfo_children(): w.destroy()
+        dispatch[page_id]()
+        self.page_cache[page_id] = (frm, self._data_stamp(deps) if deps is not None else None)
+
+    # ── Page cache ────────────────────────────────────────────────────────
+    def _data_stamp(self, names):
+        """Weak references to the frames a page was drawn from; a replaced frame no longer matches."""
+        return tuple((n, None if getattr(self, n, None) is None else weakref.ref(getattr(self, n))) for n in names)
+
+    def _stale_frames(self, stamp):
+        return {n for n, ref in stamp if (ref() if ref is not None else None) is not getattr(self, n, None)}
+
+    def stamp_page(self, page_id):
+        """Record that a cached page now shows the current frames (after updating its widgets in place)."""
+        if page_id in self.page_cache and page_id in PAGE_CACHE_DEPENDENCIES:
+            self.page_cache[page_id] = (self.page_cache[page_id][0], self._data_stamp(PAGE_CACHE_DEPENDENCIES[page_id]))
+
+    def refresh_page(self, page_id):
+        """Drop a page's cached widgets; rebuild now if it is on screen."""
+        frm, _ = self.page_cache.get(page_id) or (None, None)
+        if frm is not None: self.page_cache[page_id] = (frm, None)
+        if self.current_page == page_id: self.show_page(page_id)
+
+    def clear_page_cache(self):
+        """Forget every cached page (department switch); the visible one is rebuilt on its next visit."""
+        for pid, (frm, _) in list(self.page_cache.items()):
+            if frm is self.content_area: self.page_cache[pid] = (frm, None)
+            else: frm.destroy(); del self.page_cache[pid]
 
     # ── Widget factories ──────────────────────────────────────────────────
     def create_page_header(self, title, subtitle=""):
@@ -154,6 +211,43 @@ class GUIComponentsMixin:
         tree.tag_configure('oddrow',  background='#FFFFFF')
         return tree
 
+    def create_search_bar(self, parent, targets, bg=None):
+        """Search entry above one or more grids; targets = [(tree attribute, frame attribute, label)].
+        Typing re-filters every target after SEARCH_DEBOUNCE_MS of quiet."""
+        bg  = bg or self.colors['card']
+        bar = tk.Frame(parent, bg=bg); bar.pack(fill='x', padx=20, pady=(0,5))
+        tk.Label(bar, text="🔍", font=('Segoe UI',12), bg=bg).pack(side='left')
+        var = tk.StringVar(value=self.search_queries.get(targets[0][0], ''))
+        tk.Entry(bar, textvariable=var, font=('Segoe UI',11), width=40).pack(side='left', padx=5)
+        tk.Label(bar, text="ID · name · subject:  grade:  result:  error:", font=('Segoe UI',9),
+                 bg=bg, fg=self.colors['text_light']).pack(side='left', padx=5)
+        count = tk.Label(bar, text="", font=('Segoe UI',10,'bold'), bg=bg, fg=self.colors['primary']); count.pack(side='right')
+        job = [None]
+        def run():
+            job[0] = None; q = var.get().strip(); found = []
+            for attr, name, label in targets:
+                self.search_queries[attr] = q
+                n = self.show_in_tree(attr, name)
+                if n is not None: found.append(f"{n:,} {label}")
+            count.config(text=(" · ".join(found) + " match") if q and found else "")
+        def changed(*_):
+            if job[0]: self.root.after_cancel(job[0])
+            job[0] = self.root.after(SEARCH_DEBOUNCE_MS, run)
+        var.trace_add('write', changed)
+        for _, name, _ in targets: self.warm_search_index(name)
+        return var
+
+    def show_in_tree(self, attr, name):
+        """Fill grid `attr` from frame `name`, filtered by the grid's active search → matches (None if no search)."""
+        tree, df = getattr(self, attr, None), getattr(self, name, None)
+        if tree is None or not tree.winfo_exists(): return None
+        q = self.search_queries.get(attr, '')
+        if df is None or df.empty or not q: self.populate_treeview(tree, df); return None
+        pos = self.search_index(name).search(q)
+        if len(pos): self.populate_treeview(tree, df.iloc[pos[:200]])
+        else: tree.delete(*tree.get_children())
+        return len(pos)
+
     def create_stat_box(self, parent, value, label, bg_color, value_color=None):
         box = tk.Frame(parent, bg=bg_color); box.pack(side='left', padx=20)
         tk.Label(box, text=str(value), font=('Segoe UI',24,'bold'),
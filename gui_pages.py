@@ -1,12 +1,19 @@
 # pylint: disable=all
 """gui_pages.py – All page renderers: login, database, upload, validate, fix errors, pending, results, reports, history."""
 
-import hashlib, os, sqlite3, traceback
+import os, threading, traceback
 from datetime import datetime
 import pandas as pd
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-from config import SQLITE_DB_FILE
+from tkinter import ttk, filedialog, messagebox, simpledialog
+from config import METRICS_DIR, INGEST_SOURCE_COLUMN, HISTORY_PAGE_SIZE, PAGES_CONFIG
+from auth import AuthError, ROLES, EDIT_ROLES
+from tenancy import normalize_tenant
+from metrics import METRICS, stage
+from logic import ERROR_COLUMNS, detect_columns, subject_column
+from ingest import load_files, expand_paths
+from readers import read_table
+from history import fetch_page, page_key
 
 
 def _lbl(parent, text, font=None, bg=None, fg=None, **kw):
@@ -34,25 +41,56 @@ class GUIPagesMixin:
     def handle_login(self):
         u, p = self.username_entry.get().strip(), self.password_entry.get()
         if not u or not p: messagebox.showerror("Error","Enter username and password"); return
-        h = hashlib.sha256(p.encode()).hexdigest()
+        self.root.config(cursor="wait")
+        fut = self.auth.authenticate_async(u, p)   # hash verification runs off the UI thread
+        fut.add_done_callback(lambda f: self.root.after(0, lambda: self._on_login_result(u, f)))
+
+    def _on_login_result(self, u, fut):
+        self.root.config(cursor="")
+        try: user = fut.result()
+        except AuthError as e:
+            self.log_login(u, 'FAILED'); messagebox.showerror("Error", str(e)); return
+        except Exception as e: messagebox.showerror("Error", str(e)); return
+        self.logged_in_user = user
+        self.set_tenant(user['tenant'])
+        self.log_login(u, 'SUCCESS')
+        self._ensure_sidebar_visible()
+        messagebox.showinfo("Success", f"Welcome, {u}!")
+        self.unlock_page('database'); self.unlock_page('history'); self.unlock_page('diagnostics')
+        if user['role'] == 'admin': self.unlock_page('users')
+        self.navigate_to('database')
+        self.offer_checkpoint_recovery()
+
+    def logout(self):
+        """End the session: drop its checkpoint, data and DB connection, and go back to a locked login screen."""
+        if not messagebox.askyesno("Logout", "Log out? Unsaved work in this session will be discarded."): return
+        self.root.config(cursor="wait"); self.root.update()
+        self.stop_db_worker(); self.clear_checkpoint()
+        if self.db_connection is not None:
+            try: self.db_connection.close()
+            except Exception: pass
+        self.df = self.valid_df = self.error_df = self.pending_df = self.results_df = None
+        self.db_connection = self.logged_in_user = self.db_config = None
+        self.reset_corrections(); self.reset_search()
+        self.pages_config = [dict(p) for p in PAGES_CONFIG]; self.current_page = "login"
+        for w in self.root.winfo_children(): w.destroy()
+        self.setup_ui(); self.root.config(cursor="")
+
+    def may_edit(self, quiet=False):
+        """Role check (no password prompt) before an action that changes, saves or exports data."""
+        try: self.auth.require_role(self.logged_in_user, *EDIT_ROLES); return True
+        except AuthError as e:
+            if not quiet: messagebox.showerror("Not Allowed", str(e))
+            return False
+
+    def confirm_privileged(self, *roles):
+        """Re-check the current user's password (cheap when cached) and role before a sensitive action."""
         try:
-            con = sqlite3.connect(SQLITE_DB_FILE); cur = con.cursor()
-            cur.execute("SELECT user_id,username,role FROM users WHERE username=? AND password_hash=?", (u,h))
-            user = cur.fetchone()
-            ts   = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            cur.execute("INSERT INTO login_logs(username,login_time,status,ip_address) VALUES(?,?,?,?)",
-                        (u, ts, 'SUCCESS' if user else 'FAILED', 'localhost'))
-            con.commit(); con.close()
-            if user:
-                self.logged_in_user = {'user_id':user[0],'username':user[1],'role':user[2],'login_time':datetime.now()}
-                self.try_log_to_mysql(u,'SUCCESS')
-                self._ensure_sidebar_visible()
-                messagebox.showinfo("Success", f"Welcome, {u}!")
-                self.unlock_page('database'); self.navigate_to('database')
-            else:
-                self.try_log_to_mysql(u,'FAILED')
-                messagebox.showerror("Error","Invalid username or password")
-        except Exception as e: messagebox.showerror("Error", str(e))
+            self.auth.require_role(self.logged_in_user, *roles)
+            pw = simpledialog.askstring("Confirm", "Re-enter your password:", show='●', parent=self.root)
+            if pw is None: return False
+            self.auth.reauthenticate(self.logged_in_user['username'], pw); return True
+        except AuthError as e: messagebox.showerror("Not Allowed", str(e)); return False
 
     # ── DATABASE SETUP ────────────────────────────────────────────────────
     def show_database_page(self):
@@ -72,8 +110,12 @@ class GUIPagesMixin:
             e = tk.Entry(frm, font=('Segoe UI',11), width=width, show='●' if attr=='db_pass' else '')
             if default: e.insert(0, default)
             e.grid(row=row, column=col+1, pady=10, sticky='w'); setattr(self, attr, e)
+        _lbl(frm, "Department:", bg=self.colors['card']).grid(row=3,column=0,sticky='e',pady=10,padx=(0,20))
+        self.db_tenant = tk.Entry(frm, font=('Segoe UI',11), width=30); self.db_tenant.insert(0, self.tenant)
+        self.db_tenant.grid(row=3, column=1, pady=10, sticky='w')
+        if (self.logged_in_user or {}).get('role') != 'admin': self.db_tenant.config(state='disabled')
         self.db_status_label = tk.Label(frm, text="", font=('Segoe UI',10), bg=self.colors['card'])
-        self.db_status_label.grid(row=3, column=0, columnspan=4, pady=10)
+        self.db_status_label.grid(row=4, column=0, columnspan=4, pady=10)
         btn_row = tk.Frame(card, bg=self.colors['card']); btn_row.pack(pady=30)
         for txt,cmd,sty in [("Test Connection",self.test_db_connection,'primary'),
                              ("Save & Continue",self.save_db_and_continue,'success'),("Skip",self.skip_database,'warning')]:
@@ -94,7 +136,9 @@ class GUIPagesMixin:
         self.drop_zone.bind('<Button-1>', lambda _: self.browse_file())
 
         btn_row = tk.Frame(con, bg=self.colors['card']); btn_row.pack(pady=15)
-        self.create_button(btn_row,"Browse Files",self.browse_file,width=20).pack(side='left',padx=5)
+        self.create_button(btn_row,"Browse File",self.browse_file,width=16).pack(side='left',padx=5)
+        self.create_button(btn_row,"Merge Files",self.merge_files,width=16).pack(side='left',padx=5)
+        self.create_button(btn_row,"Merge Folder",self.merge_folder,width=16).pack(side='left',padx=5)
         self.save_to_db_btn = self.create_button(btn_row,"Save to DB",self.save_uploaded_to_database,'success',20)
         self.save_to_db_btn.pack(side='left',padx=5); self.save_to_db_btn.config(state='disabled')
         self.upload_continue_btn = self.create_button(btn_row,"Continue →",lambda:self.navigate_to('validate'),'warning',20)
@@ -108,15 +152,53 @@ class GUIPagesMixin:
         path = filedialog.askopenfilename(filetypes=[("CSV","*.csv"),("Excel","*.xlsx *.xls"),("All","*.*")])
         if not path: return
         try:
-            self.df = pd.read_csv(path) if path.endswith('.csv') else pd.read_excel(path)
-            self.file_info_label.config(text=f"✓ {os.path.basename(path)} ({len(self.df)} rows)")
-            self.unlock_page('validate')
-            if hasattr(self,'upload_continue_btn'): self.upload_continue_btn.config(state='normal')
-            if hasattr(self,'save_to_db_btn') and self.db_connection and self.db_connection.is_connected():
-                self.save_to_db_btn.config(state='normal'); self.auto_save_uploaded_data()
-            self.show_file_preview()
+            with stage('ingestion') as st:
+                self.df = read_table(path)
+                st['rows'] = len(self.df); st['bytes'] = os.path.getsize(path)
+            self._on_data_loaded(f"✓ {os.path.basename(path)} ({len(self.df)} rows)")
         except Exception as e: messagebox.showerror("Error", str(e))
 
+    def merge_files(self):
+        paths = filedialog.askopenfilenames(filetypes=[("Mark sheets","*.csv *.xlsx *.xls"),("All","*.*")])
+        if paths: self.load_merged(list(paths))
+
+    def merge_folder(self):
+        folder = filedialog.askdirectory(title="Folder of teacher mark files")
+        if folder: self.load_merged([folder])
+
+    def load_merged(self, paths):
+        """Parse many files/sheets in worker processes and merge them into self.df (with a source_file column)."""
+        self.root.config(cursor="wait"); self.file_info_label.config(text="⏳ Reading files…", fg=self.colors['text_light'])
+        def worker():
+            try:
+                with stage('ingestion') as st:
+                    df, problems = load_files(paths)
+                    st['rows'] = 0 if df is None else len(df); st['files'] = len(expand_paths(paths))
+                self.root.after(0, lambda: done(df, problems))
+            except Exception as e:
+                METRICS.error("Ingest", "merge", e)
+                self.root.after(0, lambda: (self.root.config(cursor=""), messagebox.showerror("Error", str(e))))
+        def done(df, problems):
+            self.root.config(cursor="")
+            if df is None:
+                self.file_info_label.config(text="", fg=self.colors['success'])
+                messagebox.showerror("Error", "No readable mark files found" +
+                                     "".join(f"\n• {os.path.basename(p)}: {e}" for p, e in problems[:10])); return
+            self.df = df
+            n_src = df[INGEST_SOURCE_COLUMN].nunique()
+            self._on_data_loaded(f"✓ Merged {n_src} file(s)/sheet(s) ({len(df):,} rows)")
+            if problems:
+                messagebox.showwarning("Some files skipped", "\n".join(f"• {os.path.basename(p)}: {e}" for p, e in problems[:15]))
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _on_data_loaded(self, info):
+        self.file_info_label.config(text=info, fg=self.colors['success'])
+        self.unlock_page('validate')
+        if hasattr(self,'upload_continue_btn'): self.upload_continue_btn.config(state='normal')
+        if hasattr(self,'save_to_db_btn'): self.save_to_db_btn.config(state='normal')
+        self.auto_save_uploaded_data()
+        self.show_file_preview(); self.stamp_page('upload')
+
     def show_file_preview(self):
         if self.df is None or self.df.empty: return
         for w in self.upload_preview_frame.winfo_children(): w.destroy()
@@ -157,12 +239,22 @@ class GUIPagesMixin:
         self.continue_btn.pack(side='left',padx=5); self.continue_btn.config(state='disabled')
         self.validation_summary_frame = tk.Frame(card, bg=self.colors['card'])
         self.validation_summary_frame.pack(fill='x',padx=20,pady=(0,10))
+        self.create_search_bar(card, [('valid_tree','valid_df','valid'),('error_tree','error_df','errors')])
         nb = ttk.Notebook(card); nb.pack(fill='both',expand=True,padx=20,pady=(0,20))
         self.validation_notebook = nb
         for title, attr in [("✓ Valid Records",'valid_tree'),("✗ Error Records",'error_tree')]:
             frm = tk.Frame(nb, bg='white'); nb.add(frm,text=title)
             setattr(self, attr, self.create_treeview(frm))
 
+    def refresh_validate_tables(self, stale):
+        """Cached-page refresh after fixes/late submissions: only the Valid/Error tabs and summary change."""
+        tree = getattr(self,'valid_tree',None)
+        if 'df' in stale or self.valid_df is None or self.error_df is None or tree is None or not tree.winfo_exists():
+            return False
+        if 'valid_df' in stale: self.show_in_tree('valid_tree','valid_df')
+        if 'error_df' in stale: self.show_in_tree('error_tree','error_df')
+        self.show_validation_summary(len(self.valid_df), len(self.error_df)); return True
+
     def show_validation_summary(self, valid_count, error_count):
         for w in self.validation_summary_frame.winfo_children(): w.destroy()
         bg   = '#E8F5E9' if error_count==0 else '#FFF3E0'
@@ -182,20 +274,37 @@ class GUIPagesMixin:
         self.create_page_header("Fix Errors","Correct error records and add late submissions")
         card = self.create_card(self.content_area, pady=10)
         if self.error_df is None or self.error_df.empty:
-            _lbl(card,"✓ No errors to fix!",fg=self.colors['success']).pack(pady=100); return
+            _lbl(card,"✓ No errors to fix!",fg=self.colors['success']).pack(pady=(100,20))
+            if self.can_undo(): self.create_button(card,"↶ Undo Last Fix",self.undo_last_fix,'warning',16).pack()
+            return
         ctrl = tk.Frame(card, bg=self.colors['card']); ctrl.pack(fill='x',padx=20,pady=15)
-        _lbl(ctrl,f"📝 {len(self.error_df)} errors",('Segoe UI',12,'bold'),
-             bg=self.colors['card'],fg=self.colors['danger']).pack(side='left',padx=10)
+        self.fix_errors_count_label = _lbl(ctrl,f"📝 {len(self.error_df)} errors",('Segoe UI',12,'bold'),
+                                           bg=self.colors['card'],fg=self.colors['danger'])
+        self.fix_errors_count_label.pack(side='left',padx=10)
+        for attr,txt,cmd in [('undo_btn',"↶ Undo",self.undo_last_fix),('redo_btn',"↷ Redo",self.redo_last_fix),
+                             ('undo_all_btn',"⏮ Undo All",lambda: self.undo_last_fix(everything=True))]:
+            setattr(self,attr,self.create_button(ctrl,txt,cmd,'warning',8)); getattr(self,attr).pack(side='left',padx=5)
         for txt,cmd,sty in [("🔄 Re-validate",self.revalidate_after_fixes,'warning'),
                              ("➕ Add Late",self.add_late_submission,'success'),
                              ("🔧 Fix Selected",self.fix_selected_error,'primary')]:
             self.create_button(ctrl,txt,cmd,style=sty,width=16).pack(side='right',padx=5)
+        self.create_search_bar(card, [('fix_errors_tree','error_df','errors')])
         self.fix_errors_tree = self.create_treeview(card)
-        self.populate_treeview(self.fix_errors_tree, self.error_df)
+        self.show_in_tree('fix_errors_tree','error_df')
         self.fix_errors_tree.bind('<Double-Button-1>', lambda _: self.fix_selected_error())
+        self.fix_errors_tree.bind('<Control-z>', lambda _: self.undo_last_fix())
+        self.fix_errors_tree.bind('<Control-y>', lambda _: self.redo_last_fix())
+        self.update_undo_buttons()
+
+    def refresh_fix_errors_table(self, stale):
+        """Cached-page refresh: repopulate the tree in place; False → page needs a full rebuild."""
+        tree = getattr(self,'fix_errors_tree',None)
+        if self.error_df is None or self.error_df.empty or tree is None or not tree.winfo_exists(): return False
+        self.fix_errors_count_label.config(text=f"📝 {len(self.error_df)} errors")
+        self.show_in_tree('fix_errors_tree','error_df'); self.update_undo_buttons(); return True
 
     def fix_selected_error(self):
-        if not hasattr(self,'fix_errors_tree'): return
+        if not hasattr(self,'fix_errors_tree') or not self.may_edit(): return
         sel = self.fix_errors_tree.selection()
         if not sel: messagebox.showwarning("No Selection","Select a record to fix"); return
         self.show_edit_dialog(self.fix_errors_tree.item(sel[0],'values'), list(self.error_df.columns), sel[0])
@@ -215,7 +324,7 @@ class GUIPagesMixin:
         cv.pack(side="left",fill="both",expand=True); sb.pack(side="right",fill="y")
         entries = {}
         for col,val in zip(columns,values):
-            if col=='Errors': continue
+            if col in ERROR_COLUMNS: continue
             rf = tk.Frame(sf,bg=self.colors['card']); rf.pack(fill='x',pady=5,padx=10)
             _lbl(rf,f"{col}:",('Segoe UI',10,'bold'),bg=self.colors['card'],fg=self.colors['text'],width=20,anchor='w').pack(side='left')
             e = tk.Entry(rf,font=('Segoe UI',10),width=40); e.insert(0,str(val)); e.pack(side='left',padx=10)
@@ -224,44 +333,45 @@ class GUIPagesMixin:
 
         def save():
             try:
-                data   = {c:entries[c].get() for c in columns if c!='Errors' and c in entries}
+                data   = {c:entries[c].get() for c in columns if c not in ERROR_COLUMNS and c in entries}
                 sid_c  = next((c for c in columns if 'student' in c.lower() and 'id' in c.lower()),None)
                 subj_c = next((c for c in columns if 'subject' in c.lower() and 'id' not in c.lower()),None)
                 if not sid_c or not subj_c: messagebox.showerror("Error","Missing key columns"); return
                 sid_v,subj_v = data.get(sid_c,''), data.get(subj_c,'')
                 mask = ((self.error_df[sid_c].astype(str)==str(sid_v))&(self.error_df[subj_c].astype(str)==str(subj_v)))
                 if not mask.any(): messagebox.showerror("Error","Record not found"); return
-                idx    = self.error_df[mask].index[0]
+                idx    = self.error_df[mask].index[0]; pos = int(mask.to_numpy().argmax())
                 old_err= self.error_df.at[idx,'Errors'] if 'Errors' in self.error_df.columns else ''
-                vals   = [data.get(c,'') if c!='Errors' else '' for c in columns]
+                vals   = [data.get(c,'') if c not in ERROR_COLUMNS else '' for c in columns]
                 if not self.validate_single_record(vals, columns):
                     messagebox.showwarning("Invalid","Record still has errors"); return
-                # Log changes
-                sname = None
+                if self._already_valid(data): return
+                # Changed cells (audited under the correction's id)
+                sname = None; changed = []
                 for c in columns:
-                    if c in self.error_df.columns and c!='Errors':
+                    if c in self.error_df.columns and c not in ERROR_COLUMNS:
                         old_v = self.error_df.at[idx,c]; new_v = data.get(c,old_v)
                         if 'name' in c.lower(): sname = new_v
-                        if str(old_v)!=str(new_v):
-                            self.log_fixed_error(sid_v,sname or"Unknown",subj_v,c,old_v,new_v,old_err)
-                # Move to valid_df
-                self.error_df = self.error_df.drop(idx).reset_index(drop=True)
+                        if str(old_v)!=str(new_v): changed.append((c,old_v,new_v))
+                cells = [(sid_v,sname or "Unknown",subj_v,c,old_v,new_v,old_err) for c,old_v,new_v in changed]
+                # Move to valid_df as one undoable correction
                 new_row = {}
                 for c in columns:
-                    if c=='Errors' or c not in self.valid_df.columns: continue
+                    if c in ERROR_COLUMNS or c not in self.valid_df.columns: continue
                     v = data.get(c,''); dt = str(self.valid_df[c].dtype)
-                    try: new_row[c] = (int(float(v)) if 'int' in dt else float(v) if 'float' in dt else str(v))
+                    try: new_row[c] = (int(float(v)) if 'int' in dt else float(v) if 'float' in dt or 'double' in dt else str(v))
                     except: new_row[c] = v
-                self.valid_df = pd.concat([self.valid_df,pd.DataFrame([new_row])],ignore_index=True)
+                self.apply_correction(f"fix {sid_v} / {subj_v}", [pos], pd.DataFrame([new_row]), cells)
                 dlg.destroy()
                 messagebox.showinfo("Saved",f"✓ Fixed!\nValid: {len(self.valid_df)}  Errors: {len(self.error_df)}")
-                self.show_fix_errors_page()
+                self.show_page('fix_errors')
             except Exception as e: traceback.print_exc(); messagebox.showerror("Error",str(e))
 
         self.create_button(br,"💾 Save",save,'success',15).pack(side='left',padx=10)
         self.create_button(br,"❌ Cancel",dlg.destroy,'danger',15).pack(side='left',padx=10)
 
     def add_late_submission(self):
+        if not self.may_edit(): return
         if self.valid_df is None or self.valid_df.empty:
             messagebox.showerror("Error","Upload data first"); return
         cols = [c for c in self.valid_df.columns if c!='Errors']
@@ -283,12 +393,24 @@ class GUIPagesMixin:
         def save():
             rec = {c:entries[c].get() for c in cols}
             if self.validate_single_record([rec[c] for c in cols],cols):
-                self.valid_df = pd.concat([self.valid_df,pd.DataFrame([rec])],ignore_index=True)
+                if self._already_valid(rec): return
+                self.apply_correction(f"late submission {' / '.join(str(v) for v in list(rec.values())[:2])}",
+                                      added=pd.DataFrame([rec]))
                 messagebox.showinfo("Success","✓ Late submission added!"); dlg.destroy()
             else: messagebox.showerror("Invalid","Enter valid data for all fields")
         self.create_button(br,"💾 Add",save,'success',15).pack(side='left',padx=10)
         self.create_button(br,"❌ Cancel",dlg.destroy,'danger',15).pack(side='left',padx=10)
 
+    def _already_valid(self, record):
+        """Refuse a row whose (student, subject) already has a valid mark; results keep only one mark per pair."""
+        hit = self.valid_rows_for(record)
+        if not len(hit): return False
+        cols = self.valid_df.columns; row = self.valid_df.iloc[int(hit[0])]
+        mark = next((row[c] for c in cols if 'marks' in c.lower() and 'max' not in c.lower()), '?')
+        messagebox.showerror("Duplicate", f"{record[detect_columns(list(cols))[0]]} / {record[subject_column(cols)]} already has a valid mark "
+                             f"({mark}).\nCorrect the student or subject, or leave this row with the errors.")
+        return True
+
     def revalidate_after_fixes(self):
         if messagebox.askyesno("Refresh","Refresh Valid/Error tabs with fixes?"):
             self.navigate_to('validate')
@@ -296,11 +418,11 @@ class GUIPagesMixin:
 
     def refresh_validation_display(self):
         self.root.config(cursor="wait")
-        self.populate_treeview(self.valid_tree, self.valid_df)
-        self.populate_treeview(self.error_tree, self.error_df)
+        self.show_in_tree('valid_tree','valid_df'); self.show_in_tree('error_tree','error_df')
         self.root.config(cursor="")
         self.show_validation_summary(len(self.valid_df), len(self.error_df))
         if hasattr(self,'validation_notebook'): self.validation_notebook.select(0)
+        self.stamp_page('validate')
         messagebox.showinfo("Refreshed",f"Valid: {len(self.valid_df)}  Errors: {len(self.error_df)}")
 
     # ── PENDING ───────────────────────────────────────────────────────────
@@ -325,14 +447,16 @@ class GUIPagesMixin:
             self.create_button(br,"📥 Export",self.export_pending_list,'primary',14).pack(side='left',padx=5)
         self.create_button(br,"Reports →",lambda:self.navigate_to('reports'),'success',14).pack(side='left',padx=5)
         if has_pending:
+            self.create_search_bar(card, [('pending_tree','pending_df','records')])
             self.pending_tree = self.create_treeview(card)
-            self.populate_treeview(self.pending_tree, self.pending_df)
+            self.show_in_tree('pending_tree','pending_df')
         else:
             ef = tk.Frame(card,bg='white',height=200); ef.pack(fill='both',expand=True,padx=20,pady=20)
             _lbl(ef,"🎉",('Segoe UI',48),bg='white').pack(pady=(40,10))
             _lbl(ef,"All Students Complete!",('Segoe UI',16,'bold'),bg='white',fg=self.colors['success']).pack()
 
     def export_pending_list(self):
+        if not self.may_edit(): return
         if self.pending_df is None or self.pending_df.empty: messagebox.showinfo("Info","No pending students"); return
         f = filedialog.asksaveasfilename(defaultextension=".xlsx",filetypes=[("Excel","*.xlsx")],initialfile="pending_students.xlsx")
         if f:
@@ -352,7 +476,9 @@ class GUIPagesMixin:
         self.results_continue_btn.pack(side='left',padx=5); self.results_continue_btn.config(state='disabled')
         self.results_summary_frame = tk.Frame(card,bg=self.colors['card'])
         self.results_summary_frame.pack(fill='x',padx=20,pady=(0,10))
+        self.create_search_bar(card, [('results_tree','results_df','students')])
         self.results_tree = self.create_treeview(card)
+        if self.results_df is not None: self.show_in_tree('results_tree','results_df')
 
     def show_results_summary(self, total_count):
         for w in self.results_summary_frame.winfo_children(): w.destroy()
@@ -391,6 +517,8 @@ class GUIPagesMixin:
             ("📋 Individual Marksheets (PDF)","Generate PDF for each student",self.generate_individual_marksheets,'success'),
             ("📄 Summary Report","Overall statistics",self.generate_summary_report,'primary'),
             ("❌ Failed Students Report","List of failed students",self.generate_failed_report,'danger'),
+            ("🏆 Merit List (Excel)","Top-ranked students per section",self.export_merit_list,'success'),
+            ("🌐 Result Lookup Site","Static site for any web server or CDN",self.export_result_site,'primary'),
             ("💾 Export All Reports","Generate all reports at once",self.export_all_reports,'warning')]:
             row = tk.Frame(con,bg=self.colors['card']); row.pack(pady=10)
             self.create_button(row,txt,cmd,style=sty,width=35).pack()
@@ -400,27 +528,158 @@ class GUIPagesMixin:
     def show_fixed_history_page(self):
         self.create_page_header("Fixed Errors History","Audit trail of corrections")
         card = self.create_card(self.content_area, pady=10)
+        if getattr(self,'events',None): self.events.flush()
+        self.history_filters = {}; self._history_cursors = [None]; self._history_next = None
+        sr = tk.Frame(card,bg=self.colors['card']); sr.pack(fill='x',padx=20,pady=15)
+        self.history_filter_vars = {}
+        for key,text in [('student','Student ID'),('user','Fixed By'),('date_from','From (YYYY-MM-DD)'),('date_to','To')]:
+            _lbl(sr,text,('Segoe UI',9),bg=self.colors['card'],fg=self.colors['text_light']).pack(side='left',padx=(10,4))
+            self.history_filter_vars[key] = var = tk.StringVar()
+            tk.Entry(sr,textvariable=var,width=12,font=('Segoe UI',10)).pack(side='left')
+        self.create_button(sr,"🔍 Apply",self.apply_history_filters,'primary',8).pack(side='left',padx=(15,5))
+        self.create_button(sr,"✖ Clear",lambda: self.apply_history_filters(clear=True),'warning',8).pack(side='left')
+        self.create_button(sr,"💾 Export to Excel",self.export_fixed_history,'success',18).pack(side='right',padx=10)
+        frm = tk.Frame(card,bg=self.colors['card']); frm.pack(fill='both',expand=True,padx=20,pady=10)
+        ys  = tk.Scrollbar(frm); ys.pack(side='right',fill='y')
+        xs  = tk.Scrollbar(frm,orient='horizontal'); xs.pack(side='bottom',fill='x')
+        self.history_tree = ttk.Treeview(frm,yscrollcommand=ys.set,xscrollcommand=xs.set,selectmode='browse',height=20)
+        self.history_tree.pack(fill='both',expand=True)
+        ys.config(command=self.history_tree.yview); xs.config(command=self.history_tree.xview)
+        cols = ('Fix ID','Student ID','Name','Subject','Field','Old','New','Error','Fixed By','Date','Correction')
+        self.history_tree['columns'] = cols; self.history_tree['show'] = 'headings'
+        widths = {'Fix ID':60,'Student ID':100,'Name':150,'Subject':100,'Field':120,'Old':100,'New':100,'Error':250,'Fixed By':100,'Date':150,'Correction':110}
+        for c in cols: self.history_tree.heading(c,text=c); self.history_tree.column(c,width=widths.get(c,100))
+        self.history_tree.tag_configure('evenrow',background='#F5F5F5')
+        nav = tk.Frame(card,bg=self.colors['card']); nav.pack(fill='x',padx=20,pady=(0,10))
+        self.history_prev_btn = self.create_button(nav,"◀ Newer",lambda: self.load_history_page(-1),'primary',10)
+        self.history_prev_btn.pack(side='left')
+        self.history_next_btn = self.create_button(nav,"Older ▶",lambda: self.load_history_page(1),'primary',10)
+        self.history_next_btn.pack(side='right')
+        self.history_page_label = _lbl(nav,"",('Segoe UI',11,'bold'),bg=self.colors['card'],fg=self.colors['primary'])
+        self.history_page_label.pack(expand=True)
+        self.load_history_page()
+
+    def apply_history_filters(self, clear=False):
+        if clear:
+            for v in self.history_filter_vars.values(): v.set('')
+        filters = {k: v.get().strip() for k,v in self.history_filter_vars.items() if v.get().strip()}
+        for k in ('date_from','date_to'):
+            try:
+                if k in filters: datetime.strptime(filters[k],'%Y-%m-%d')
+            except ValueError: messagebox.showerror("Error",f"'{filters[k]}' is not a YYYY-MM-DD date"); return
+        self.history_filters = filters; self._history_cursors = [None]; self.load_history_page()
+
+    def load_history_page(self, step=0):
+        """Show the page after (step=1) / before (step=-1) / at (step=0) the current keyset cursor."""
+        if step > 0 and self._history_next: self._history_cursors.append(self._history_next)
+        elif step < 0 and len(self._history_cursors) > 1: self._history_cursors.pop()
+        try: rows, more = fetch_page(self.tenant, self.history_filters, self._history_cursors[-1])
+        except Exception as e: messagebox.showerror("Error",str(e)); return
+        self._history_next = page_key(rows[-1]) if rows and more else None
+        self.history_tree.delete(*self.history_tree.get_children())
+        for i,fix in enumerate(rows):
+            self.history_tree.insert('','end',values=fix,tags=('evenrow' if i%2==0 else '',))
+        page = len(self._history_cursors); first = (page-1)*HISTORY_PAGE_SIZE + 1
+        self.history_page_label.config(text=f"📋 Page {page} · fixes {first:,}–{first+len(rows)-1:,}" if rows else
+                                       "📋 No fixes recorded yet" if not self.history_filters else "📋 No fixes match the filters")
+        self.history_prev_btn.config(state='normal' if page > 1 else 'disabled')
+        self.history_next_btn.config(state='normal' if more else 'disabled')
+
+    # ── USERS ─────────────────────────────────────────────────────────────
+    def show_users_page(self):
+        self.create_page_header("Manage Users","Operators, roles and account lockouts")
+        card = self.create_card(self.content_area, pady=10)
+        ctrl = tk.Frame(card,bg=self.colors['card']); ctrl.pack(fill='x',padx=20,pady=15)
+        for txt,cmd,sty in [("➕ Add User",self.add_user,'success'),("🔑 Reset Password",self.reset_user_password,'primary'),
+                             ("🎭 Change Role",self.change_user_role,'primary'),("🔓 Unlock",self.unlock_user,'warning'),
+                             ("🗑 Delete",self.delete_user,'danger')]:
+            self.create_button(ctrl,txt,cmd,style=sty,width=14).pack(side='left',padx=5)
+        self.users_tree = self.create_treeview(card)
+        self.populate_treeview(self.users_tree, pd.DataFrame(self.auth.list_users(),
+            columns=['ID','Username','Role','Department','Active','Failed','Locked Until','Last Login','Created']))
+
+    def _selected_username(self):
+        sel = self.users_tree.selection() if getattr(self,'users_tree',None) else ()
+        if not sel: messagebox.showwarning("No Selection","Select a user"); return None
+        return self.users_tree.item(sel[0],'values')[1]
+
+    def _user_action(self, fn, *args):
+        try: fn(*args); self.show_users_page()
+        except AuthError as e: messagebox.showerror("Error", str(e))
+
+    def add_user(self):
+        u = simpledialog.askstring("Add User","Username:",parent=self.root)
+        if not u: return
+        p = simpledialog.askstring("Add User","Password:",show='●',parent=self.root)
+        r = simpledialog.askstring("Add User",f"Role ({' / '.join(ROLES)}):",initialvalue='operator',parent=self.root)
+        d = simpledialog.askstring("Add User","Department:",initialvalue=self.tenant,parent=self.root)
+        if p and r and d is not None and self.confirm_privileged('admin'):
+            self._user_action(self.auth.create_user, u.strip(), p, r.strip(), normalize_tenant(d))
+
+    def reset_user_password(self):
+        u = self._selected_username()
+        p = u and simpledialog.askstring("Reset Password",f"New password for {u}:",show='●',parent=self.root)
+        if p and self.confirm_privileged('admin'): self._user_action(self.auth.set_password, u, p)
+
+    def change_user_role(self):
+        u = self._selected_username()
+        r = u and simpledialog.askstring("Change Role",f"Role for {u} ({' / '.join(ROLES)}):",parent=self.root)
+        if r and self.confirm_privileged('admin'): self._user_action(self.auth.set_role, u, r.strip())
+
+    def unlock_user(self):
+        u = self._selected_username()
+        if u and self.confirm_privileged('admin'): self._user_action(self.auth.unlock, u)
+
+    def delete_user(self):
+        u = self._selected_username()
+        if u and messagebox.askyesno("Delete",f"Delete user '{u}'?") and self.confirm_privileged('admin'):
+            self._user_action(self.auth.delete_user, u)
+
+    # ── DIAGNOSTICS ───────────────────────────────────────────────────────
+    def show_diagnostics_page(self):
+        self.create_page_header("Diagnostics","Stage timings, in-flight work, DB round-trips and recent errors")
+        card = self.create_card(self.content_area, pady=10)
+        ctrl = tk.Frame(card,bg=self.colors['card']); ctrl.pack(fill='x',padx=20,pady=15)
+        self.diag_status = _lbl(ctrl,"",('Segoe UI',11,'bold'),bg=self.colors['card'],fg=self.colors['text'])
+        self.diag_status.pack(side='left',padx=10)
+        prof = '*' in METRICS.profile_stages
+        for txt,cmd,sty in [("💾 Save Snapshot",self.save_metrics_snapshot,'success'),
+                             ("⏹ Stop Profiling" if prof else "⏺ Profile All Stages",self.toggle_stage_profiling,'warning'),
+                             ("🧹 Reset",lambda: (METRICS.reset(), self.refresh_diagnostics()),'danger')]:
+            self.create_button(ctrl,txt,cmd,style=sty,width=18).pack(side='right',padx=5)
+        nb = ttk.Notebook(card); nb.pack(fill='both',expand=True,padx=20,pady=(0,20))
+        for title, attr in [("Stages",'diag_stages_tree'),("In Flight",'diag_inflight_tree'),
+                            ("Counters",'diag_counters_tree'),("Recent Runs",'diag_recent_tree'),("Errors",'diag_errors_tree')]:
+            frm = tk.Frame(nb,bg='white'); nb.add(frm,text=title); setattr(self, attr, self.create_treeview(frm))
+        self.refresh_diagnostics()
+
+    def refresh_diagnostics(self):
+        if self.current_page != 'diagnostics' or not getattr(self,'diag_stages_tree',None): return
+        try:
+            if not self.diag_stages_tree.winfo_exists(): return
+        except tk.TclError: return
+        snap = METRICS.snapshot()
+        stages = pd.DataFrame([{'Stage': k, 'Runs': v['count'], 'Last (s)': round(v['last'],3), 'Avg (s)': round(v['avg'],3),
+                                'Max (s)': round(v['max'],3), 'Rows': v['rows'],
+                                'Rows/s': int(v['rows']/v['sum']) if v['sum'] else 0, 'Failures': v['errors']}
+                               for k, v in sorted(snap['stages'].items())])
+        counters = pd.DataFrame([{'Counter': c['name'], 'Labels': ', '.join(f"{k}={v}" for k,v in c['labels'].items()),
+                                  'Value': c['value']} for c in snap['counters']])
+        for tree, df in [(self.diag_stages_tree, stages), (self.diag_inflight_tree, pd.DataFrame(snap['inflight'])),
+                         (self.diag_counters_tree, counters), (self.diag_recent_tree, pd.DataFrame(snap['recent'][::-1])),
+                         (self.diag_errors_tree, pd.DataFrame(snap['errors'][::-1]))]:
+            self.populate_treeview(tree, df)
+        self.diag_status.config(text=f"🩺 {len(snap['inflight'])} running  •  {len(snap['errors'])} recent errors  •  {snap['generated']}")
+        if getattr(self,'_diag_after',None): self.root.after_cancel(self._diag_after)
+        self._diag_after = self.root.after(2000, self.refresh_diagnostics)
+
+    def save_metrics_snapshot(self):
         try:
-            con = sqlite3.connect(SQLITE_DB_FILE); cur = con.cursor()
-            cur.execute("SELECT fix_id,student_id,student_name,subject,field_name,"
-                        "old_value,new_value,error_message,fixed_by,fixed_at FROM fixed_errors ORDER BY fixed_at DESC")
-            fixes = cur.fetchall(); con.close()
-            if not fixes:
-                _lbl(card,"📋 No fixes recorded yet",fg=self.colors['text_light']).pack(pady=100); return
-            sr = tk.Frame(card,bg=self.colors['card']); sr.pack(fill='x',padx=20,pady=15)
-            _lbl(sr,f"📋 {len(fixes)} fixes",('Segoe UI',12,'bold'),bg=self.colors['card'],fg=self.colors['primary']).pack(side='left',padx=10)
-            self.create_button(sr,"💾 Export to Excel",self.export_fixed_history,'success',18).pack(side='right',padx=10)
-            frm = tk.Frame(card,bg=self.colors['card']); frm.pack(fill='both',expand=True,padx=20,pady=10)
-            ys  = tk.Scrollbar(frm); ys.pack(side='right',fill='y')
-            xs  = tk.Scrollbar(frm,orient='horizontal'); xs.pack(side='bottom',fill='x')
-            self.history_tree = ttk.Treeview(frm,yscrollcommand=ys.set,xscrollcommand=xs.set,selectmode='browse',height=20)
-            self.history_tree.pack(fill='both',expand=True)
-            ys.config(command=self.history_tree.yview); xs.config(command=self.history_tree.xview)
-            cols = ('Fix ID','Student ID','Name','Subject','Field','Old','New','Error','Fixed By','Date')
-            self.history_tree['columns'] = cols; self.history_tree['show'] = 'headings'
-            widths = {'Fix ID':60,'Student ID':100,'Name':150,'Subject':100,'Field':120,'Old':100,'New':100,'Error':250,'Fixed By':100,'Date':150}
-            for c in cols: self.history_tree.heading(c,text=c); self.history_tree.column(c,width=widths.get(c,100))
-            self.history_tree.tag_configure('evenrow',background='#F5F5F5')
-            for i,fix in enumerate(fixes):
-                self.history_tree.insert('','end',values=fix,tags=('evenrow' if i%2==0 else '',))
-        except Exception as e: messagebox.showerror("Error",str(e))
+            METRICS.flush_to_file()
+            messagebox.showinfo("Saved", f"✓ metrics.json / metrics.prom written to\n{os.path.abspath(METRICS_DIR)}")
+        except OSError as e: messagebox.showerror("Error", str(e))
+
+    def toggle_stage_profiling(self):
+        if '*' in METRICS.profile_stages: METRICS.profile_stages.discard('*'); METRICS.trace_memory = False
+        else: METRICS.profile_stages.add('*'); METRICS.trace_memory = True
+        self.show_diagnostics_page()
@@ -0,0 +1,74 @@
+# pylint: disable=all
+"""history.py – Keyset-paginated, filtered reads of the fixed_errors audit trail.
+
+Pages are ordered newest first by (fixed_at, fix_id). The next page starts strictly below the last row
+shown, so opening page 1 or page 5,000 costs one index range scan of HISTORY_PAGE_SIZE rows. An OFFSET
+would walk every row it skips. Exports stream the same query through fetchmany.
+"""
+
+import sqlite3
+from config import SQLITE_DB_FILE, HISTORY_PAGE_SIZE, HISTORY_EXPORT_CHUNK
+
+HISTORY_COLUMNS = ('fix_id', 'student_id', 'student_name', 'subject', 'field_name',
+                   'old_value', 'new_value', 'error_message', 'fixed_by', 'fixed_at', 'correction_id')
+HISTORY_INDEXES = {'idx_fixed_errors_time':    '(tenant, fixed_at)',
+                   'idx_fixed_errors_student': '(tenant, student_id, fixed_at)',
+                   'idx_fixed_errors_user':    '(tenant, fixed_by, fixed_at)'}
+
+
+def ensure_indexes(cur):
+    """Every index leads with tenant (all reads are tenant-scoped) and ends with fixed_at; fix_id is the rowid,
+    which SQLite appends to each index, so the keyset order is served without a sort."""
+    for name, cols in HISTORY_INDEXES.items(): cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON fixed_errors{cols}")
+
+
+def _where(tenant, student=None, user=None, date_from=None, date_to=None):
+    """→ (WHERE clause, params). Dates are 'YYYY-MM-DD'; date_to is inclusive."""
+    sql, params = ["tenant=?"], [tenant]
+    if student:   sql.append("student_id=?");               params.append(str(student).strip())
+    if user:      sql.append("fixed_by=?");                 params.append(str(user).strip())
+    if date_from: sql.append("fixed_at>=?");                params.append(str(date_from).strip())
+    if date_to:   sql.append("fixed_at<date(?,'+1 day')");  params.append(str(date_to).strip())
+    return " WHERE " + " AND ".join(sql), params
+
+
+def _select(where):
+    return f"SELECT {','.join(HISTORY_COLUMNS)} FROM fixed_errors{where}"
+
+
+def fetch_page(tenant, filters=None, after=None, limit=HISTORY_PAGE_SIZE, db_file=SQLITE_DB_FILE):
+    """One page newest first → (rows, more). `after` = (fixed_at, fix_id) of the last row of the previous page."""
+    where, params = _where(tenant, **(filters or {}))
+    if after: where += " AND (fixed_at, fix_id) < (?, ?)"; params += list(after)
+    con = sqlite3.connect(db_file)
+    try: rows = con.execute(_select(where) + " ORDER BY fixed_at DESC, fix_id DESC LIMIT ?", params + [limit + 1]).fetchall()
+    finally: con.close()
+    return rows[:limit], len(rows) > limit
+
+
+def page_key(row):
+    """Keyset cursor of a fetched row."""
+    return row[HISTORY_COLUMNS.index('fixed_at')], row[0]
+
+
+def iter_history(tenant, filters=None, chunksize=HISTORY_EXPORT_CHUNK, db_file=SQLITE_DB_FILE):
+    """Yield every matching row newest first, `chunksize` rows at a time off one cursor."""
+    where, params = _where(tenant, **(filters or {}))
+    con = sqlite3.connect(db_file)
+    try:
+        cur = con.execute(_select(where) + " ORDER BY fixed_at DESC, fix_id DESC", params)
+        while True:
+            rows = cur.fetchmany(chunksize)
+            if not rows: break
+            yield rows
+    finally: con.close()
+
+
+def history_stamp(tenant, filters=None, db_file=SQLITE_DB_FILE):
+    """(matching rows, highest fix_id): changes whenever a matching fix is logged. (0, None) without the table."""
+    where, params = _where(tenant, **(filters or {}))
+    try:
+        con = sqlite3.connect(db_file)
+        try: return tuple(con.execute(f"SELECT COUNT(*), MAX(fix_id) FROM fixed_errors{where}", params).fetchone())
+        finally: con.close()
+    except sqlite3.Error: return 0, None
@@ -0,0 +1,92 @@
+# pylint: disable=all
+"""ingest.py – Multi-file ingestion: parse many teacher sheets in parallel and merge them into one frame.
+
+Every file (and every sheet of a workbook) is parsed in a worker process, its columns are mapped onto
+the canonical names through the same role heuristics validation uses, and the pieces are concatenated
+with a provenance column naming the file/sheet each row came from.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pandas as pd
+from config import INGEST_EXTENSIONS, INGEST_WORKERS, INGEST_SOURCE_COLUMN
+from logic import detect_columns, subject_column
+from readers import read_csv, read_excel
+
+CANONICAL = ('student_id', 'student_name', 'roll_no', 'subject', 'marks_obtained', 'max_marks')
+
+
+def expand_paths(paths):
+    """Files as given plus every supported file below any folder; Office lock files (~$…) skipped."""
+    out = []
+    for p in paths:
+        if os.path.isdir(p):
+            for root, dirs, files in os.walk(p):
+                dirs.sort()
+                out += [os.path.join(root, f) for f in sorted(files)
+                        if f.lower().endswith(INGEST_EXTENSIONS) and not f.startswith('~$')]
+        elif p.lower().endswith(INGEST_EXTENSIONS): out.append(p)
+    return list(dict.fromkeys(out))
+
+
+def _key_column(s):
+    """IDs as trimmed strings: 101, 101.0 and ' 101' from different files must compare equal."""
+    if pd.api.types.is_float_dtype(s) and (s.dropna() % 1 == 0).all(): s = s.astype('Int64')
+    return s.astype(str).str.strip().where(s.notna())
+
+
+def align_frame(df, subject_hint=None):
+    """Rename role columns to CANONICAL names. A per-subject sheet without a subject column (one marks
+    column, e.g. 'Physics.xlsx') gets its subject from subject_hint."""
+    sid, sname, roll, marks = detect_columns(list(df.columns))
+    subj = subject_column(df.columns)
+    ren  = {c: n for c, n in [(sid, 'student_id'), (sname, 'student_name'), (roll if roll != sid else None, 'roll_no'),
+                              (subj, 'subject')] if c}
+    if len(marks) == 1:
+        ren[marks[0]] = 'marks_obtained'
+        maxc = next((c for c in df.columns if 'max' in c.lower() and 'marks' in c.lower()), None)
+        if maxc: ren[maxc] = 'max_marks'
+    df = df.rename(columns=ren)
+    if not subj and len(marks) == 1 and subject_hint: df.insert(min(3, len(df.columns)), 'subject', subject_hint)
+    for c in ('student_id', 'roll_no'):
+        if c in df.columns: df[c] = _key_column(df[c])
+    return df
+
+
+def read_aligned(path):
+    """Worker: one file → [(source label, aligned frame)], one entry per non-empty sheet."""
+    base, stem = os.path.basename(path), os.path.splitext(os.path.basename(path))[0]
+    if path.lower().endswith('.csv'): sheets = {stem: read_csv(path)}
+    else: sheets = read_excel(path, sheet_name=None)
+    multi = len(sheets) > 1
+    return [(f"{base}:{name}" if multi else base, align_frame(df.dropna(how='all'), name if multi else stem))
+            for name, df in sheets.items() if not df.dropna(how='all').empty]
+
+
+def load_files(paths, workers=INGEST_WORKERS):
+    """Parse and merge → (frame or None, [(path, error)]). Unreadable files are reported, not fatal."""
+    files = expand_paths(paths); parts, problems = {}, []
+    n = min(workers or os.cpu_count() or 1, len(files))
+    if n > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=n) as ex:
+                futures = {p: ex.submit(read_aligned, p) for p in files}
+                for p, fut in futures.items():
+                    try: parts[p] = fut.result()
+                    except BrokenProcessPool: raise
+                    except Exception as e: problems.append((p, str(e)))
+        except (BrokenProcessPool, OSError) as e:   # no fork/spawn available – parse in-process instead
+            print(f"[Ingest] process pool unavailable ({e}); parsing serially")
+            parts, problems = {}, []
+    for p in files:
+        if p in parts or any(p == q for q, _ in problems): continue
+        try: parts[p] = read_aligned(p)
+        except Exception as e: problems.append((p, str(e)))
+    frames = [df.assign(**{INGEST_SOURCE_COLUMN: label}) for p in files for label, df in parts.get(p, [])]
+    if not frames: return None, problems
+    out  = pd.concat(frames, ignore_index=True, sort=False)
+    cols = [c for c in CANONICAL if c in out.columns]
+    out  = out[cols + [c for c in out.columns if c not in cols]]
+    out[INGEST_SOURCE_COLUMN] = out[INGEST_SOURCE_COLUMN].astype('category')
+    return out, problems
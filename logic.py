@@ -2,9 +2,63 @@
 """logic.py – Validation, result calculation, and pending student detection."""
 
 import threading, traceback
+import numpy as np
 import pandas as pd
 from tkinter import messagebox
-from config import EXPECTED_SUBJECTS
+from config import DEFAULT_TENANT, ERROR_CODES, SQLITE_DB_FILE
+from tenancy import tenant_slot
+from metrics import METRICS, timed
+from ranking import rank_results, section_column
+from catalogue import DEFAULT_PROGRAMME, assess, infer_programme, key_codes, load_programmes
+
+ERROR_COLUMNS = ('Errors', 'ErrorCode')   # validation metadata on error_df, never part of a record
+
+
+def detect_columns(columns):
+    """Column-role heuristics: (sid, sname, roll, marks_cols) for a column layout."""
+    col_map = {c.lower().strip().replace(' ','').replace('_','').replace('-',''): c for c in columns}
+    sid   = next((col_map[p] for p in ['studentid','studentnumber','id','rollnumber','enrollment'] if p in col_map), None)
+    sname = next((col_map[p] for p in ['studentname','name','fullname','student'] if p in col_map), None)
+    roll  = next((col_map[p] for p in ['rollno','rollnumber','roll','enrollmentno'] if p in col_map and col_map[p]!=sid), sid)
+    marks_cols = [c for c in columns if 'marks' in c.lower() and 'max' not in c.lower() and c not in (sid, sname, roll)]
+    return sid, sname, roll, marks_cols
+
+
+def subject_column(columns):
+    return next((c for c in columns if 'subject' in c.lower() and 'id' not in c.lower()), None)
+
+
+def classify_errors(error_df):
+    """Vectorized (bitmask, primary label, 'CODE,CODE' names) Series for an error frame."""
+    if 'ErrorCode' in error_df.columns:
+        code = pd.to_numeric(error_df['ErrorCode'], errors='coerce').fillna(0).astype('int64').to_numpy()
+    else:   # frames from before error codes (old checkpoints): derive from the message text
+        txt  = error_df['Errors'].astype(str).str.lower() if 'Errors' in error_df.columns else pd.Series('', index=error_df.index)
+        code = np.zeros(len(error_df), dtype='int64')
+        for bit, _, pat in ERROR_CODES.values(): code |= np.where(txt.str.contains(pat, regex=True), bit, 0)
+    hits  = [(code & bit) != 0 for bit, _, _ in ERROR_CODES.values()]
+    label = np.select(hits, [lbl for _, lbl, _ in ERROR_CODES.values()], default='Validation Error')
+    names = pd.Series('', index=error_df.index)
+    for name, hit in zip(ERROR_CODES, hits): names = names + np.where(hit, name + ',', '')
+    return (pd.Series(code, index=error_df.index), pd.Series(label, index=error_df.index), names.str.rstrip(','))
+
+
+def find_duplicate_marks(keys, values):
+    """One hashed pass over (student, subject) keys → (duplicate, conflict) boolean arrays.
+
+    duplicate – repeat of an earlier row with identical marks (first copy stays valid)
+    conflict  – every row of a key that was entered with more than one distinct mark
+    """
+    kh  = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    dup = pd.Series(kh).duplicated(keep=False).to_numpy()
+    if not dup.any(): return dup, dup
+    idx = np.flatnonzero(dup)                       # only keys seen twice or more go through the groupby
+    vh  = pd.util.hash_pandas_object(values.iloc[idx], index=False).to_numpy()
+    sub = pd.DataFrame({'k': kh[idx], 'v': vh})
+    conflict = np.zeros(len(kh), dtype=bool); duplicate = np.zeros(len(kh), dtype=bool)
+    conflict[idx]  = (sub.groupby('k')['v'].transform('nunique') > 1).to_numpy()
+    duplicate[idx] = ~conflict[idx] & sub.duplicated(['k', 'v']).to_numpy()
+    return duplicate, conflict
 
 
 class LogicMixin:
@@ -32,50 +86,67 @@ class LogicMixin:
         self.root.config(cursor="wait"); self.root.update_idletasks()
         def worker():
             try:
-                self.perform_validation_fast()
+                with tenant_slot(self.tenant): self.perform_validation_fast()
                 self.root.after(0, self.on_validation_complete)
             except Exception as e:
                 self.root.after(0, lambda: messagebox.showerror("Error", str(e)))
                 self.root.after(0, lambda: self.root.config(cursor=""))
         threading.Thread(target=worker, daemon=True).start()
 
-    def perform_validation_fast(self):
+    def _validation_columns(self, columns):
+        """detect_columns(), cached per department since uploads repeat layouts."""
+        return self.tenant_cache().get_or_compute(('validation_columns', tuple(columns)), lambda: detect_columns(columns))
+
+    @timed('validation', rows=lambda self, *a, **kw: len(self.df))
+    def perform_validation_fast(self, detect_pending=True):
+        """Split self.df into valid_df / error_df; detect_pending=False leaves pending detection to the caller."""
         # Column detection
-        col_map = {c.lower().strip().replace(' ','').replace('_','').replace('-',''): c for c in self.df.columns}
-        sid   = next((col_map[p] for p in ['studentid','studentnumber','id','rollnumber','enrollment'] if p in col_map), None)
-        sname = next((col_map[p] for p in ['studentname','name','fullname','student'] if p in col_map), None)
-        roll  = next((col_map[p] for p in ['rollno','rollnumber','roll','enrollmentno'] if p in col_map and col_map[p]!=sid), sid)
+        sid, sname, roll, marks_cols = self._validation_columns(list(self.df.columns))
         missing = [l for l,v in [("Student ID",sid),("Student Name",sname),("Roll No",roll)] if not v]
         if missing: raise Exception(f"Missing columns: {', '.join(missing)}")  # pylint: disable=broad-exception-raised
 
-        marks_cols = [c for c in self.df.columns if 'marks' in c.lower() and 'max' not in c.lower()
-                      and c not in (sid, sname, roll)]
-        err = pd.Series(False, index=self.df.index)
-        msg = pd.Series('',    index=self.df.index)
+        err  = pd.Series(False, index=self.df.index)
+        msg  = pd.Series('',    index=self.df.index)
+        code = np.zeros(len(self.df), dtype='int64')
 
-        for col, lbl in [(sid,"Missing Student ID; "),(sname,"Missing Student Name; "),(roll,"Missing Roll No; ")]:
-            m = self.df[col].isna(); err |= m; msg[m] += lbl
+        for col, lbl, c in [(sid,"Missing Student ID; ",'MISSING_ID'),(sname,"Missing Student Name; ",'MISSING_NAME'),
+                            (roll,"Missing Roll No; ",'MISSING_ROLL')]:
+            m = self.df[col].isna(); err |= m; msg[m] += lbl; code |= np.where(m, ERROR_CODES[c][0], 0)
 
+        numeric = {}
         for mc in marks_cols:
-            mn  = pd.to_numeric(self.df[mc], errors='coerce')
+            mn  = numeric[mc] = pd.to_numeric(self.df[mc], errors='coerce').astype('float64')   # Arrow NaN ≠ NA
             base = mc.lower().replace('marks','').replace('_','').replace(' ','').strip()
             maxc = next((c for c in self.df.columns if base in c.lower().replace('_','').replace(' ','') and 'max' in c.lower()), None)
-            maxv = pd.to_numeric(self.df[maxc], errors='coerce').fillna(100) if maxc else 100
-            miss = mn.isna(); neg = (mn<0)&~mn.isna(); over = (mn>maxv)&~mn.isna()
-            err |= miss|neg|over
-            msg[miss] += f"Missing {mc}; "; msg[neg] += f"Negative {mc}; "; msg[over] += f"Exceeds max {mc}; "
+            maxv = pd.to_numeric(self.df[maxc], errors='coerce').astype('float64').fillna(100) if maxc else 100
+            miss = self.df[mc].isna(); nonnum = mn.isna()&~miss; neg = (mn<0)&~mn.isna(); over = (mn>maxv)&~mn.isna()
+            err |= miss|nonnum|neg|over
+            msg[miss] += f"Missing {mc}; "; msg[nonnum] += f"Non-numeric {mc}; "
+            msg[neg] += f"Negative {mc}; "; msg[over] += f"Exceeds max {mc}; "
+            for m, c in [(miss,'MISSING_MARKS'),(nonnum,'NON_NUMERIC'),(neg,'NEGATIVE_MARKS'),(over,'EXCEEDS_MAX')]:
+                code |= np.where(m, ERROR_CODES[c][0], 0)
+
+        # Same student + subject entered more than once (e.g. two teachers uploading the same class)
+        subj = subject_column(self.df.columns)
+        if subj and numeric:
+            dup, conf = find_duplicate_marks(self.df[[sid, subj]], pd.DataFrame(numeric))
+            if dup.any() or conf.any():
+                err |= dup|conf; msg[conf] += "Conflicting marks for same student & subject; "; msg[dup] += "Duplicate entry; "
+                code |= np.where(conf, ERROR_CODES['CONFLICTING_MARKS'][0], 0) | np.where(dup, ERROR_CODES['DUPLICATE_ENTRY'][0], 0)
+                METRICS.count('duplicate_rows', int(dup.sum())); METRICS.count('conflicting_rows', int(conf.sum()))
 
         self.valid_df = self.df[~err].copy()
         self.error_df = self.df[err].copy()
-        if not self.error_df.empty: self.error_df['Errors'] = msg[err].str.rstrip('; ')
-        self.detect_pending_students()
+        if not self.error_df.empty:
+            self.error_df['Errors'] = msg[err].str.rstrip('; '); self.error_df['ErrorCode'] = code[err.to_numpy()]
+        if detect_pending: self.detect_pending_students()
 
     def on_validation_complete(self):
         self._ensure_sidebar_visible()
         self.show_validation_summary(len(self.valid_df), len(self.error_df))
         self.root.config(cursor="wait"); self.root.update()
-        self.populate_treeview(self.valid_tree, self.valid_df)
-        self.populate_treeview(self.error_tree, self.error_df)
+        self.show_in_tree('valid_tree','valid_df'); self.show_in_tree('error_tree','error_df')
+        self.stamp_page('validate')
         self.root.config(cursor=""); self.root.update()
         if len(self.valid_df) > 0:
             self.unlock_page('results')
@@ -83,9 +154,8 @@ class LogicMixin:
         if len(self.error_df) > 0:
             self.unlock_page('fix_errors')
             if hasattr(self,'fix_errors_btn'): self.fix_errors_btn.config(state='normal')
-        if self.db_connection and self.db_connection.is_connected():
-            self.auto_save_validation_results()
-            if len(self.error_df) > 0: self.save_error_logs_to_database()
+        self.auto_save_validation_results()
+        if len(self.error_df) > 0: self.save_error_logs_to_database()
 
     def validate_single_record(self, values, columns):
         try:
@@ -96,7 +166,31 @@ class LogicMixin:
             return True
         except (ValueError, TypeError): return False
 
+    def valid_rows_for(self, record):
+        """valid_df positions already holding `record`'s (student, subject), keys hashed as in find_duplicate_marks."""
+        v = self.valid_df
+        if v is None or v.empty: return np.empty(0, dtype=np.int64)
+        sid, subj = detect_columns(list(v.columns))[0], subject_column(v.columns)
+        if not sid or not subj or sid not in record or subj not in record: return np.empty(0, dtype=np.int64)
+        keys = pd.concat([v[[sid, subj]], pd.DataFrame([{sid: record[sid], subj: record[subj]}])], ignore_index=True)
+        kh = pd.util.hash_pandas_object(keys.astype(str).apply(lambda s: s.str.strip()), index=False).to_numpy()
+        return np.flatnonzero(kh[:-1] == kh[-1])
+
+    def programmes(self):
+        """The department's subject catalogue. Without a 'default' programme, one is inferred from the whole
+        upload (or from cohort_df when only part of the cohort is being processed)."""
+        progs  = load_programmes(getattr(self, 'tenant', DEFAULT_TENANT), getattr(self, 'db_file', SQLITE_DB_FILE))
+        cohort = getattr(self, 'cohort_df', None)
+        cohort = self.df if cohort is None else cohort
+        if DEFAULT_PROGRAMME not in progs and cohort is not None and not cohort.empty:
+            sid, subj = detect_columns(list(cohort.columns))[0], subject_column(cohort.columns)
+            if sid and subj: progs[DEFAULT_PROGRAMME] = infer_programme(cohort, sid, subj)
+        return progs
+
+    @timed('pending_detection', rows=lambda self: len(self.pending_df) if self.pending_df is not None else 0)
     def detect_pending_students(self):
+        """Every (student, required subject) the valid rows lack, plus any elective shortfall. Rows that exist
+        but failed validation are listed from error_df, the rest as not submitted. Vectorised over all students."""
         try:
             if self.valid_df is None or self.valid_df.empty:
                 self.pending_df = self.df.copy() if self.df is not None and not self.df.empty else pd.DataFrame()
@@ -104,91 +198,101 @@ class LogicMixin:
                 return
             sid_col  = next((c for c in self.valid_df.columns if 'student' in c.lower() and 'id' in c.lower()), None)
             sid_col  = sid_col or next((c for c in self.valid_df.columns if c.lower() in ('id','studentid')), None)
-            subj_col = next((c for c in (self.df.columns if self.df is not None else []) if 'subject' in c.lower()), None)
-            if not sid_col: self.pending_df = pd.DataFrame(); return
-
-            counts      = self.valid_df.groupby(sid_col).size()
-            pending_ids = counts[counts < EXPECTED_SUBJECTS].index.tolist()
-            if self.df is not None and sid_col in self.df.columns:
-                pending_ids += [s for s in self.df[sid_col].unique() if s not in counts.index]
-
-            if not pending_ids: self.pending_df = pd.DataFrame(); return
-
-            exp_subjs = (['Maths','Physics','Chemistry','English','Computer'] if not subj_col else
-                         self.df[subj_col].value_counts().nlargest(EXPECTED_SUBJECTS).index.tolist())
-            valid_subjs_map = {
-                sid: (self.valid_df[self.valid_df[sid_col]==sid][subj_col].tolist()
-                      if subj_col and subj_col in self.valid_df.columns else [])
-                for sid in pending_ids}
-
-            records = []
-            for sid in pending_ids:
-                missing = [s for s in exp_subjs if s not in valid_subjs_map.get(sid,[])]
-                sinfo   = self.df[self.df[sid_col]==sid].iloc[0] if self.df is not None and sid_col in self.df.columns else None
-                for subj in missing:
-                    if (self.error_df is not None and not self.error_df.empty
-                            and subj_col and subj_col in self.error_df.columns and sid_col in self.error_df.columns):
-                        er = self.error_df[(self.error_df[sid_col]==sid)&(self.error_df[subj_col]==subj)]
-                        if not er.empty:
-                            row = er.copy(); row['Status'] = f"Pending – {er.get('Errors',['Invalid']).iloc[0]}"
-                            records.append(row); continue
-                    if sinfo is not None:
-                        records.append(pd.DataFrame([{sid_col: sid, 'student_name': sinfo.get('student_name',f'Student_{sid}'),
-                            subj_col: subj, 'marks_obtained': 'NOT SUBMITTED', 'max_marks': 100,
-                            'Status': 'Pending – Not submitted', 'Errors': 'Not submitted'}]))
-            self.pending_df = pd.concat(records, ignore_index=True) if records else pd.DataFrame()
+            subj_col = subject_column(self.valid_df.columns)
+            if not sid_col or not subj_col: self.pending_df = pd.DataFrame(); return
+            df       = self.df if self.df is not None and sid_col in self.df.columns and subj_col in self.df.columns else None
+            comp, codes = assess(self.valid_df, df, programmes=self.programmes())
+            if comp.complete.all(): self.pending_df = pd.DataFrame(); return
+            cat, S   = comp.catalogue, len(comp.catalogue.names) + 1
+            st, sj   = cat.missing_pairs(comp.missing); want = st * S + sj
+            records  = []
+            err      = self.error_df
+            covered  = np.zeros(len(want), dtype=bool)
+            if err is not None and not err.empty and sid_col in err.columns and subj_col in err.columns:
+                got = key_codes(err[sid_col], comp.keys) * S + cat.subject_codes(err[subj_col])
+                hit = (got >= 0) & np.isin(got, want)
+                if hit.any():
+                    rows = err[hit].copy()
+                    rows['Status'] = ('Pending – ' + rows['Errors'].astype(str)) if 'Errors' in rows.columns else 'Pending – Invalid'
+                    records.append(rows.assign(_order=got[hit])); covered = np.isin(want, got[hit])
+            # ID / name shown for each student: first upload row, else first valid row
+            sname  = detect_columns(list(self.valid_df.columns))[1] or 'student_name'
+            ids    = np.empty(len(comp.keys), dtype=object); names = np.full(len(comp.keys), None, dtype=object)
+            for f, c in list(zip([self.valid_df, df], codes))[::-1]:
+                u, first = np.unique(c, return_index=True); u, first = u[u >= 0], first[u >= 0]
+                todo = pd.isna(ids[u]); u, first = u[todo], first[todo]
+                ids[u] = f[sid_col].to_numpy()[first]
+                if sname in f.columns: names[u] = f[sname].to_numpy()[first]
+            names = np.where(pd.isna(names), np.char.add('Student_', comp.keys.astype(str)), names)
+            ns, subj_names = ~covered, np.array(cat.names + [''], dtype=object)
+            short = np.flatnonzero(comp.short > 0)
+            electives = np.array([f"Elective (any of: {', '.join(p.electives)})" for p in cat.specs], dtype=object)
+            for who, subj, status, order in [
+                    (st[ns], subj_names[sj[ns]], 'Pending – Not submitted', want[ns]),
+                    (short, electives[comp.programme[short]],
+                     np.char.add('Pending – ', np.char.add(comp.short[short].astype(str), ' more elective(s) needed')),
+                     short * S + S - 1)]:
+                if len(who): records.append(pd.DataFrame({sid_col: ids[who], sname: names[who], subj_col: subj,
+                    'marks_obtained': 'NOT SUBMITTED', 'max_marks': 100, 'Status': status,
+                    'Errors': 'Not submitted', '_order': order}))
+            out = pd.concat(records, ignore_index=True) if records else pd.DataFrame()
+            self.pending_df = out.sort_values('_order', kind='stable').drop(columns='_order').reset_index(drop=True) if records else out
         except Exception as e:
-            print(f"[Logic] pending detection error: {e}"); traceback.print_exc()
+            METRICS.error("Logic", "pending detection", e); traceback.print_exc()
             self.pending_df = pd.DataFrame()
 
+    @timed('calculation', rows=lambda self, valid_df=None: len(self.valid_df if valid_df is None else valid_df))
+    def compute_results(self, valid_df=None):
+        """Headless core of calculate_results: one graded row per complete student. Raises ValueError."""
+        vdf = self.valid_df if valid_df is None else valid_df
+        if vdf is None or vdf.empty: raise ValueError("No valid data")
+        sid=sname=subj=marks=None
+        for c in vdf.columns:
+            cl=c.lower()
+            if 'student' in cl and 'id' in cl:    sid=c
+            elif 'student' in cl and 'name' in cl: sname=c
+            elif 'subject' in cl:                  subj=c
+            elif 'marks' in cl and 'obtain' in cl: marks=c
+        if not (sid and subj and marks): raise ValueError("Could not find required columns")
+
+        comp, (codes,) = assess(vdf, programmes=self.programmes())
+        complete = (codes >= 0) & comp.complete[np.maximum(codes, 0)]
+        if not complete.any(): raise ValueError("No students have every required subject of their programme.")
+
+        df = vdf[complete].copy()
+        df[marks] = pd.to_numeric(df[marks], errors='coerce')
+        pivot = df.pivot_table(index=sid, columns=subj, values=marks, aggfunc='first').reset_index()
+        sect = section_column(vdf.columns)
+        for c in (sname, sect):
+            if c: pivot = pivot.merge(df.groupby(sid)[c].first(), on=sid, how='left')
+
+        subj_cols = [c for c in pivot.columns if c not in (sid, sname, sect)]
+        pivot['Total']      = pivot[subj_cols].sum(axis=1)
+        pivot['Percentage'] = (pivot['Total'] / (pivot[subj_cols].notna().sum(axis=1)*100) * 100).round(2)   # electives: own subject count
+        pct = pivot['Percentage']
+        pivot['Grade'] = 'F'
+        pivot.loc[pct>=90,'Grade']='A+'; pivot.loc[(pct>=80)&(pct<90),'Grade']='A'
+        pivot.loc[(pct>=70)&(pct<80),'Grade']='B'; pivot.loc[(pct>=60)&(pct<70),'Grade']='C'
+        pivot.loc[(pct>=50)&(pct<60),'Grade']='D'
+        pivot['Result'] = (pct>=40).map({True:'PASS',False:'FAIL'})
+
+        final_cols = [sid] + [c for c in (sname, sect) if c] + subj_cols + ['Total','Percentage','Grade','Result']
+        return rank_results(pivot[final_cols])
+
     def calculate_results(self):
         if self.valid_df is None or self.valid_df.empty:
             messagebox.showerror("Error","No valid data"); return
         try:
             self.root.config(cursor="wait"); self.root.update()
-            sid=sname=subj=marks=None
-            for c in self.valid_df.columns:
-                cl=c.lower()
-                if 'student' in cl and 'id' in cl:    sid=c
-                elif 'student' in cl and 'name' in cl: sname=c
-                elif 'subject' in cl:                  subj=c
-                elif 'marks' in cl and 'obtain' in cl: marks=c
-            if not (sid and subj and marks):
-                messagebox.showerror("Error","Could not find required columns"); self.root.config(cursor=""); return
-
-            counts   = self.valid_df.groupby(sid).size()
-            complete = counts[counts >= EXPECTED_SUBJECTS].index.tolist()
-            if not complete:
-                messagebox.showwarning("No Complete Students", f"No students have all {EXPECTED_SUBJECTS} subjects.")
-                self.root.config(cursor=""); return
-
-            df = self.valid_df[self.valid_df[sid].isin(complete)].copy()
-            df[marks] = pd.to_numeric(df[marks], errors='coerce')
-            pivot = df.pivot_table(index=sid, columns=subj, values=marks, aggfunc='first').reset_index()
-            if sname:
-                pivot = pivot.merge(df.groupby(sid)[sname].first(), on=sid, how='left')
-
-            subj_cols = [c for c in pivot.columns if c not in (sid, sname)]
-            pivot['Total']      = pivot[subj_cols].sum(axis=1)
-            pivot['Percentage'] = (pivot['Total'] / (len(subj_cols)*100) * 100).round(2)
-            pct = pivot['Percentage']
-            pivot['Grade'] = pd.cut(pct, bins=[-1,40,50,60,70,80,90,101],
-                                    labels=['F','D','C','B','A','A+','A+'], right=True)
-            # Fix grade – pd.cut might give duplicates for A+; recalc simply
-            pivot['Grade'] = 'F'
-            pivot.loc[pct>=90,'Grade']='A+'; pivot.loc[(pct>=80)&(pct<90),'Grade']='A'
-            pivot.loc[(pct>=70)&(pct<80),'Grade']='B'; pivot.loc[(pct>=60)&(pct<70),'Grade']='C'
-            pivot.loc[(pct>=50)&(pct<60),'Grade']='D'
-            pivot['Result'] = (pct>=40).map({True:'PASS',False:'FAIL'})
-
-            final_cols = [sid] + ([sname] if sname else []) + subj_cols + ['Total','Percentage','Grade','Result']
-            self.results_df = pivot[final_cols].copy()
-            self.populate_treeview(self.results_tree, self.results_df.head(1000))
-            self.show_results_summary(len(self.results_df))
+            try: self.results_df = self.compute_results()
+            except ValueError as e:
+                self.root.config(cursor=""); messagebox.showwarning("Cannot Calculate", str(e)); return
+            self.show_in_tree('results_tree','results_df')
+            self.show_results_summary(len(self.results_df)); self.stamp_page('results')
             self.detect_pending_students()
             self.unlock_page('pending'); self.unlock_page('reports')
             if hasattr(self,'results_continue_btn'): self.results_continue_btn.config(state='normal')
-            if self.db_connection and self.db_connection.is_connected(): self.auto_save_results()
+            self.auto_save_results()
             self._ensure_sidebar_visible(); self.root.config(cursor="")
             messagebox.showinfo("Success", f"✓ Results calculated!\n{len(self.results_df):,} students ready for export.")
         except Exception as e:
@@ -2,15 +2,20 @@
 """main.py – Entry point. Assembles all mixins into ModernResultProcessor."""
 
 import tkinter as tk
-from config import APP_TITLE, APP_GEOMETRY, APP_MIN_SIZE, COLORS, PAGES_CONFIG
+from config import APP_TITLE, APP_GEOMETRY, APP_MIN_SIZE, COLORS, PAGES_CONFIG, DEFAULT_TENANT, METRICS_HTTP_PORT
 from gui_components import GUIComponentsMixin
 from gui_pages      import GUIPagesMixin
 from database       import DatabaseMixin
 from logic          import LogicMixin
 from reports        import ReportsMixin
+from checkpoint     import CheckpointMixin
+from corrections    import CorrectionsMixin
+from searchindex    import SearchMixin
+from metrics        import serve_metrics
 
 
-class ModernResultProcessor(GUIComponentsMixin, GUIPagesMixin, DatabaseMixin, LogicMixin, ReportsMixin):
+class ModernResultProcessor(GUIComponentsMixin, GUIPagesMixin, DatabaseMixin, LogicMixin, ReportsMixin,
+                            CheckpointMixin, CorrectionsMixin, SearchMixin):
 
     def __init__(self, root):
         self.root = root
@@ -20,18 +25,22 @@ class ModernResultProcessor(GUIComponentsMixin, GUIPagesMixin, DatabaseMixin, Lo
         self.df = self.valid_df = self.error_df = self.pending_df = self.results_df = None
         self.db_connection = self.logged_in_user = self.db_config = None
         self.db_table_name = 'results'
+        self.tenant = DEFAULT_TENANT
+        self.reset_corrections(); self.reset_search()
 
         # UI refs (set during page rendering)
-        self.sidebar = self.main_container = self.content_area = None
+        self.sidebar = self.main_container = self.content_host = self.content_area = None
+        self.page_cache = {}
         self.nav_buttons = {}; self.sidebar_visible = False
         self.username_entry = self.password_entry = None
         self.db_host = self.db_port = self.db_user = self.db_pass = None
-        self.db_name = self.db_table = self.db_status_label = None
+        self.db_name = self.db_table = self.db_tenant = self.db_status_label = None
         self.drop_zone = self.save_to_db_btn = self.upload_continue_btn = None
         self.file_info_label = self.upload_preview_frame = None
         self.continue_btn = self.fix_errors_btn = None
         self.validation_summary_frame = self.valid_tree = self.error_tree = self.validation_notebook = None
-        self.fix_errors_tree = self.pending_tree = self.history_tree = None
+        self.fix_errors_tree = self.pending_tree = self.history_tree = self.users_tree = None
+        self.undo_btn = self.redo_btn = self.undo_all_btn = None
         self.results_continue_btn = self.results_summary_frame = self.results_tree = None
 
         # Config
@@ -40,6 +49,8 @@ class ModernResultProcessor(GUIComponentsMixin, GUIPagesMixin, DatabaseMixin, Lo
         self.current_page = "login"
 
         self.init_database()
+        self.start_checkpointing()
+        if METRICS_HTTP_PORT: serve_metrics(METRICS_HTTP_PORT)
         self.setup_ui()
 
 
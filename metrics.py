@@ -0,0 +1,158 @@
+# pylint: disable=all
+"""metrics.py – Pipeline instrumentation: stage timers, counters, in-flight tracking, optional cProfile/tracemalloc.
+
+Snapshots go to METRICS_DIR (metrics.json + Prometheus textfile metrics.prom), to the /metrics route of
+api_server.py or the optional standalone endpoint, and to the in-app Diagnostics page.
+"""
+
+import cProfile, functools, itertools, json, os, threading, time, tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from config import METRICS_DIR, METRICS_FLUSH_INTERVAL, METRICS_RECENT, METRICS_PROFILE_STAGES
+
+
+class Metrics:
+    """Thread-safe process-wide registry. Stage names: ingestion, validation, pending_detection, calculation,
+    db_write, report_generation … – anything passed to stage()/timed()."""
+
+    def __init__(self):
+        self._lock     = threading.Lock()
+        self.counters  = {}                      # (name, labels) -> value
+        self.timers    = {}                      # stage -> {count, sum, max, last, rows, errors}
+        self.inflight  = {}                      # token -> (stage, started, thread name)
+        self.recent    = deque(maxlen=METRICS_RECENT)   # finished stage runs, newest last
+        self.errors    = deque(maxlen=METRICS_RECENT)
+        self.profile_stages = set(METRICS_PROFILE_STAGES)   # '*' = all
+        self.trace_memory   = False
+        self._ids = itertools.count(); self._last_flush = 0.0
+
+    # ── Recording ─────────────────────────────────────────────────────────
+    def count(self, name, n=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock: self.counters[key] = self.counters.get(key, 0) + n
+
+    def error(self, component, where, exc):
+        print(f"[{component}] {where}: {exc}")
+        self.count('errors_total', component=component)
+        with self._lock: self.errors.append({'at': datetime.now().isoformat(timespec='seconds'),
+                                             'component': component, 'where': where, 'error': str(exc)})
+
+    def _begin(self, name):
+        tok = next(self._ids)
+        with self._lock: self.inflight[tok] = (name, time.time(), threading.current_thread().name)
+        return tok
+
+    def _end(self, tok, name, seconds, rows, failed, extra):
+        with self._lock:
+            self.inflight.pop(tok, None)
+            t = self.timers.setdefault(name, {'count': 0, 'sum': 0.0, 'max': 0.0, 'last': 0.0, 'rows': 0, 'errors': 0})
+            t['count'] += 1; t['sum'] += seconds; t['last'] = seconds; t['max'] = max(t['max'], seconds)
+            t['rows'] += rows or 0; t['errors'] += int(failed)
+            self.recent.append({'stage': name, 'seconds': round(seconds, 4), 'rows': rows, 'failed': failed,
+                                'at': datetime.now().isoformat(timespec='seconds'), **extra})
+        self._maybe_flush()
+
+    # ── Export ────────────────────────────────────────────────────────────
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            return {'generated': datetime.now().isoformat(timespec='seconds'),
+                    'stages': {k: dict(v, avg=(v['sum']/v['count'] if v['count'] else 0)) for k, v in self.timers.items()},
+                    'counters': [{'name': n, 'labels': dict(l), 'value': v} for (n, l), v in self.counters.items()],
+                    'inflight': [{'stage': s, 'running_for': round(now - t0, 1), 'thread': th}
+                                 for s, t0, th in self.inflight.values()],
+                    'recent': list(self.recent), 'errors': list(self.errors)}
+
+    def to_prometheus(self):
+        snap = self.snapshot(); out = []
+        def esc(v): return str(v).replace('\\', '\\\\').replace('"', '\\"')
+        out += ["# TYPE rp_stage_seconds summary"]
+        for st, t in snap['stages'].items():
+            out += [f'rp_stage_seconds_count{{stage="{st}"}} {t["count"]}', f'rp_stage_seconds_sum{{stage="{st}"}} {t["sum"]:.6f}',
+                    f'rp_stage_seconds_max{{stage="{st}"}} {t["max"]:.6f}', f'rp_stage_rows_total{{stage="{st}"}} {t["rows"]}',
+                    f'rp_stage_errors_total{{stage="{st}"}} {t["errors"]}']
+        for c in snap['counters']:
+            lbl = ','.join(f'{k}="{esc(v)}"' for k, v in c['labels'].items())
+            out.append(f"rp_{c['name']}{{{lbl}}} {c['value']}")
+        out += ["# TYPE rp_inflight_stages gauge", f"rp_inflight_stages {len(snap['inflight'])}"]
+        out += [f'rp_inflight_seconds{{stage="{i["stage"]}",thread="{esc(i["thread"])}"}} {i["running_for"]}' for i in snap['inflight']]
+        return '\n'.join(out) + '\n'
+
+    def flush_to_file(self):
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        for name, text in [('metrics.json', json.dumps(self.snapshot(), indent=1, default=str)),
+                           ('metrics.prom', self.to_prometheus())]:
+            tmp = os.path.join(METRICS_DIR, name + '.tmp')
+            with open(tmp, 'w') as f: f.write(text)
+            os.replace(tmp, os.path.join(METRICS_DIR, name))
+        self._last_flush = time.time()
+
+    def _maybe_flush(self):
+        if time.time() - self._last_flush < METRICS_FLUSH_INTERVAL: return
+        try: self.flush_to_file()
+        except OSError as e: print(f"[Metrics] flush failed: {e}")
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear(); self.timers.clear(); self.recent.clear(); self.errors.clear()
+
+
+METRICS = Metrics()
+
+
+@contextmanager
+def stage(name, rows=None):
+    """Time a pipeline stage. Yields a dict; set ctx['rows'] (and any other keys) to record them."""
+    ctx = {'rows': rows}; tok = METRICS._begin(name)
+    prof = cProfile.Profile() if ('*' in METRICS.profile_stages or name in METRICS.profile_stages) else None
+    mem  = METRICS.trace_memory and not tracemalloc.is_tracing()
+    if mem: tracemalloc.start()
+    if prof: prof.enable()
+    t0 = time.perf_counter(); failed = False
+    try: yield ctx
+    except Exception: failed = True; raise
+    finally:
+        dt = time.perf_counter() - t0; extra = {}
+        if prof:
+            prof.disable()
+            pdir = os.path.join(METRICS_DIR, 'profiles'); os.makedirs(pdir, exist_ok=True)
+            extra['profile'] = os.path.join(pdir, f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.prof")
+            prof.dump_stats(extra['profile'])
+        if mem:
+            extra['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2); tracemalloc.stop()
+        extra.update({k: v for k, v in ctx.items() if k != 'rows'})
+        METRICS._end(tok, name, dt, ctx['rows'], failed, extra)
+
+
+def timed(name, rows=None):
+    """Method decorator form of stage(); rows(self, *args) → row count recorded after the call."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *a, **kw):
+            with stage(name) as ctx:
+                out = fn(self, *a, **kw)
+                if rows is not None:
+                    try: ctx['rows'] = rows(self, *a, **kw)
+                    except Exception: pass
+                return out
+        return wrapper
+    return deco
+
+
+def serve_metrics(port, host='127.0.0.1'):
+    """Standalone Prometheus scrape endpoint (GET /metrics) on a daemon thread."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _H(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = (METRICS.to_prometheus() if self.path.startswith('/metrics') else
+                    json.dumps(METRICS.snapshot(), default=str)).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4' if self.path.startswith('/metrics') else 'application/json')
+            self.send_header('Content-Length', str(len(body))); self.end_headers(); self.wfile.write(body)
+        def log_message(self, *a): pass
+
+    srv = ThreadingHTTPServer((host, port), _H)
+    threading.Thread(target=srv.serve_forever, name="metrics-endpoint", daemon=True).start()
+    return srv
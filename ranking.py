@@ -0,0 +1,101 @@
+# pylint: disable=all
+"""ranking.py – Class, section, subject and percentile ranks plus top-N merit lists for a results frame.
+
+Each score is sorted once (section ranks reuse the class order through a stable radix sort of the section
+codes); tie groups and group starts are then found by comparing neighbours in sorted order, so there is
+no per-student Python anywhere.
+
+    competition       1, 2, 2, 4   (equal percentage → equal rank, next rank skips)
+    dense             1, 2, 2, 3
+    subject_priority  ties on percentage broken by marks in RANK_SUBJECT_PRIORITY order, then competition
+"""
+
+import numpy as np
+import pandas as pd
+from config import RANK_POLICY, RANK_SUBJECT_PRIORITY, RANK_MERIT_TOP, RANK_SECTION_COLUMNS
+
+POLICIES     = ('competition', 'dense', 'subject_priority')
+RANK_COLUMNS = ('Rank', 'Section Rank', 'Percentile')
+
+
+def section_column(columns):
+    return next((c for c in columns if str(c).strip().lower() in RANK_SECTION_COLUMNS), None)
+
+
+def subject_columns(results):
+    """Per-subject mark columns of a results frame: everything before 'Total' that is not an identity column."""
+    cols = list(results.columns); sect = section_column(cols)
+    head = cols[:cols.index('Total')] if 'Total' in cols else []
+    return [c for c in head if c != sect and 'student' not in str(c).lower() and 'roll' not in str(c).lower()]
+
+
+def _scores(s):
+    return pd.to_numeric(s, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+def _descending(keys):
+    return [np.where(np.isnan(k), np.inf, -k) for k in keys]
+
+
+def score_order(keys):
+    """Row order by `keys` descending (most significant first, NaN last)."""
+    ks = _descending(keys)
+    return np.argsort(ks[0]) if len(ks) == 1 else np.lexsort(ks[::-1])   # lexsort: last key is the primary one
+
+
+def rank_keys(keys, groups=None, dense=False, order=None, sizes=False):
+    """1-based descending ranks of rows by `keys` within integer `groups`, aligned with the input rows;
+    sizes=True → (rank, tie size, group size). `order` = score_order(keys) when the caller already has it:
+    grouping is then a stable radix sort of the group codes in that order instead of another full sort."""
+    n = len(keys[0]); ks = _descending(keys)
+    if order is None: order = np.argsort(ks[0]) if len(ks) == 1 else np.lexsort(ks[::-1])
+    if groups is not None:
+        g = np.asarray(groups); order = order[np.argsort(g[order], kind='stable')]; sg = g[order]
+        new_g = np.empty(n, dtype=bool); new_g[0] = True; np.not_equal(sg[1:], sg[:-1], out=new_g[1:])
+    else: new_g = np.zeros(n, dtype=bool); new_g[0] = True
+    new_v = new_g.copy()
+    for k in ks:
+        sk = k[order]; new_v[1:] |= sk[1:] != sk[:-1]
+    pos = np.arange(n)
+    g_start = np.maximum.accumulate(np.where(new_g, pos, 0)) if groups is not None else 0
+    if dense:
+        r = np.cumsum(new_v)
+        if groups is not None: r = r - r[g_start] + 1
+    else: r = np.maximum.accumulate(np.where(new_v, pos, 0)) - g_start + 1
+    rank = np.empty(n, dtype=np.int64); rank[order] = r
+    if not sizes: return rank
+    v_id, g_id = np.cumsum(new_v) - 1, np.cumsum(new_g) - 1
+    tie = np.empty(n, dtype=np.int64); tie[order] = np.bincount(v_id)[v_id]
+    size = np.empty(n, dtype=np.int64); size[order] = np.bincount(g_id)[g_id]
+    return rank, tie, size
+
+
+def rank_results(results, policy=RANK_POLICY, priority=RANK_SUBJECT_PRIORITY):
+    """Copy of `results` with Rank, Section Rank (when a section column exists), Percentile and one
+    '<subject> Rank' column per subject. Re-ranking an already ranked frame replaces the old columns."""
+    if policy not in POLICIES: raise ValueError(f"Unknown rank policy '{policy}' – use one of {', '.join(POLICIES)}")
+    subjects = subject_columns(results)
+    old  = [c for c in results.columns if c in RANK_COLUMNS or str(c).endswith(' Rank')]
+    out  = results.drop(columns=old) if old else results.copy(deep=False)
+    if out.empty or 'Percentage' not in out.columns: return out
+    keys = [_scores(out['Percentage'])]
+    if policy == 'subject_priority':
+        keys += [_scores(out[s]) for s in [s for s in priority if s in subjects] + [s for s in subjects if s not in priority]]
+    dense = policy == 'dense'; order = score_order(keys)
+    rank, tie, size = rank_keys(keys, dense=dense, order=order, sizes=True)
+    comp  = rank if not dense else rank_keys(keys, order=order)
+    ranks = {'Rank': rank}
+    sect  = section_column(out.columns)
+    if sect: ranks['Section Rank'] = rank_keys(keys, pd.factorize(out[sect], use_na_sentinel=False)[0], dense, order)
+    ranks['Percentile'] = np.round(100 * (size - comp + 1 - 0.5 * tie) / size, 2)
+    for s in subjects: ranks[f"{s} Rank"] = rank_keys([_scores(out[s])], dense=dense)
+    for name, values in ranks.items(): out[name] = values
+    return out
+
+
+def merit_list(results, top=RANK_MERIT_TOP):
+    """Students ranked within the top `top` of their section (or class), ties included, best first."""
+    if results is None or results.empty or 'Rank' not in results.columns: return pd.DataFrame()
+    sect = section_column(results.columns); rk = 'Section Rank' if sect and 'Section Rank' in results.columns else 'Rank'
+    m = results[results[rk] <= top]
+    return m.sort_values([sect, rk] if rk == 'Section Rank' else [rk], kind='stable').reset_index(drop=True)
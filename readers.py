@@ -0,0 +1,112 @@
+# pylint: disable=all
+"""readers.py – Pluggable file readers: pyarrow multi-threaded CSV, calamine/openpyxl xlsx, pandas fallback.
+
+Engines register under a kind ('csv' / 'excel'); READER_CSV_ENGINE / READER_XLSX_ENGINE pick one and any
+failure falls back to the next available engine. The pyarrow CSV reader remembers the column types it
+inferred for a header and reuses them for later files with the same header.
+"""
+
+import os
+import pandas as pd
+from config import (ARROW_AVAILABLE, CALAMINE_AVAILABLE, READER_CSV_ENGINE, READER_XLSX_ENGINE,
+                    READER_ARROW_DTYPES, READER_BLOCK_SIZE)
+from tenancy import TenantCache
+
+if ARROW_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+ENGINES  = {'csv': {}, 'excel': {}}     # kind -> {name: (reader, available)}, in fallback order
+_schemas = TenantCache()                 # csv header line -> {column: arrow type}
+
+
+def register(kind, name, available=True):
+    def deco(fn):
+        ENGINES[kind][name] = (fn, available); return fn
+    return deco
+
+
+def engine_order(kind, preferred):
+    avail = [n for n, (_, ok) in ENGINES[kind].items() if ok]
+    return ([preferred] if preferred in avail else []) + [n for n in avail if n != preferred]
+
+
+# ── CSV ───────────────────────────────────────────────────────────────────
+def _header(source):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f: return f.readline().strip()
+    pos = source.tell(); line = source.readline(); source.seek(pos)
+    return line.strip()
+
+
+def _widen(old, new):
+    """Column types compatible with both files: equal → kept, int/float mix → float64, anything else → string."""
+    out = {}
+    for name, t in new.items():
+        o = old.get(name, t)
+        if o == t: out[name] = t
+        elif (pa.types.is_integer(o) or pa.types.is_floating(o)) and (pa.types.is_integer(t) or pa.types.is_floating(t)):
+            out[name] = pa.float64()
+        else: out[name] = pa.string()
+    return out
+
+
+@register('csv', 'pyarrow', ARROW_AVAILABLE)
+def _csv_pyarrow(source):
+    key = _header(source); known = _schemas.get(key) or {}
+    start = None if isinstance(source, (str, os.PathLike)) else source.tell()
+    ro = pacsv.ReadOptions(use_threads=True, block_size=READER_BLOCK_SIZE)
+    try: tbl = pacsv.read_csv(source, read_options=ro, convert_options=pacsv.ConvertOptions(column_types=known))
+    except pa.ArrowInvalid:
+        if not known: raise
+        if start is not None: source.seek(start)
+        tbl = pacsv.read_csv(source, read_options=ro)   # this file disagrees with the remembered types
+    types = _widen(known, {f.name: f.type for f in tbl.schema})
+    if any(tbl.schema.field(n).type != t for n, t in types.items()):
+        tbl = tbl.cast(pa.schema([(n, types[n]) for n in tbl.column_names]))
+    _schemas.put(key, types)
+    if READER_ARROW_DTYPES: return tbl.to_pandas(types_mapper=pd.ArrowDtype)
+    return tbl.to_pandas(split_blocks=True, self_destruct=True)
+
+
+@register('csv', 'pandas')
+def _csv_pandas(source):
+    return pd.read_csv(source)
+
+
+# ── Excel ─────────────────────────────────────────────────────────────────
+@register('excel', 'calamine', CALAMINE_AVAILABLE)
+def _excel_calamine(source, sheet_name=0):
+    return pd.read_excel(source, sheet_name=sheet_name, engine='calamine')
+
+
+@register('excel', 'openpyxl')
+def _excel_default(source, sheet_name=0):
+    return pd.read_excel(source, sheet_name=sheet_name)
+
+
+# ── Entry points ──────────────────────────────────────────────────────────
+def _read(kind, preferred, source, **kw):
+    order = engine_order(kind, preferred); last = None
+    for name in order:
+        try: return ENGINES[kind][name][0](source, **kw)
+        except Exception as e:
+            last = e
+            if name != order[-1]: print(f"[Reader] {name} failed ({e}); falling back")
+            if not isinstance(source, (str, os.PathLike)): source.seek(0)
+    raise last
+
+
+def read_csv(source):
+    return _read('csv', 'pyarrow' if READER_CSV_ENGINE == 'auto' else READER_CSV_ENGINE, source)
+
+
+def read_excel(source, sheet_name=0):
+    """sheet_name=None → {sheet: frame} for every sheet, as pandas does."""
+    return _read('excel', 'calamine' if READER_XLSX_ENGINE == 'auto' else READER_XLSX_ENGINE, source, sheet_name=sheet_name)
+
+
+def read_table(source, filename=None):
+    """One frame from a path or file-like object; the extension of `filename` (or the path) picks the reader."""
+    name = str(filename or source).lower()
+    return read_excel(source) if name.endswith(('.xlsx', '.xls')) else read_csv(source)
@@ -1,16 +1,264 @@
 # pylint: disable=all
-"""reports.py – Excel exports, PDF marksheets, batch export, audit history export."""
+"""reports.py – Excel exports, PDF marksheets, batch export, audit history export, result-lookup site."""
 
-import os, platform, sqlite3, subprocess
-from datetime import datetime
+import functools, hashlib, io, json, os, platform, shutil, subprocess, threading, time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-from tkinter import filedialog, messagebox
-from config import SQLITE_DB_FILE
+from tkinter import filedialog, messagebox, ttk
+import tkinter as tk
+from config import MARKSHEET_PROCESSES, MARKSHEET_PARALLEL_MIN, MARKSHEET_RENDERER, EXPORT_MANIFEST, EXPORT_PROCESS_MIN_ROWS, DEFAULT_TENANT
+from metrics import METRICS, stage
+from framestore import publish, attach, release
+from ranking import merit_list
+from history import fetch_page, iter_history, history_stamp
+from resultsite import build_site
+from scheduler import Task, run_graph
+
+
+_FIELDS      = ('name', 'sid', 'roll', 'total', 'percentage', 'grade', 'result', 'result_label')
+_SLOT        = '\x00'                         # prefix of placeholder cell text while a template is laid out
+_RESULT_KEYS = ('result', 'result_label')     # slots whose colour follows PASS/FAIL
+MARKSHEET_VERSION = 1                         # bump when the marksheet layout changes: every sheet is rebuilt
+REPORTS_VERSION   = 2                         # same for the export_all_reports files
+
+
+@functools.lru_cache(maxsize=1)
+def _marksheet_styles():
+    from reportlab.lib import colors as rc
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.enums import TA_CENTER
+    styles = getSampleStyleSheet()
+    t_sty  = ParagraphStyle('T', parent=styles['Heading1'], fontSize=24,
+                            textColor=rc.HexColor('#2C3E50'), spaceAfter=30,
+                            alignment=TA_CENTER, fontName='Helvetica-Bold')
+    h_sty  = ParagraphStyle('H', parent=styles['Heading2'], fontSize=16,
+                            textColor=rc.HexColor('#34495E'), spaceAfter=12,
+                            spaceBefore=12, fontName='Helvetica-Bold')
+    return t_sty, h_sty
+
+
+def _marksheet_story(v):
+    """Platypus flowables of one marksheet from its values (see ReportsMixin.marksheet_values)."""
+    from reportlab.lib import colors as rc
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Table, TableStyle, Paragraph, Spacer
+    t_sty, h_sty = _marksheet_styles()
+    els = [Paragraph("STUDENT MARKSHEET", t_sty), Spacer(1,.3*inch)]
+
+    info_tbl = Table([['Student Name:',v['name']],['Student ID:',v['sid']],
+                      ['Roll Number:',v['roll']],['Academic Year:','2025-2026']],
+                     colWidths=[2*inch,4*inch])
+    info_tbl.setStyle(TableStyle([
+        ('FONTNAME',(0,0),(0,-1),'Helvetica-Bold'),('FONTNAME',(1,0),(1,-1),'Helvetica'),
+        ('FONTSIZE',(0,0),(-1,-1),11),('BACKGROUND',(0,0),(-1,-1),rc.HexColor('#ECF0F1')),
+        ('GRID',(0,0),(-1,-1),1,rc.HexColor('#BDC3C7')),
+        ('TOPPADDING',(0,0),(-1,-1),8),('BOTTOMPADDING',(0,0),(-1,-1),8)]))
+    els += [info_tbl, Spacer(1,.4*inch), Paragraph("MARKS OBTAINED",h_sty)]
+
+    m_tbl = Table([['Subject','Obtained','Max']] + [list(s) for s in v['subjects']], colWidths=[3*inch,2*inch,2*inch])
+    m_tbl.setStyle(TableStyle([
+        ('FONTNAME',(0,0),(-1,0),'Helvetica-Bold'),('FONTSIZE',(0,0),(-1,0),11),
+        ('BACKGROUND',(0,0),(-1,0),rc.HexColor('#3498DB')),('TEXTCOLOR',(0,0),(-1,0),rc.whitesmoke),
+        ('ALIGN',(0,0),(-1,-1),'CENTER'),('FONTNAME',(0,1),(-1,-1),'Helvetica'),
+        ('ROWBACKGROUNDS',(0,1),(-1,-1),[rc.white,rc.HexColor('#F8F9FA')]),
+        ('GRID',(0,0),(-1,-1),1,rc.HexColor('#BDC3C7')),
+        ('TOPPADDING',(0,0),(-1,-1),8),('BOTTOMPADDING',(0,0),(-1,-1),8)]))
+    els += [m_tbl, Spacer(1,.4*inch), Paragraph("RESULT SUMMARY",h_sty)]
+
+    s_tbl = Table([['Total Marks:',v['total']],['Percentage:',v['percentage']],
+                   ['Grade:',v['grade']],[v['result_label'],v['result']]],
+                  colWidths=[2*inch,4*inch])
+    s_tbl.setStyle(TableStyle([
+        ('FONTNAME',(0,0),(0,-1),'Helvetica-Bold'),('FONTNAME',(1,0),(1,-1),'Helvetica-Bold'),
+        ('FONTSIZE',(0,0),(-1,-1),12),('ALIGN',(0,0),(-1,-1),'LEFT'),
+        ('TEXTCOLOR',(0,3),(1,3),_result_colour(v['result'])),('BACKGROUND',(0,0),(-1,-1),rc.HexColor('#ECF0F1')),
+        ('GRID',(0,0),(-1,-1),1,rc.HexColor('#BDC3C7')),
+        ('TOPPADDING',(0,0),(-1,-1),10),('BOTTOMPADDING',(0,0),(-1,-1),10)]))
+    els.append(s_tbl)
+    return els
+
+
+def _result_colour(result):
+    from reportlab.lib import colors as rc
+    return rc.HexColor('#27AE60') if result=='PASS' else rc.HexColor('#E74C3C')
+
+
+def _marksheet_fields(v):
+    """Every per-student string of a marksheet, keyed by its template slot."""
+    out = {k: v[k] for k in _FIELDS}
+    for i, s in enumerate(v['subjects']):
+        for j, t in enumerate(s): out[f"s{i}_{j}"] = t
+    return out
+
+
+def _template_canvas():
+    from reportlab.pdfgen.canvas import Canvas
+
+    class TemplateCanvas(Canvas):
+        """Lays a marksheet out once with placeholder values. Each page is kept as its PDF operators, cut
+        wherever a placeholder was drawn, plus how/where each placeholder is drawn (inside the same
+        graphics state, so table offsets need no recomputation)."""
+
+        def __init__(self, *a, **kw):
+            super().__init__(*a, **kw); self.pages = []; self._slots = []
+
+        def _slot(self, align, x, y, text):
+            if not text.startswith(_SLOT): return False
+            self._slots.append((len(self._code), text[1:], align, x, y, self._fontname, self._fontsize, self._fillColorObj))
+            return True
+
+        def drawString(self, x, y, text, *a, **kw):
+            if not self._slot(0, x, y, text): super().drawString(x, y, text, *a, **kw)
+
+        def drawCentredString(self, x, y, text, *a, **kw):
+            if not self._slot(.5, x, y, text): super().drawCentredString(x, y, text, *a, **kw)
+
+        def drawRightString(self, x, y, text, *a, **kw):
+            if not self._slot(1, x, y, text): super().drawRightString(x, y, text, *a, **kw)
+
+        def showPage(self):
+            code, cut, segs = self._code, 0, []
+            for s in self._slots: segs.append('\n'.join(code[cut:s[0]])); cut = s[0]
+            self.pages.append((segs, '\n'.join(code[cut:]), [s[1:] for s in self._slots]))
+            self._slots = []; super().showPage()
+
+    return TemplateCanvas
+
+
+def _fill_op(colour):
+    from reportlab.lib.rl_accel import fp_str
+    return f"{fp_str(colour.red, colour.green, colour.blue)} rg"
+
+
+@functools.lru_cache(maxsize=32)
+def _marksheet_template(n_subjects):
+    """Static marksheet page(s) for `n_subjects` marks rows, laid out by platypus once per process →
+    (pages, fonts). Cell text never wraps and column widths are fixed, so the geometry depends only on the
+    row count. Each slot keeps its operator prefix (colour, font) pre-formatted."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.rl_accel import fp_str
+    from reportlab.platypus import SimpleDocTemplate
+    v = {k: _SLOT + k for k in _FIELDS}
+    v['subjects'] = [[f"{_SLOT}s{i}_{j}" for j in range(3)] for i in range(n_subjects)]
+    made = []
+    maker = lambda *a, **kw: made.append(_template_canvas()(*a, **kw)) or made[-1]
+    SimpleDocTemplate(io.BytesIO(), pagesize=A4).build(_marksheet_story(v), canvasmaker=maker)
+    fm = made[0]._doc.fontMapping
+    pages = [(segs, tail, [(key, font, size, align, x, fp_str(y), _fill_op(fill),
+                            f"BT {fm[font]} {fp_str(size)} Tf") for key, align, x, y, font, size, fill in slots])
+             for segs, tail, slots in made[0].pages]
+    return pages, sorted(fm, key=lambda f: int(fm[f].lstrip('/F')))
+
+
+def _stamp_marksheet(path, template, v):
+    """Replay the cached static page operators and write only the student's values into the slots."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.rl_accel import fp_str
+    from reportlab.pdfbase.pdfmetrics import getFont, stringWidth, unicode2T1
+    from reportlab.pdfgen.canvas import Canvas
+    pages, fonts = template
+    c = Canvas(path, pagesize=A4, pageCompression=0); text = _marksheet_fields(v)
+    doc = c._doc; rfill = _fill_op(_result_colour(v['result']))
+    for f in fonts: doc.getInternalFontName(f)      # same /F1, /F2 … names the cached operators refer to
+    for segs, tail, slots in pages:
+        code = c._code
+        for seg, (key, font, size, align, x, y, fill, tf) in zip(segs, slots):
+            t = text[key]; face = cur = getFont(font); ops = []
+            if align: x -= align * stringWidth(t, font, size)
+            for f, part in unicode2T1(t, [face] + face.substitutionFonts):   # as canvas.drawString encodes it
+                if f is not cur: ops.append(f"{doc.getInternalFontName(f.fontName)} {fp_str(size)} Tf"); cur = f
+                ops.append(f"({c._escape(part)}) Tj")
+            code.append(f"{seg}\nq {rfill if key in _RESULT_KEYS else fill} {tf} 1 0 0 1 {fp_str(x)} {y} Tm {' '.join(ops)} ET Q")
+        code.append(tail); c.showPage()
+    c.save()
+
+
+def _marksheet_name(sid):
+    return f"marksheet_{''.join(c for c in str(sid) if c.isalnum() or c in '-_')}.pdf"
+
+
+def _subject_columns(columns):
+    """(subject, marks obtained, max marks) columns of a row-per-subject frame, any of which may be None."""
+    return (next((c for c in columns if 'subject' in c.lower()),None),
+            next((c for c in columns if 'marks' in c.lower() and 'obtain' in c.lower()),None),
+            next((c for c in columns if 'marks' in c.lower() and 'max' in c.lower()),None))
+
+
+def _render_marksheet_rows(handles, positions, mdir, cols):
+    """Process-pool worker: attach the shared frames read-only and render the given results rows."""
+    r = ReportsMixin(); r.results_df = attach(handles['results_df'])
+    r.valid_df = attach(handles['valid_df']) if 'valid_df' in handles else None
+    return r._render_rows(positions, mdir, cols)
+
+
+# ── Export manifests ──────────────────────────────────────────────────────
+def _load_manifest(folder, version):
+    """{file name: input digest} of the last export into `folder`; empty if missing or written by another version."""
+    try:
+        with open(os.path.join(folder, EXPORT_MANIFEST)) as f: m = json.load(f)
+    except (OSError, ValueError): return {}
+    return m.get('files', {}) if m.get('version') == version else {}
+
+
+def _save_manifest(folder, version, files, **extra):
+    path = os.path.join(folder, EXPORT_MANIFEST)
+    with open(path + '.tmp', 'w') as f: json.dump({'version': version, 'files': files, **extra}, f, indent=0, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def _frame_digest(df):
+    h = hashlib.sha256(json.dumps([str(c) for c in df.columns]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+# ── Export-all writers: (path, inputs) → rows written. Module level so worker processes can run them ──
+def _write_excel(path, df):
+    df.to_excel(path, index=False); return len(df)
+
+
+def _write_merit(path, results_df):
+    return _write_excel(path, merit_list(results_df))
+
+
+def _write_summary(path, results_df):
+    pcts = [float(str(p).replace('%','')) for p in results_df['Percentage'] if str(p).replace('%','').replace('.','').isdigit()]
+    with open(path,'w') as f:
+        f.write(f"RESULTS SUMMARY\n{'='*40}\n")
+        f.write(f"Total: {len(results_df)}\n")
+        f.write(f"Passed: {len(results_df[results_df['Result']=='PASS'])}\n")
+        f.write(f"Failed: {len(results_df[results_df['Result']=='FAIL'])}\n")
+        if pcts: f.write(f"Avg: {sum(pcts)/len(pcts):.2f}%  High: {max(pcts):.2f}%  Low: {min(pcts):.2f}%\n")
+    return len(results_df)
+
+
+def _write_history(path, tenant, filters=None):
+    """Stream the (filtered) audit trail into a write-only workbook: rows go from the cursor to the file
+    in HISTORY_EXPORT_CHUNK batches and are never all held in memory."""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.utils import get_column_letter
+    wb = Workbook(write_only=True); ws = wb.create_sheet("Fixed Errors")
+    hdrs = ['Fix ID','Student ID','Student Name','Subject','Field','Old Value','New Value','Error','Fixed By','Fixed At','Correction']
+    for i, w in enumerate((8, 12, 22, 14, 14, 14, 14, 50, 12, 20, 14), 1): ws.column_dimensions[get_column_letter(i)].width = w
+    fill = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
+    head = []
+    for h in hdrs:
+        cell = WriteOnlyCell(ws, value=h); cell.fill = fill; cell.font = Font(bold=True, color='FFFFFF')
+        cell.alignment = Alignment(horizontal='center'); head.append(cell)
+    ws.append(head); n = 0
+    for rows in iter_history(tenant, filters):
+        for fix in rows: ws.append(fix)
+        n += len(rows)
+    wb.save(path); return n
 
 
 class ReportsMixin:
 
     def export_results_excel(self):
+        if not self.may_edit(): return
         if self.results_df is None: messagebox.showerror("Error","No results"); return
         f = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel","*.xlsx")])
         if f:
@@ -18,6 +266,7 @@ class ReportsMixin:
             except Exception as e: messagebox.showerror("Error", str(e))
 
     def generate_failed_report(self):
+        if not self.may_edit(): return
         if self.results_df is None or self.results_df.empty: messagebox.showerror("Error","No results"); return
         failed = self.results_df[self.results_df['Result']=='FAIL']
         if failed.empty: messagebox.showinfo("Info","✓ No failed students!"); return
@@ -26,148 +275,244 @@ class ReportsMixin:
             try: failed.to_excel(f, index=False); messagebox.showinfo("Success",f"Exported {len(failed)} failed students to:\n{f}")
             except Exception as e: messagebox.showerror("Error", str(e))
 
+    def export_merit_list(self):
+        if not self.may_edit(): return
+        if self.results_df is None or self.results_df.empty: messagebox.showerror("Error","No results"); return
+        merit = merit_list(self.results_df)
+        if merit.empty: messagebox.showinfo("Info","No ranked students"); return
+        f = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel","*.xlsx")], initialfile="merit_list.xlsx")
+        if f:
+            try: merit.to_excel(f, index=False); messagebox.showinfo("Success",f"Exported {len(merit)} merit-list entries to:\n{f}")
+            except Exception as e: messagebox.showerror("Error", str(e))
+
+    def export_result_site(self):
+        """Publish results_df as a static lookup site (resultsite.py) into <folder>/result_site."""
+        if not self.may_edit(): return
+        if self.results_df is None or self.results_df.empty: messagebox.showerror("Error","No results"); return
+        out = filedialog.askdirectory(title="Select output folder")
+        if not out: return
+        try:
+            sdir = os.path.join(out, "result_site"); os.makedirs(sdir, exist_ok=True)
+            self.root.config(cursor="wait"); self.root.update()
+            with stage('report_generation', rows=len(self.results_df)) as st:
+                st['report'] = 'result_site'
+                build, students, shards = build_site(self.results_df, sdir)
+            self.root.config(cursor="")
+            messagebox.showinfo("Success", f"✓ {students:,} results published in {shards} shards (build {build})\n"
+                                           f"Upload the folder to any static web server.\nLocation: {sdir}")
+            self._open_folder(sdir)
+        except Exception as e:
+            self.root.config(cursor=""); messagebox.showerror("Error", str(e))
+
     def generate_summary_report(self):
         messagebox.showinfo("Info","Summary PDF – coming soon!")
 
     def export_fixed_history(self):
+        if not self.may_edit(): return
         try:
-            from openpyxl import Workbook
-            from openpyxl.styles import Font, PatternFill, Alignment
-            con = sqlite3.connect(SQLITE_DB_FILE); cur = con.cursor()
-            cur.execute("SELECT fix_id,student_id,student_name,subject,field_name,"
-                        "old_value,new_value,error_message,fixed_by,fixed_at FROM fixed_errors ORDER BY fixed_at DESC")
-            fixes = cur.fetchall(); con.close()
-            if not fixes: messagebox.showinfo("Info","No fixes to export"); return
+            if getattr(self,'events',None): self.events.flush()
+            filters = getattr(self,'history_filters',None) or {}
+            if not fetch_page(self.tenant, filters, limit=1)[0]: messagebox.showinfo("Info","No fixes to export"); return
             f = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel","*.xlsx")], initialfile="fixed_errors_history.xlsx")
             if not f: return
-            wb = Workbook(); ws = wb.active; ws.title = "Fixed Errors"
-            hdrs = ['Fix ID','Student ID','Student Name','Subject','Field','Old Value','New Value','Error','Fixed By','Fixed At']
-            ws.append(hdrs)
-            fill = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
-            for cell in ws[1]:
-                cell.fill = fill; cell.font = Font(bold=True, color='FFFFFF')
-                cell.alignment = Alignment(horizontal='center')
-            for fix in fixes: ws.append(fix)
-            for col in ws.columns:
-                col = list(col)
-                ws.column_dimensions[col[0].column_letter].width = min(max(len(str(c.value or '')) for c in col)+2, 50)
-            wb.save(f); messagebox.showinfo("Success",f"✓ Exported {len(fixes)} records to:\n{f}")
+            n = _write_history(f, self.tenant, filters); messagebox.showinfo("Success",f"✓ Exported {n:,} records to:\n{f}")
         except Exception as e: messagebox.showerror("Error", str(e))
 
+    def marksheet_columns(self):
+        """(student id, name, roll) columns of results_df, any of which may be None."""
+        cols = self.results_df.columns
+        return (next((c for c in cols if 'student' in c.lower() and 'id' in c.lower()), None),
+                next((c for c in cols if 'student' in c.lower() and 'name' in c.lower()), None),
+                next((c for c in cols if 'roll' in c.lower()), None))
+
+    def marksheet_values(self, row, sid_col=None, sname_c=None, roll_c=None, subjects=None):
+        """Display strings of one student's marksheet (a results_df row); `subjects` = the student's valid_df
+        rows when the caller already has them grouped."""
+        marks = []
+        if subjects is not None or (sid_col and self.valid_df is not None):
+            sr = subjects if subjects is not None else self.valid_df[self.valid_df[sid_col]==row[sid_col]]
+            sc, mc, xc = _subject_columns(sr.columns)
+            vals  = [sr[c].tolist() if c else [d]*len(sr) for c, d in ((sc,'–'), (mc,'–'), (xc,'100'))]
+            marks = [tuple(map(str, t)) for t in zip(*vals)]
+        return {'name': str(row[sname_c]) if sname_c else "Unknown", 'sid': str(row[sid_col]) if sid_col else "unknown",
+                'roll': str(row[roll_c]) if roll_c else "N/A", 'subjects': marks,
+                'total': f"{row.get('Total',0):.0f}", 'percentage': str(row.get('Percentage','0%')),
+                'grade': str(row.get('Grade','F')), 'result': str(row.get('Result','FAIL')), 'result_label': 'Result:'}
+
+    def write_marksheet_pdf(self, path, row, sid_col=None, sname_c=None, roll_c=None, subjects=None, renderer=None):
+        """Render one student's marksheet to `path`. The 'template' renderer stamps the values onto a cached
+        page layout; 'platypus' lays out the whole page (also used for multi-line values, which would resize rows)."""
+        v = self.marksheet_values(row, sid_col, sname_c, roll_c, subjects)
+        if (renderer or MARKSHEET_RENDERER) == 'template' and not any('\n' in t for t in _marksheet_fields(v).values()):
+            return _stamp_marksheet(path, _marksheet_template(len(v['subjects'])), v)
+        from reportlab.lib.pagesizes import A4
+        from reportlab.platypus import SimpleDocTemplate
+        SimpleDocTemplate(path, pagesize=A4).build(_marksheet_story(v))
+
     def generate_individual_marksheets(self):
+        if not self.may_edit(): return
         if self.results_df is None or self.results_df.empty: messagebox.showerror("Error","No results"); return
         out_dir = filedialog.askdirectory(title="Select output folder")
         if not out_dir: return
         try:
-            from reportlab.lib.pagesizes import A4
-            from reportlab.lib import colors as rc
-            from reportlab.lib.units import inch
-            from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.lib.enums import TA_CENTER
-
             mdir = os.path.join(out_dir, "marksheets"); os.makedirs(mdir, exist_ok=True)
             self.root.config(cursor="wait"); self.root.update()
-            styles = getSampleStyleSheet()
-            t_sty  = ParagraphStyle('T', parent=styles['Heading1'], fontSize=24,
-                                    textColor=rc.HexColor('#2C3E50'), spaceAfter=30,
-                                    alignment=TA_CENTER, fontName='Helvetica-Bold')
-            h_sty  = ParagraphStyle('H', parent=styles['Heading2'], fontSize=16,
-                                    textColor=rc.HexColor('#34495E'), spaceAfter=12,
-                                    spaceBefore=12, fontName='Helvetica-Bold')
-
-            sid_col = next((c for c in self.results_df.columns if 'student' in c.lower() and 'id' in c.lower()), None)
-            sname_c = next((c for c in self.results_df.columns if 'student' in c.lower() and 'name' in c.lower()), None)
-            roll_c  = next((c for c in self.results_df.columns if 'roll' in c.lower()), None)
+            sid_col, sname_c, roll_c = self.marksheet_columns()
 
             if not messagebox.askyesno("Confirm", f"Generate {len(self.results_df)} marksheets?\nOutput: {mdir}"): 
                 self.root.config(cursor=""); return
 
-            generated = 0
-            for _, row in self.results_df.iterrows():
-                try:
-                    sid   = str(row[sid_col])   if sid_col else "unknown"
-                    sname = str(row[sname_c])   if sname_c else "Unknown"
-                    roll  = str(row[roll_c])    if roll_c  else "N/A"
-                    safe  = "".join(c for c in sid if c.isalnum() or c in '-_')
-                    doc   = SimpleDocTemplate(os.path.join(mdir,f"marksheet_{safe}.pdf"), pagesize=A4)
-                    els   = [Paragraph("STUDENT MARKSHEET", t_sty), Spacer(1,.3*inch)]
-
-                    info_tbl = Table([['Student Name:',sname],['Student ID:',sid],
-                                      ['Roll Number:',roll],['Academic Year:','2025-2026']],
-                                     colWidths=[2*inch,4*inch])
-                    info_tbl.setStyle(TableStyle([
-                        ('FONTNAME',(0,0),(0,-1),'Helvetica-Bold'),('FONTNAME',(1,0),(1,-1),'Helvetica'),
-                        ('FONTSIZE',(0,0),(-1,-1),11),('BACKGROUND',(0,0),(-1,-1),rc.HexColor('#ECF0F1')),
-                        ('GRID',(0,0),(-1,-1),1,rc.HexColor('#BDC3C7')),
-                        ('TOPPADDING',(0,0),(-1,-1),8),('BOTTOMPADDING',(0,0),(-1,-1),8)]))
-                    els += [info_tbl, Spacer(1,.4*inch), Paragraph("MARKS OBTAINED",h_sty)]
-
-                    marks_data = [['Subject','Obtained','Max']]
-                    if sid_col and self.valid_df is not None:
-                        sr = self.valid_df[self.valid_df[sid_col]==row[sid_col]]
-                        sc = next((c for c in sr.columns if 'subject' in c.lower()),None)
-                        mc = next((c for c in sr.columns if 'marks' in c.lower() and 'obtain' in c.lower()),None)
-                        xc = next((c for c in sr.columns if 'marks' in c.lower() and 'max' in c.lower()),None)
-                        for _,s in sr.iterrows():
-                            marks_data.append([str(s[sc]) if sc else'–', str(s[mc]) if mc else'–', str(s[xc]) if xc else'100'])
-
-                    m_tbl = Table(marks_data, colWidths=[3*inch,2*inch,2*inch])
-                    m_tbl.setStyle(TableStyle([
-                        ('FONTNAME',(0,0),(-1,0),'Helvetica-Bold'),('FONTSIZE',(0,0),(-1,0),11),
-                        ('BACKGROUND',(0,0),(-1,0),rc.HexColor('#3498DB')),('TEXTCOLOR',(0,0),(-1,0),rc.whitesmoke),
-                        ('ALIGN',(0,0),(-1,-1),'CENTER'),('FONTNAME',(0,1),(-1,-1),'Helvetica'),
-                        ('ROWBACKGROUNDS',(0,1),(-1,-1),[rc.white,rc.HexColor('#F8F9FA')]),
-                        ('GRID',(0,0),(-1,-1),1,rc.HexColor('#BDC3C7')),
-                        ('TOPPADDING',(0,0),(-1,-1),8),('BOTTOMPADDING',(0,0),(-1,-1),8)]))
-                    els += [m_tbl, Spacer(1,.4*inch), Paragraph("RESULT SUMMARY",h_sty)]
-
-                    pct  = float(str(row.get('Percentage','0%')).replace('%','') or 0)
-                    res  = str(row.get('Result','FAIL'))
-                    rcol = rc.HexColor('#27AE60') if res=='PASS' else rc.HexColor('#E74C3C')
-                    s_tbl = Table([['Total Marks:',f"{row.get('Total',0):.0f}"],
-                                   ['Percentage:',str(row.get('Percentage','0%'))],
-                                   ['Grade:',str(row.get('Grade','F'))],['Result:',res]],
-                                  colWidths=[2*inch,4*inch])
-                    s_tbl.setStyle(TableStyle([
-                        ('FONTNAME',(0,0),(0,-1),'Helvetica-Bold'),('FONTNAME',(1,0),(1,-1),'Helvetica-Bold'),
-                        ('FONTSIZE',(0,0),(-1,-1),12),('ALIGN',(0,0),(-1,-1),'LEFT'),
-                        ('TEXTCOLOR',(0,3),(1,3),rcol),('BACKGROUND',(0,0),(-1,-1),rc.HexColor('#ECF0F1')),
-                        ('GRID',(0,0),(-1,-1),1,rc.HexColor('#BDC3C7')),
-                        ('TOPPADDING',(0,0),(-1,-1),10),('BOTTOMPADDING',(0,0),(-1,-1),10)]))
-                    els.append(s_tbl)
-                    doc.build(els); generated += 1
-                except Exception as e: print(f"[Reports] marksheet error: {e}"); continue
+            with stage('report_generation') as st:
+                st['report'] = 'marksheets'
+                written, kept, removed = self.render_marksheets(mdir, (sid_col, sname_c, roll_c))
+                st['rows'] = written
 
             self.root.config(cursor="")
-            messagebox.showinfo("Success", f"✓ {generated} marksheets generated!\nLocation: {mdir}")
+            messagebox.showinfo("Success", f"✓ {written} marksheets generated, {kept} unchanged, {removed} removed\nLocation: {mdir}")
             self._open_folder(mdir)
         except Exception as e:
             self.root.config(cursor=""); messagebox.showerror("Error", str(e))
 
+    def marksheet_digests(self, cols):
+        """Hex digest per results_df row of everything its marksheet shows: the identity and graded columns
+        (not the ranks, which move for many students after one fix) and the student's subject rows in display order."""
+        shown   = [c for c in (*cols, 'Total', 'Percentage', 'Grade', 'Result') if c and c in self.results_df.columns]
+        sid_col = cols[0]; h = pd.util.hash_pandas_object(self.results_df[shown], index=False).to_numpy()
+        v = self.valid_df
+        if sid_col and v is not None and sid_col in v.columns and len(v):
+            part  = v[[sid_col] + [c for c in _subject_columns(v.columns) if c]]
+            codes, keys = pd.factorize(part[sid_col])
+            rh    = pd.util.hash_pandas_object(part.assign(_pos=part.groupby(sid_col, sort=False).cumcount()), index=False).to_numpy()
+            order = np.argsort(codes, kind='stable'); order = order[codes[order] >= 0]
+            grp   = codes[order]; starts = np.flatnonzero(np.r_[True, grp[1:] != grp[:-1]])
+            per   = np.zeros(len(keys), dtype=np.uint64)
+            if len(order): per[grp[starts]] = np.bitwise_xor.reduceat(rh[order], starts)
+            idx   = keys.get_indexer(self.results_df[sid_col])
+            h     = pd.util.hash_array(h ^ np.where(idx >= 0, per[idx], np.uint64(0)))
+        return [f"{x:016x}" for x in h]
+
+    def render_marksheets(self, mdir, cols):
+        """Bring `mdir` up to date with results_df → (written, unchanged, removed). A manifest of per-student
+        input digests lets re-runs rebuild only the sheets whose inputs changed and delete those of students
+        no longer in the results. Large batches fan out to worker processes that attach results_df/valid_df
+        from shared memory instead of receiving pickled copies."""
+        sids    = self.results_df[cols[0]].tolist() if cols[0] else ["unknown"] * len(self.results_df)
+        names   = [_marksheet_name(s) for s in sids]; digests = self.marksheet_digests(cols)
+        old     = _load_manifest(mdir, MARKSHEET_VERSION)
+        todo    = [i for i, (nm, d) in enumerate(zip(names, digests))
+                   if old.get(nm) != d or not os.path.exists(os.path.join(mdir, nm))]
+        removed = 0
+        for nm in set(old) - set(names):
+            try: os.remove(os.path.join(mdir, nm)); removed += 1
+            except OSError: pass
+        n = len(todo); workers = min(MARKSHEET_PROCESSES or os.cpu_count() or 1, n); failed = set()
+        if n < MARKSHEET_PARALLEL_MIN or workers < 2:
+            batches = [self._render_rows(todo, mdir, cols)]
+        else:
+            handles = {'results_df': publish(self.results_df, 'results_df')}
+            if self.valid_df is not None: handles['valid_df'] = publish(self.valid_df, 'valid_df')
+            step = -(-n // (workers * 4))
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as ex:
+                    batches = list(ex.map(_render_marksheet_rows, *zip(*[(handles, todo[i:i+step], mdir, cols)
+                                                                          for i in range(0, n, step)])))
+            finally:
+                for h in handles: release(h)
+        for errors in batches:
+            for i, e in errors: failed.add(i); METRICS.error("Reports", "marksheet", e)
+        _save_manifest(mdir, MARKSHEET_VERSION, {nm: d for i, (nm, d) in enumerate(zip(names, digests)) if i not in failed})
+        return n - len(failed), len(names) - n, removed
+
+    def _render_rows(self, positions, mdir, cols):
+        """Marksheets for the given results_df positions → [(position, error)]; valid_df is grouped once, not scanned per student."""
+        sid_col = cols[0]; errors = []
+        subjects = self.valid_df.groupby(sid_col).indices if sid_col and self.valid_df is not None and sid_col in self.valid_df else {}
+        for i in positions:
+            row = self.results_df.iloc[i]
+            try:
+                rows = self.valid_df.iloc[subjects.get(row[sid_col], [])] if subjects else None
+                self.write_marksheet_pdf(os.path.join(mdir, _marksheet_name(row[sid_col] if sid_col else "unknown")),
+                                         row, *cols, subjects=rows)
+            except Exception as e: errors.append((i, str(e)))
+        return errors
+
     def export_all_reports(self):
+        """Bring <folder>/reports up to date on a worker thread, with one progress bar across every report."""
+        if not self.may_edit(): return
         if self.results_df is None or self.results_df.empty: messagebox.showerror("Error","No results"); return
         out = filedialog.askdirectory(title="Select output folder")
         if not out: return
-        try:
-            rdir = os.path.join(out, f"reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
-            os.makedirs(rdir, exist_ok=True)
-            self.root.config(cursor="wait"); self.root.update()
-            self.results_df.to_excel(os.path.join(rdir,"final_results.xlsx"), index=False)
-            if self.error_df is not None and not self.error_df.empty:
-                self.error_df.to_excel(os.path.join(rdir,"error_report.xlsx"), index=False)
-            pcts = [float(str(p).replace('%','')) for p in self.results_df['Percentage'] if str(p).replace('%','').replace('.','').isdigit()]
-            with open(os.path.join(rdir,"summary.txt"),'w') as f:
-                f.write(f"RESULTS SUMMARY\n{'='*40}\n")
-                f.write(f"Total: {len(self.results_df)}\n")
-                f.write(f"Passed: {len(self.results_df[self.results_df['Result']=='PASS'])}\n")
-                f.write(f"Failed: {len(self.results_df[self.results_df['Result']=='FAIL'])}\n")
-                if pcts: f.write(f"Avg: {sum(pcts)/len(pcts):.2f}%  High: {max(pcts):.2f}%  Low: {min(pcts):.2f}%\n")
-            self.root.config(cursor="")
-            messagebox.showinfo("Success", f"✓ All reports exported!\nLocation: {rdir}")
-            self._open_folder(rdir)
-        except Exception as e:
-            self.root.config(cursor=""); messagebox.showerror("Error", str(e))
+        rdir = os.path.join(out, "reports")
+        dlg  = tk.Toplevel(self.root); dlg.title("Export All Reports"); dlg.geometry("420x110"); dlg.transient(self.root)
+        msg  = tk.Label(dlg, text="Preparing reports…", font=('Segoe UI',10)); msg.pack(pady=(18,8))
+        bar  = ttk.Progressbar(dlg, length=360, maximum=1.0); bar.pack()
+        def progress(done, total, name):
+            self.root.after(0, lambda: (bar.config(value=done / total), msg.config(text=f"✓ {name}  ({done / total:.0%})")))
+        def finish(text, ok):
+            dlg.destroy()
+            if ok: self.clear_checkpoint(); messagebox.showinfo("Success", text); self._open_folder(rdir)
+            else: messagebox.showerror("Error", text)
+        def worker():
+            try:
+                os.makedirs(rdir, exist_ok=True)
+                with stage('report_generation', rows=len(self.results_df)) as st:
+                    st['report'] = 'export_all'
+                    written, kept, removed = self._write_all_reports(rdir, progress)
+                self.root.after(0, lambda: finish(f"✓ Reports up to date: {written} written, {kept} unchanged, {removed} removed\nLocation: {rdir}", True))
+            except Exception as e:
+                METRICS.error("Reports", "export_all", e); err = str(e)
+                self.root.after(0, lambda: finish(err, False))
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _write_all_reports(self, rdir, progress=None):
+        """Bring `rdir` up to date → (written, unchanged, removed), counting marksheets.
+
+        Each report is a scheduler Task over a snapshot of its input frames, taken when the export starts.
+        Reports whose input digest changed are written to a staging folder, and the big workbooks go to
+        worker processes. A final 'bundle' task depends on every report. Only when all of them succeed does
+        it move the staged files into place and write the manifest, so `rdir` always holds one consistent
+        set. Marksheets update in place under their own per-student manifest."""
+        res, val, err, pend = self.results_df, self.valid_df, self.error_df, self.pending_df
+        mode   = lambda df: 'process' if len(df) >= EXPORT_PROCESS_MIN_ROWS else 'thread'
+        rdig   = _frame_digest(res)
+        specs  = {"final_results.xlsx": (rdig, _write_excel,   (res,), mode(res), len(res)),
+                  "merit_list.xlsx":    (rdig, _write_merit,   (res,), mode(res), len(res)),
+                  "summary.txt":        (rdig, _write_summary, (res,), 'thread',  1)}
+        if err is not None and not err.empty:   specs["error_report.xlsx"]     = (_frame_digest(err),  _write_excel, (err,),  mode(err),  len(err))
+        if pend is not None and not pend.empty: specs["pending_students.xlsx"] = (_frame_digest(pend), _write_excel, (pend,), mode(pend), len(pend))
+        tenant = getattr(self, 'tenant', DEFAULT_TENANT)
+        if getattr(self, 'events', None): self.events.flush()
+        fixes, last = history_stamp(tenant)
+        if fixes: specs["fixed_errors_history.xlsx"] = (f"{fixes}:{last}", _write_history, (tenant,), 'thread', fixes)
+
+        old    = _load_manifest(rdir, REPORTS_VERSION)
+        todo   = [n for n, (d, *_) in specs.items() if old.get(n) != d or not os.path.exists(os.path.join(rdir, n))]
+        sdir   = os.path.join(rdir, ".staging"); shutil.rmtree(sdir, ignore_errors=True); os.makedirs(sdir)
+        tasks  = [Task(n, specs[n][1], (os.path.join(sdir, n), *specs[n][2]), (), specs[n][4], specs[n][3]) for n in todo]
+        snap   = ReportsMixin(); snap.results_df, snap.valid_df = res, val
+        mdir   = os.path.join(rdir, "marksheets"); os.makedirs(mdir, exist_ok=True)
+        tasks.append(Task("marksheets", snap.render_marksheets, (mdir, self.marksheet_columns()), (), len(res)))
+        files  = {n: d for n, (d, *_) in specs.items()}
+        tasks.append(Task("bundle", self._promote_reports, (rdir, sdir, todo, files, set(old)), tuple(t.name for t in tasks)))
+        t0 = time.perf_counter()
+        try: outcome = run_graph(tasks, progress)
+        finally: shutil.rmtree(sdir, ignore_errors=True)
+        failed = [f"• {n}: {o.error}" for n, o in outcome.items() if o.error and not o.error.startswith("skipped")]
+        if failed: raise RuntimeError("Reports not updated – nothing was replaced:\n" + "\n".join(failed))
+        _save_manifest(rdir, REPORTS_VERSION, files, seconds=round(time.perf_counter() - t0, 3),
+                       reports={n: {'seconds': round(o.seconds, 3), 'rows': o.result if isinstance(o.result, int) else None}
+                                for n, o in outcome.items() if n in files})
+        (written, kept, removed), (m_w, m_k, m_r) = outcome["bundle"].result, outcome["marksheets"].result
+        return written + m_w, kept + m_k, removed + m_r
+
+    def _promote_reports(self, rdir, sdir, todo, files, previous):
+        """'bundle' task: move the staged reports into `rdir` and drop reports that are no longer produced."""
+        for n in todo: os.replace(os.path.join(sdir, n), os.path.join(rdir, n))
+        removed = 0
+        for n in previous - set(files):
+            try: os.remove(os.path.join(rdir, n)); removed += 1
+            except OSError: pass
+        return len(todo), len(files) - len(todo), removed
 
     def _open_folder(self, path):
         try:
@@ -0,0 +1,152 @@
+# pylint: disable=all
+"""resultsite.py – Static result-lookup site: a results frame as sharded JSON plus one self-contained page.
+
+Each student's record goes into shard FNV-1a(lower-cased, trimmed student ID) mod N. N is a power of two
+sized so that a shard holds about RESULT_SITE_SHARD_SIZE students. The page hashes the typed ID the same
+way, so a lookup is two small static GETs: index.json, then one shard. No server code and no database are
+involved, so any static host or CDN can take the result-day spike.
+
+    site/index.html                  lookup page (inline CSS/JS, no external assets)
+    site/index.json                  {build, shards, fields, students, ...} – serve with no-cache
+    site/shards/<build>/<n>.json     {"<id>": [values in `fields` order], ...} – immutable, cache forever
+
+<build> is a digest of the published data. A rebuild writes its shards first and only then replaces
+index.json, so visitors never see a half-written site. Shards of earlier builds are then removed.
+
+    python resultsite.py results.xlsx site/             # build from an exported results sheet
+    python resultsite.py site/ --lookup S0000042        # check a record offline, the way the page finds it
+"""
+
+import argparse, hashlib, json, os, shutil, sys, time
+import numpy as np
+import pandas as pd
+from config import RESULT_SITE_SHARD_SIZE, RESULT_SITE_TITLE
+from logic import detect_columns
+
+SITE_VERSION = 1
+_FNV_OFFSET, _FNV_PRIME = np.uint32(0x811C9DC5), np.uint32(0x01000193)
+
+
+def _key(sid):
+    return str(sid).strip().lower()
+
+
+def fnv1a(keys):
+    """32-bit FNV-1a of each key's UTF-8 bytes, one byte column at a time across all keys."""
+    raw = [k.encode('utf-8') for k in keys]
+    if not raw: return np.empty(0, dtype=np.uint32)
+    b = np.array(raw, dtype=bytes); width = b.dtype.itemsize
+    grid = np.frombuffer(b.tobytes(), dtype=np.uint8).reshape(len(raw), width) if width else np.empty((len(raw), 0), np.uint8)
+    lens = np.fromiter(map(len, raw), dtype=np.int64, count=len(raw)); h = np.full(len(raw), _FNV_OFFSET, dtype=np.uint32)
+    with np.errstate(over='ignore'):
+        for j in range(width):
+            live = lens > j; h[live] = (h[live] ^ grid[live, j]) * _FNV_PRIME
+    return h
+
+
+def shard_count(students):
+    return 1 << max(0, int(np.ceil(np.log2(max(1, students) / RESULT_SITE_SHARD_SIZE))))
+
+
+def _column(s):
+    """JSON-ready values of one column: whole floats as ints, others to 2 places, NaN → null, other objects as text."""
+    if pd.api.types.is_bool_dtype(s) or pd.api.types.is_integer_dtype(s):
+        return s.astype(object).where(s.notna(), None).tolist()
+    if pd.api.types.is_float_dtype(s):
+        a = s.to_numpy(dtype='float64', na_value=np.nan).round(2); out = a.astype(object)
+        whole = np.isfinite(a) & (a == np.floor(a)); out[whole] = a[whole].astype(np.int64).astype(object)
+        out[~np.isfinite(a)] = None; return out.tolist()
+    return [v if v is None or isinstance(v, (str, int, bool)) else str(v) for v in s.astype(object).where(s.notna(), None)]
+
+
+def build_site(results_df, folder, title=RESULT_SITE_TITLE):
+    """Write the site for `results_df` into `folder` → (build id, students, shards). Rows without a student ID
+    are skipped; a repeated ID keeps its first row."""
+    sid   = detect_columns(list(results_df.columns))[0]
+    if not sid: raise ValueError("results have no student-ID column")
+    df    = results_df[results_df[sid].notna()]
+    keys  = [_key(s) for s in df[sid]]
+    first = ~pd.Series(keys).duplicated().to_numpy(); df = df[first]; keys = [k for k, f in zip(keys, first) if f]
+    fields = [str(c) for c in df.columns if c != sid]
+    build = hashlib.sha256(json.dumps([SITE_VERSION, str(sid)] + fields).encode()
+                           + pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()[:12]
+    n      = shard_count(len(df)); shard = (fnv1a(keys) % np.uint32(n)).astype(np.int64)
+    rows   = list(zip(*[_column(df[c]) for c in df.columns if c != sid])) if fields else [()] * len(df)
+    sdir   = os.path.join(folder, 'shards', build); os.makedirs(sdir, exist_ok=True)
+    order  = np.argsort(shard, kind='stable'); bounds = np.searchsorted(shard[order], np.arange(n + 1))
+    for s in range(n):
+        part = order[bounds[s]:bounds[s + 1]]
+        _write(os.path.join(sdir, f"{s}.json"), json.dumps({keys[i]: rows[i] for i in part.tolist()}, ensure_ascii=False, separators=(',', ':')))
+    _write(os.path.join(folder, 'index.html'), _PAGE.replace('{{title}}', _html(title)))
+    _write(os.path.join(folder, 'index.json'), json.dumps(
+        {'version': SITE_VERSION, 'build': build, 'shards': n, 'hash': 'fnv1a32', 'id_field': str(sid), 'fields': fields,
+         'students': len(df), 'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'title': title}, ensure_ascii=False))
+    for old in os.listdir(os.path.join(folder, 'shards')):
+        if old != build: shutil.rmtree(os.path.join(folder, 'shards', old), ignore_errors=True)
+    return build, len(df), n
+
+
+def _write(path, text):
+    with open(path + '.tmp', 'w', encoding='utf-8') as f: f.write(text)
+    os.replace(path + '.tmp', path)
+
+
+def _html(s):
+    return str(s).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+
+def lookup(folder, sid):
+    """The record the page would show for `sid` ({field: value}, None if not published), read straight off disk."""
+    with open(os.path.join(folder, 'index.json'), encoding='utf-8') as f: ix = json.load(f)
+    key = _key(sid); s = int(fnv1a([key])[0] % ix['shards'])
+    with open(os.path.join(folder, 'shards', ix['build'], f"{s}.json"), encoding='utf-8') as f: rec = json.load(f).get(key)
+    return None if rec is None else dict(zip(ix['fields'], rec), **{ix['id_field']: str(sid).strip()})
+
+
+_PAGE = """<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><meta name="viewport" content="width=device-width,initial-scale=1">
+<title>{{title}}</title>
+<style>
+body{font-family:"Segoe UI",Arial,sans-serif;background:#ECF0F1;color:#2C3E50;margin:0}
+main{max-width:560px;margin:40px auto;background:#fff;border:1px solid #BDC3C7;border-radius:6px;padding:24px}
+h1{font-size:22px;margin:0 0 16px}form{display:flex;gap:8px}
+input{flex:1;padding:8px;font-size:16px;border:1px solid #BDC3C7;border-radius:4px}
+button{padding:8px 16px;font-size:16px;background:#3498DB;color:#fff;border:0;border-radius:4px;cursor:pointer}
+table{width:100%;border-collapse:collapse;margin-top:16px}td{padding:6px 8px;border-bottom:1px solid #ECF0F1}
+td:first-child{color:#7F8C8D}.PASS{color:#27AE60;font-weight:bold}.FAIL{color:#E74C3C;font-weight:bold}
+#msg{margin-top:16px;color:#7F8C8D}
+</style></head><body><main>
+<h1>{{title}}</h1>
+<form id="f"><input id="q" placeholder="Student ID" autocomplete="off" autofocus><button>View result</button></form>
+<div id="msg"></div><table id="out"></table>
+</main><script>
+"use strict";
+let ix=null;
+function fnv1a(s){let h=0x811c9dc5;for(const b of new TextEncoder().encode(s)){h=Math.imul(h^b,0x01000193)>>>0;}return h;}
+async function getJSON(u,o){const r=await fetch(u,o);if(!r.ok)throw new Error(r.status);return r.json();}
+function row(t,k,v){const tr=t.insertRow();tr.insertCell().textContent=k;const c=tr.insertCell();
+  c.textContent=v===null?"–":String(v);if(v==="PASS"||v==="FAIL")c.className=v;}
+document.getElementById("f").onsubmit=async e=>{
+  e.preventDefault();const id=document.getElementById("q").value.trim(),msg=document.getElementById("msg"),
+  out=document.getElementById("out");out.innerHTML="";if(!id)return;msg.textContent="Looking up…";
+  try{
+    ix=ix||await getJSON("index.json",{cache:"no-cache"});const key=id.toLowerCase();
+    const shard=await getJSON("shards/"+ix.build+"/"+(fnv1a(key)%ix.shards)+".json");const rec=shard[key];
+    if(!rec){msg.textContent="No result published for "+id+".";return;}
+    msg.textContent="";row(out,ix.id_field,id);ix.fields.forEach((f,i)=>row(out,f,rec[i]));
+  }catch(err){ix=null;msg.textContent="Results are unavailable right now, please try again.";}
+};
+</script></body></html>
+"""
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Build or query a static result-lookup site")
+    ap.add_argument('source', help="results .xlsx/.csv to publish, or a built site folder with --lookup")
+    ap.add_argument('folder', nargs='?'); ap.add_argument('--title', default=RESULT_SITE_TITLE); ap.add_argument('--lookup')
+    a = ap.parse_args()
+    if a.lookup: print(json.dumps(lookup(a.source, a.lookup), indent=1, ensure_ascii=False)); sys.exit(0)
+    if not a.folder: sys.exit("An output folder is needed to build a site")
+    res = pd.read_csv(a.source) if a.source.lower().endswith('.csv') else pd.read_excel(a.source)
+    build, students, shards = build_site(res, a.folder, a.title)
+    print(f"Published {students:,} results in {shards} shards (build {build}) to {a.folder}")
@@ -0,0 +1,85 @@
+# pylint: disable=all
+"""scheduler.py – Run a graph of tasks across a thread pool and a process pool.
+
+A Task names the tasks it depends on and where it should run. 'process' tasks, such as openpyxl workbooks,
+are CPU-bound pure Python that holds the GIL, so they go to worker processes; their function and arguments
+must pickle. 'thread' tasks are I/O, or work that fans out on its own such as marksheets. A task is started
+as soon as all of its dependencies have finished, so the graph takes as long as its longest chain, not
+the sum of its tasks. When a task fails, everything downstream of it is skipped.
+"""
+
+import os, time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from config import EXPORT_THREADS, EXPORT_PROCESSES
+
+# weight: share of the overall progress bar (e.g. rows written) · mode: 'thread' | 'process'
+Task    = namedtuple('Task', 'name fn args deps weight mode', defaults=((), (), 1, 'thread'))
+Outcome = namedtuple('Outcome', 'result error seconds')
+
+
+def _timed(fn, args):
+    t = time.perf_counter(); r = fn(*args)
+    return r, time.perf_counter() - t
+
+
+def _order(tasks):
+    """Check names and dependencies → {name: Task}; unknown dependencies and cycles raise ValueError."""
+    by = {t.name: t for t in tasks}
+    if len(by) != len(tasks): raise ValueError("duplicate task names")
+    for t in tasks:
+        bad = [d for d in t.deps if d not in by]
+        if bad: raise ValueError(f"{t.name}: unknown dependencies {bad}")
+    seen, done = set(), set()
+    def visit(n):
+        if n in done: return
+        if n in seen: raise ValueError(f"dependency cycle through {n}")
+        seen.add(n)
+        for d in by[n].deps: visit(d)
+        done.add(n)
+    for n in by: visit(n)
+    return by
+
+
+def run_graph(tasks, progress=None, threads=EXPORT_THREADS, processes=EXPORT_PROCESSES):
+    """Run `tasks` → {name: Outcome}. progress(done weight, total weight, name) is called after each task
+    finishes or is skipped, from the calling thread. A failed task's error is its exception text; a skipped task's error
+    names the dependency that failed."""
+    by      = _order(tasks)
+    waiting = {n: set(t.deps) for n, t in by.items()}
+    total   = sum(t.weight for t in tasks) or 1; done_w = 0; out = {}
+    n_proc  = sum(t.mode == 'process' for t in tasks)
+    pool    = ThreadPoolExecutor(max_workers=max(1, threads or 4))
+    procs   = ProcessPoolExecutor(max_workers=min(processes or os.cpu_count() or 1, n_proc)) if n_proc else None
+    running = {}
+    try:
+        while waiting or running:
+            for n in [n for n, deps in waiting.items() if not deps]:
+                t = by[n]; del waiting[n]
+                running[(procs if t.mode == 'process' else pool).submit(_timed, t.fn, t.args)] = (n, time.perf_counter())
+            if not running: break
+            fin, _ = wait(running, return_when=FIRST_COMPLETED)
+            for f in fin:
+                n, t0 = running.pop(f)
+                try: r, secs = f.result(); out[n] = Outcome(r, None, secs)
+                except Exception as e: out[n] = Outcome(None, str(e) or type(e).__name__, time.perf_counter() - t0)
+                failed = out[n].error is not None; settled = [n]
+                for m in list(waiting):
+                    if m not in waiting or n not in waiting[m]: continue
+                    waiting[m].discard(n)
+                    if failed: settled += _skip(m, n, waiting, out)
+                for s in settled:
+                    done_w += by[s].weight
+                    if progress: progress(done_w, total, s)
+    finally:
+        pool.shutdown(wait=True)
+        if procs: procs.shutdown(wait=True)
+    return out
+
+
+def _skip(name, cause, waiting, out):
+    """Drop `name` and everything waiting on it → names skipped."""
+    if name not in waiting: return []
+    del waiting[name]; out[name] = Outcome(None, f"skipped: {cause} failed", 0.0); skipped = [name]
+    for m in [m for m in waiting if name in waiting[m]]: skipped += _skip(m, name, waiting, out)
+    return skipped
@@ -0,0 +1,157 @@
+# pylint: disable=all
+"""searchindex.py – Prebuilt in-memory search over a working frame (valid, error, pending or results rows).
+
+Each searchable column is dictionary-encoded: the sorted, distinct lower-cased values plus one int32 code
+per row. An ID prefix is a code range found by binary search over the distinct values. Name words are
+kept in a sorted word → name-code table, so a word prefix becomes a set of name codes. Subject, grade,
+result and error-type are facets. Every query then ends in a vectorised compare over the code arrays.
+When rows move (fixes, undo/redo), remap() carries the codes over and encodes only the new rows.
+
+    101            rows whose student ID, roll no or a name word starts with "101"
+    ali khan       both words must match (AND)
+    subject:math   grade:a   result:fail   error:missing      (facet values match by prefix)
+"""
+
+import re, threading, weakref
+import numpy as np
+import pandas as pd
+from config import ERROR_CODES
+from logic import detect_columns, subject_column, classify_errors
+
+FACETS = ('subject', 'grade', 'result', 'error')
+_WORD  = re.compile(r"[^\W_]+")
+_TOP   = '\U0010ffff'
+
+
+def _lower(values):
+    return np.array([str(v).strip().lower() for v in values], dtype=str) if len(values) else np.array([], dtype=str)
+
+
+class _Field:
+    """Sorted distinct values (`keys`) and one code per row (-1 = missing)."""
+    __slots__ = ('keys', 'codes')
+
+    def __init__(self, keys, codes): self.keys, self.codes = keys, codes
+
+    @classmethod
+    def build(cls, s, n=0):
+        if s is None: return cls(np.array([], dtype=str), np.full(n, -1, dtype=np.int32))
+        raw, uniq = pd.factorize(s, use_na_sentinel=True)       # hash the raw values once, lower-case only the distinct ones
+        keys, inv = np.unique(_lower(uniq), return_inverse=True)
+        return cls(keys, np.where(raw < 0, -1, inv[raw] if len(inv) else raw).astype(np.int32))
+
+    def prefix(self, prefix):
+        lo, hi = np.searchsorted(self.keys, prefix), np.searchsorted(self.keys, prefix + _TOP)
+        return (self.codes >= lo) & (self.codes < hi)
+
+    def merge(self, extra, order):
+        """Field of concat([self rows, extra rows]).iloc[order] → (field, old→new key map, extra→new key map,
+        mask of extra keys that are new).
+        Only the extra keys not seen before are slotted in, so the kept keys are never re-sorted."""
+        n   = len(self.keys); at = np.searchsorted(self.keys, extra.keys)
+        new = np.ones(len(at), dtype=bool) if not n else ~((at < n) & (self.keys[np.minimum(at, n - 1)] == extra.keys))
+        m_old = np.arange(n) + np.searchsorted(extra.keys[new], self.keys) if new.any() else np.arange(n)
+        m_new = np.empty(len(at), dtype=np.int64); m_new[~new] = m_old[at[~new]]
+        m_new[new] = at[new] + np.arange(new.sum())
+        keys = self.keys
+        if new.any():
+            keys = np.empty(n + new.sum(), dtype=np.result_type(self.keys, extra.keys))
+            keys[m_old] = self.keys; keys[m_new[new]] = extra.keys[new]
+        old_c = m_old[self.codes] if new.any() and n else self.codes
+        codes = np.concatenate([old_c, m_new[extra.codes] if len(m_new) else extra.codes])
+        codes[np.concatenate([self.codes, extra.codes]) < 0] = -1
+        return _Field(keys, codes[order].astype(np.int32)), m_old, m_new, new
+
+
+def _words(keys, codes):
+    """(sorted words, code of the name each came from) for name `keys` whose codes are `codes`."""
+    pairs = [(w, c) for k, c in zip(keys, codes) for w in _WORD.findall(k)]
+    if not pairs: return np.array([], dtype=str), np.array([], dtype=np.int64)
+    w = np.array([p[0] for p in pairs], dtype=str); c = np.array([p[1] for p in pairs], dtype=np.int64)
+    o = np.argsort(w, kind='stable'); return w[o], c[o]
+
+
+class SearchIndex:
+    """Search structures for one frame; search(query) → ascending row positions."""
+
+    def __init__(self, df, columns=None):
+        fresh = columns is None
+        if fresh:
+            cols = list(df.columns); sid, sname, roll, _ = detect_columns(cols)
+            columns = {'id': sid, 'roll': roll if roll != sid else None, 'name': sname, 'subject': subject_column(cols),
+                       'grade': 'Grade' if 'Grade' in cols else None, 'result': 'Result' if 'Result' in cols else None}
+        self.columns = columns; self.n = len(df)
+        self.fields  = {k: _Field.build(df[c] if c in df.columns else None, len(df)) for k, c in columns.items() if c}
+        name = self.fields.get('name')
+        self.words, self.word_names = _words(name.keys, np.arange(len(name.keys))) if name else (None, None)
+        self.errors = (classify_errors(df)[0].to_numpy() if 'Errors' in df.columns or 'ErrorCode' in df.columns
+                       else None if fresh else np.zeros(len(df), dtype=np.int64))
+
+    def remap(self, order, added=None):
+        """Index of concat([indexed frame, added]).iloc[order]: kept rows keep their codes, only `added` is encoded."""
+        extra = SearchIndex(added if added is not None else pd.DataFrame(), self.columns)
+        out   = SearchIndex.__new__(SearchIndex)
+        out.columns, out.n, out.fields = self.columns, len(order), {}
+        out.words, out.word_names = self.words, self.word_names
+        for k, f in self.fields.items():
+            out.fields[k], m_old, m_new, fresh = f.merge(extra.fields[k], order)
+            if k != 'name' or not fresh.any(): continue          # only names not seen before add words
+            w_new, c_new = _words(extra.fields[k].keys[fresh], m_new[fresh])
+            n_w  = len(self.words); at = np.searchsorted(self.words, w_new)
+            perm = np.insert(np.arange(n_w), at, np.arange(n_w, n_w + len(w_new)))   # concatenate widens the str dtype, insert would not
+            out.words = np.concatenate([self.words, w_new])[perm]
+            out.word_names = np.concatenate([m_old[self.word_names], c_new])[perm]
+        out.errors = None if self.errors is None else np.concatenate([self.errors, extra.errors])[order]
+        return out
+
+    def search(self, query):
+        mask = np.ones(self.n, dtype=bool)
+        for term in str(query).lower().split():
+            facet, _, value = term.partition(':')
+            if value and facet in FACETS: mask &= self._facet(facet, value)
+            else: mask &= self._free(term)
+            if not mask.any(): break
+        return np.flatnonzero(mask)
+
+    def _free(self, term):
+        hit = np.zeros(self.n, dtype=bool)
+        for k in ('id', 'roll'):
+            if k in self.fields: hit |= self.fields[k].prefix(term)
+        if self.words is not None and len(self.words):
+            lo, hi = np.searchsorted(self.words, term), np.searchsorted(self.words, term + _TOP)
+            if hi > lo: hit |= np.isin(self.fields['name'].codes, np.unique(self.word_names[lo:hi]))
+        return hit
+
+    def _facet(self, facet, value):
+        if facet == 'error':
+            if self.errors is None: return np.zeros(self.n, dtype=bool)
+            bits = 0
+            for name, (bit, label, _) in ERROR_CODES.items():
+                if name.lower().startswith(value) or label.lower().replace(' ', '').startswith(value): bits |= bit
+            return (self.errors & bits) != 0
+        f = self.fields.get(facet)
+        return f.prefix(value) if f is not None else np.zeros(self.n, dtype=bool)
+
+
+class SearchMixin:
+    """One SearchIndex per working frame, tied to the frame object it was built from."""
+
+    def reset_search(self):
+        self._search_indexes, self.search_queries = {}, {}
+
+    def search_index(self, name):
+        df = getattr(self, name); hit = self._search_indexes.get(name)
+        if hit and hit[0]() is df: return hit[1]
+        ix = SearchIndex(df); self._search_indexes[name] = (weakref.ref(df), ix)
+        return ix
+
+    def warm_search_index(self, name):
+        """Build the index off the UI thread so the first keystroke does not pay for it."""
+        df = getattr(self, name, None)
+        if df is not None and len(df): threading.Thread(target=self.search_index, args=(name,), daemon=True).start()
+
+    def remap_search_index(self, name, old, new, order, added=None):
+        """Carry the index of `old` over to `new` = concat([old, added]).iloc[order] (fixes, undo/redo)."""
+        hit = self._search_indexes.get(name)
+        if hit and new is not None and hit[0]() is old and old is not None:
+            self._search_indexes[name] = (weakref.ref(new), hit[1].remap(order, added))
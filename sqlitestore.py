@@ -0,0 +1,125 @@
+# pylint: disable=all
+"""sqlitestore.py – Typed, indexed frame storage in the local SQLite database (the no-MySQL backend).
+
+A frame becomes a table whose columns carry INTEGER / REAL / TEXT affinity from the frame's dtypes. It is
+written with executemany inside a single transaction, in SQLITE_WRITE_CHUNK-row slices so only one slice is
+ever converted to Python objects. The student-ID and subject columns are indexed once the rows are in.
+Reads stream through the cursor with fetchmany. The store's own columns carry a leading underscore
+(META_COLUMNS) so they never clash with an uploaded `id` or `ID` column.
+"""
+
+import sqlite3
+import pandas as pd
+from config import SQLITE_DB_FILE, SQLITE_WRITE_CHUNK, SQLITE_READ_CHUNK
+from logic import detect_columns, subject_column
+from metrics import METRICS
+
+META_COLUMNS = ('_rowid', '_saved_at')
+
+
+def _q(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def sqlite_type(s):
+    if pd.api.types.is_bool_dtype(s) or pd.api.types.is_integer_dtype(s): return 'INTEGER'
+    if pd.api.types.is_float_dtype(s): return 'REAL'
+    return 'TEXT'
+
+
+def _column_values(s):
+    """Python objects SQLite can bind, NA → None."""
+    if pd.api.types.is_datetime64_any_dtype(s): s = s.dt.strftime('%Y-%m-%d %H:%M:%S')
+    return s.to_numpy(dtype=object, na_value=None)
+
+
+def index_columns(columns):
+    sid = detect_columns(list(columns))[0]
+    return [c for c in dict.fromkeys((sid, subject_column(columns))) if c]
+
+
+def connect(db_file=SQLITE_DB_FILE):
+    con = sqlite3.connect(db_file)
+    con.execute("PRAGMA synchronous=NORMAL")
+    return con
+
+
+def _insert(cur, table, df):
+    cols = list(df.columns)
+    sql  = f"INSERT INTO {_q(table)}({','.join(map(_q, cols))}) VALUES({','.join('?' * len(cols))})"
+    for i in range(0, len(df), SQLITE_WRITE_CHUNK):
+        part = df.iloc[i:i+SQLITE_WRITE_CHUNK]
+        cur.executemany(sql, zip(*[_column_values(part[c]) for c in cols]))
+
+
+def write_frame(df, table, db_file=SQLITE_DB_FILE, *, con=None):
+    """Replace `table` with `df` in one transaction → rows written. Extra columns: META_COLUMNS."""
+    own = con is None; con = con or connect(db_file)
+    try:
+        with con:
+            cur = con.cursor()
+            cur.execute(f"DROP TABLE IF EXISTS {_q(table)}")
+            cols = ', '.join(f"{_q(c)} {sqlite_type(df[c])}" for c in df.columns)
+            cur.execute(f"CREATE TABLE {_q(table)} (_rowid INTEGER PRIMARY KEY, {cols}, _saved_at TEXT DEFAULT CURRENT_TIMESTAMP)")
+            _insert(cur, table, df)
+            for c in index_columns(df.columns):
+                cur.execute(f"CREATE INDEX {_q(f'ix_{table}_{c}')} ON {_q(table)}({_q(c)})")
+        METRICS.count('db_round_trips', 1, table=table, backend='sqlite')
+        return len(df)
+    finally:
+        if own: con.close()
+
+
+def append_frame(df, table, db_file=SQLITE_DB_FILE, *, con=None):
+    """Append rows to a table created by write_frame (same columns)."""
+    own = con is None; con = con or connect(db_file)
+    try:
+        with con: _insert(con.cursor(), table, df)
+        return len(df)
+    finally:
+        if own: con.close()
+
+
+def update_columns(df, table, key, columns, db_file=SQLITE_DB_FILE, *, con=None):
+    """Set `columns` of the stored rows from `df`, matched on `key`, in one executemany → rows sent."""
+    own = con is None; con = con or connect(db_file)
+    try:
+        sql = f"UPDATE {_q(table)} SET {', '.join(f'{_q(c)}=?' for c in columns)} WHERE {_q(key)}=?"
+        with con:
+            cur = con.cursor()
+            for i in range(0, len(df), SQLITE_WRITE_CHUNK):
+                part = df.iloc[i:i+SQLITE_WRITE_CHUNK]
+                cur.executemany(sql, zip(*[_column_values(part[c]) for c in [*columns, key]]))
+        return len(df)
+    finally:
+        if own: con.close()
+
+
+def table_columns(table, db_file=SQLITE_DB_FILE, *, con=None):
+    """Data columns of a stored frame (without META_COLUMNS), [] if the table does not exist."""
+    own = con is None; con = con or connect(db_file)
+    try: return [r[1] for r in con.execute(f"PRAGMA table_info({_q(table)})") if r[1] not in META_COLUMNS]
+    finally:
+        if own: con.close()
+
+
+def iter_frame(table, db_file=SQLITE_DB_FILE, where="", params=(), chunksize=SQLITE_READ_CHUNK):
+    """Yield the stored frame in `chunksize`-row pieces straight off the cursor, in insertion order."""
+    con = connect(db_file)
+    try:
+        cols = table_columns(table, con=con)
+        if not cols: return
+        cur = con.execute(f"SELECT {','.join(map(_q, cols))} FROM {_q(table)} {where} ORDER BY _rowid", params)
+        while True:
+            rows = cur.fetchmany(chunksize)
+            if not rows: break
+            yield pd.DataFrame.from_records(rows, columns=cols)
+    finally: con.close()
+
+
+def read_frame(table, db_file=SQLITE_DB_FILE, where="", params=()):
+    """Whole stored frame (None if the table does not exist)."""
+    cols = table_columns(table, db_file)
+    if not cols: return None
+    parts = list(iter_frame(table, db_file, where, params))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=cols)
@@ -0,0 +1,70 @@
+# pylint: disable=all
+"""tenancy.py – Department (tenant) scoping: table naming, per-tenant caches and per-tenant worker quotas."""
+
+import re, threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from config import DEFAULT_TENANT, TENANT_MAX_WORKERS, TENANT_CACHE_SIZE
+
+_lock   = threading.Lock()
+_slots  = {}    # tenant -> BoundedSemaphore
+_caches = {}    # tenant -> TenantCache
+
+
+def normalize_tenant(name):
+    """Lower-case identifier-safe slug; empty → DEFAULT_TENANT."""
+    slug = re.sub(r'[^a-z0-9_]+', '_', str(name or '').strip().lower()).strip('_')[:32]
+    return slug or DEFAULT_TENANT
+
+
+def tenant_table(tenant, base):
+    """Per-tenant data table name. The default tenant keeps the historical unprefixed names."""
+    t = normalize_tenant(tenant)
+    return base if t == DEFAULT_TENANT else f"{t}__{base}"
+
+
+class TenantCache:
+    """Small thread-safe LRU; one per tenant so departments never see (or evict) each other's entries."""
+
+    def __init__(self, maxsize=TENANT_CACHE_SIZE):
+        self.maxsize = maxsize; self._d = OrderedDict(); self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._d: return default
+            self._d.move_to_end(key); return self._d[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._d[key] = value; self._d.move_to_end(key)
+            while len(self._d) > self.maxsize: self._d.popitem(last=False)
+
+    def get_or_compute(self, key, fn):
+        v = self.get(key, _MISSING)
+        if v is _MISSING: v = fn(); self.put(key, v)
+        return v
+
+    def clear(self):
+        with self._lock: self._d.clear()
+
+
+_MISSING = object()
+
+
+def tenant_cache(tenant):
+    t = normalize_tenant(tenant)
+    with _lock:
+        if t not in _caches: _caches[t] = TenantCache()
+        return _caches[t]
+
+
+@contextmanager
+def tenant_slot(tenant, limit=TENANT_MAX_WORKERS):
+    """Hold one of the tenant's worker slots; a busy department queues behind itself, not behind others."""
+    t = normalize_tenant(tenant)
+    with _lock:
+        if t not in _slots: _slots[t] = threading.BoundedSemaphore(limit)
+        sem = _slots[t]
+    sem.acquire()
+    try: yield
+    finally: sem.release()
@@ -0,0 +1,80 @@
+# pylint: disable=all
+"""test_api_server.py – Offline API test: real server on a free port, temp SQLite file, no network beyond loopback.
+
+    python -m pytest -q test_api_server.py      (or: python -m unittest test_api_server)
+"""
+
+import json, os, shutil, sqlite3, tempfile, threading, time, unittest, urllib.error, urllib.request
+import api_server
+from api_server import create_server, JobManager
+
+CSV = b"""student_id,student_name,roll_no,subject,marks_obtained,max_marks
+S001,Asha,R1,Maths,78,100
+S001,Asha,R1,Physics,64,100
+S002,Bilal,R2,Maths,35,100
+S002,Bilal,R2,Physics,150,100
+S003,Chen,R3,Maths,91,100
+S003,Chen,R3,Physics,88,100
+"""
+
+
+class ApiServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(); self.db = os.path.join(self.dir, 'api.db')
+        self.srv = create_server(port=0, db_file=self.db, workers=1)
+        threading.Thread(target=self.srv.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.srv.server_address[1]}"
+
+    def tearDown(self):
+        self.srv.shutdown(); self.srv.server_close(); shutil.rmtree(self.dir, ignore_errors=True)
+
+    def get(self, path):
+        with urllib.request.urlopen(self.base + path, timeout=30) as r: return r.read()
+
+    def wait(self, job_id):
+        for _ in range(300):
+            st = json.loads(self.get(f"/jobs/{job_id}"))
+            if st['status'] in ('done', 'failed'): return st
+            time.sleep(0.1)
+        self.fail("job did not finish")
+
+    def test_job_round_trip(self):
+        req = urllib.request.Request(self.base + "/jobs?tenant=Physics%20Dept&filename=marks.csv", data=CSV, method='POST')
+        with urllib.request.urlopen(req, timeout=30) as r:
+            self.assertEqual(r.status, 202); job_id = json.load(r)['job_id']
+        st = self.wait(job_id)
+        self.assertEqual(st['status'], 'done', st['error'])
+        self.assertEqual((st['rows'], st['valid'], st['errors']), (6, 5, 1))
+        proc = self.srv.RequestHandlerClass.manager.get(job_id).proc
+        self.assertIsNone(proc.df); self.assertIsNone(proc.valid_df)          # freed once persisted
+        results = json.loads(self.get(f"/jobs/{job_id}/results?format=json"))
+        self.assertTrue(results)
+        errors = self.get(f"/jobs/{job_id}/errors?format=csv").decode()
+        self.assertIn("S002", errors)
+        self.assertTrue(self.get(f"/jobs/{job_id}/marksheets/S001.pdf").startswith(b"%PDF"))
+        con = sqlite3.connect(self.db)
+        try: tables = {r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        finally: con.close()
+        self.assertTrue(any(t.endswith('validated_records') for t in tables), tables)
+
+    def test_unknown_job(self):
+        with self.assertRaises(urllib.error.HTTPError) as e: self.get("/jobs/nope")
+        self.assertEqual(e.exception.code, 404)
+
+
+class JobRetentionTest(unittest.TestCase):
+
+    def test_unfinished_jobs_are_never_evicted(self):
+        old, api_server.API_JOB_RETENTION = api_server.API_JOB_RETENTION, 2
+        try:
+            m = JobManager(db_file=os.path.join(tempfile.gettempdir(), 'unused.db'), workers=0, queue_size=10)
+            done = m.submit('default', 'a.csv', CSV); done.status, done.finished = 'done', time.time()
+            queued = [m.submit('default', f"{i}.csv", CSV) for i in range(3)]
+            self.assertIsNone(m.get(done.id))
+            self.assertTrue(all(m.get(j.id) is j for j in queued))
+        finally: api_server.API_JOB_RETENTION = old
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+# pylint: disable=all
+"""test_bulksave.py – resumable_save against an in-process MySQL stand-in (SQLite underneath) that can drop the
+connection at a chosen statement: resume from the checkpoint, no re-sent rows, stale staging, idempotent swap."""
+
+import os, re, shutil, sqlite3, tempfile, unittest
+import pandas as pd
+import bulksave
+from bulksave import resumable_save, text_table, checkpoint
+
+
+class Drop(Exception):
+    pass
+
+
+class FakeMySQL:
+    """Just the MySQL that bulksave speaks, on a SQLite file. fail(kind, n) drops the connection at the n-th
+    'executemany' (after half the chunk, uncommitted), 'commit' (after it went through) or matching 'sql'."""
+
+    def __init__(self, path):
+        self.path = path; self.sent = 0; self.plan = {}; self.seen = {}
+
+    def fail(self, kind, n=1, pattern=None):
+        self.plan[kind] = (n, pattern); self.seen[kind] = 0
+
+    def _hit(self, kind, sql=''):
+        if kind not in self.plan: return False
+        n, pattern = self.plan[kind]
+        if pattern and not re.search(pattern, sql): return False
+        self.seen[kind] += 1
+        if self.seen[kind] == n: del self.plan[kind]; return True
+        return False
+
+    def connect(self):
+        return _Con(self)
+
+    def rows(self, table):
+        con = sqlite3.connect(self.path)
+        try: return con.execute(f"SELECT * FROM `{table}` ORDER BY id").fetchall()
+        finally: con.close()
+
+    def tables(self):
+        con = sqlite3.connect(self.path)
+        try: return {r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        finally: con.close()
+
+
+class _Con:
+    def __init__(self, db):
+        self.db = db; self.c = sqlite3.connect(db.path); self.open = True
+
+    def cursor(self):
+        return _Cur(self)
+
+    def commit(self):
+        self.c.commit()
+        if self.db._hit('commit'): self.close(); raise Drop("lost connection after commit")
+
+    def close(self):
+        if self.open: self.c.rollback(); self.c.close(); self.open = False
+
+    def is_connected(self):
+        return self.open
+
+
+class _Cur:
+    def __init__(self, con):
+        self.con = con; self.cur = con.c.cursor()
+
+    def _sql(self, q):
+        q = q.replace('%s', '?').replace('INT AUTO_INCREMENT PRIMARY KEY', 'INTEGER PRIMARY KEY')
+        m = re.match(r"CREATE TABLE IF NOT EXISTS `(\w+)` LIKE `(\w+)`", q)
+        if m:
+            src = self.con.c.execute("SELECT sql FROM sqlite_master WHERE name=?", (m[2],)).fetchone()[0]
+            return [re.sub(r'^CREATE TABLE [`"]?\w+[`"]?', f"CREATE TABLE IF NOT EXISTS `{m[1]}`", src)]
+        m = re.match(r"RENAME TABLE `(\w+)` TO `(\w+)`, `(\w+)` TO `(\w+)`", q)
+        if m: return [f"ALTER TABLE `{m[1]}` RENAME TO `{m[2]}`", f"ALTER TABLE `{m[3]}` RENAME TO `{m[4]}`"]
+        return [q.replace("information_schema.tables WHERE table_schema=DATABASE() AND table_name=?",
+                          "sqlite_master WHERE type='table' AND name=?")]
+
+    def execute(self, q, params=()):
+        if not self.con.open: raise Drop("not connected")
+        if self.con.db._hit('sql', q): self.con.close(); raise Drop("lost connection")
+        for s in self._sql(q): self.cur.execute(s, params)
+
+    def executemany(self, q, rows):
+        if not self.con.open: raise Drop("not connected")
+        rows = list(rows)
+        if self.con.db._hit('executemany'):
+            self.cur.executemany(self._sql(q)[0], rows[:len(rows) // 2]); self.con.db.sent += len(rows) // 2
+            self.con.close(); raise Drop("lost connection mid-chunk")
+        self.cur.executemany(self._sql(q)[0], rows); self.con.db.sent += len(rows)
+
+    def fetchone(self):
+        return self.cur.fetchone()
+
+
+class ResumableSaveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(); self.local = os.path.join(self.dir, 'local.db')
+        self.db = FakeMySQL(os.path.join(self.dir, 'mysql.db'))
+        self.backoff, bulksave.MYSQL_SAVE_BACKOFF = bulksave.MYSQL_SAVE_BACKOFF, 0
+        self.df = pd.DataFrame({'student_id': [f"S{i:03d}" for i in range(95)], 'marks': [float(i % 100) for i in range(95)]})
+
+    def tearDown(self):
+        bulksave.MYSQL_SAVE_BACKOFF = self.backoff; shutil.rmtree(self.dir, ignore_errors=True)
+
+    def save(self, df=None, retries=3):
+        df = self.df if df is None else df
+        return resumable_save(self.db.connect, 'results', df, *text_table(df), retry_on=(Drop,),
+                              db_file=self.local, chunk=10, retries=retries)
+
+    def assertStored(self, df=None):
+        df = self.df if df is None else df
+        got = [(r[0], r[1], r[2]) for r in self.db.rows('results')]
+        self.assertEqual(got, [(i + 1, s, str(m)) for i, (s, m) in enumerate(zip(df['student_id'], df['marks']))])
+        self.assertIsNone(checkpoint('results', self.local))
+        self.assertEqual({t for t in self.db.tables() if '__' in t}, set())
+
+    def test_clean_save(self):
+        con, written, resumed = self.save()
+        self.assertEqual((written, resumed, self.db.sent), (95, 0, 95))
+        self.assertStored(); con.close()
+
+    def test_rerun_resumes_from_checkpoint_without_resending(self):
+        self.db.fail('executemany', 4)                       # chunks 1-3 committed, chunk 4 half-sent then lost
+        with self.assertRaises(Drop): self.save(retries=0)
+        job, staging, total, done = checkpoint('results', self.local)
+        self.assertEqual((total, done), (95, 30))
+        self.assertEqual(len(self.db.rows(staging)), 30)     # the half chunk was rolled back
+        self.db.sent = 0
+        con, written, resumed = self.save()
+        self.assertEqual((written, resumed, self.db.sent), (65, 30, 65))
+        self.assertStored(); con.close()
+
+    def test_retry_within_one_call(self):
+        self.db.fail('executemany', 3)
+        con, written, resumed = self.save(retries=2)
+        self.assertEqual(self.db.sent, 95 + 5)               # only the lost half chunk is sent twice
+        self.assertStored(); con.close()
+
+    def test_commit_that_went_through_before_the_drop(self):
+        self.db.fail('commit', 4)                            # prepare commits once, then chunk 3's commit lands but the link dies
+        con, written, resumed = self.save()
+        self.assertEqual(self.db.sent, 95)                   # MAX(id) is re-read, so chunk 3 is not inserted twice
+        self.assertStored(); con.close()
+
+    def test_changed_data_drops_stale_staging(self):
+        self.db.fail('executemany', 2)
+        with self.assertRaises(Drop): self.save(retries=0)
+        stale = checkpoint('results', self.local)[1]
+        other = self.df.assign(marks=self.df['marks'] + 1)
+        con, written, resumed = self.save(other)
+        self.assertEqual((written, resumed), (95, 0))
+        self.assertNotIn(stale, self.db.tables())
+        self.assertStored(other); con.close()
+
+    def test_swap_is_idempotent(self):
+        self.save()[0].close()
+        self.db.fail('sql', 2, r"^DROP TABLE IF EXISTS `results__old_")   # rename done, cleanup lost
+        with self.assertRaises(Drop): self.save(retries=0)
+        con, written, resumed = self.save()
+        self.assertStored(); con.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+# pylint: disable=all
+"""test_catalogue.py – assess() bitmask checks against plain per-student set arithmetic, including catalogues
+wider than one 64-bit word, unknown programmes, messy subject spelling and students with no valid rows."""
+
+import random, unittest
+import numpy as np
+import pandas as pd
+from catalogue import assess, Programme, DEFAULT_PROGRAMME
+
+SUBJECTS = [f"Sub{i:02d}" for i in range(80)]           # 80 subjects → two mask words
+
+
+def _programmes(rng):
+    progs = {}
+    for name in (DEFAULT_PROGRAMME, 'PCM', 'Arts'):
+        pick = rng.sample(SUBJECTS, rng.randint(1, 12)); k = rng.randint(0, len(pick) - 1)
+        progs[name] = Programme(tuple(pick[:k]), tuple(pick[k:]), rng.randint(0, len(pick) - k))
+    progs['Survey'] = Programme((), tuple(rng.sample(SUBJECTS, len(SUBJECTS))), 0)   # numbers every subject, shuffled
+    return progs
+
+
+def _messy(s, rng):
+    return rng.choice([s, s.lower(), f" {s.upper()} "])
+
+
+class AssessTest(unittest.TestCase):
+
+    def test_random_against_sets(self):
+        for seed in range(30):
+            rng = random.Random(seed); progs = _programmes(rng)
+            students = {f"S{i}": rng.choice(['PCM', 'Arts', 'Unknown', None]) for i in range(rng.randint(1, 25))}
+            taken = {s: rng.sample(SUBJECTS[:30] + list(progs['PCM'].required), rng.randint(1, 10)) for s in students}
+            failed = [s for s in students if rng.random() < .2]; taken.update({s: [] for s in failed})
+            rows = [(s, _messy(sub, rng), students[s]) for s in students for sub in taken[s]]
+            valid = pd.DataFrame(rows, columns=['student_id', 'subject', 'programme'])
+            raw = pd.concat([valid, pd.DataFrame([(f" {s}", 'Sub00', students[s]) for s in failed],
+                                                 columns=valid.columns)], ignore_index=True)
+            comp, codes = assess(valid, raw, programmes=progs)
+            self.assertEqual((len(codes), comp.catalogue.words), (2, 2))
+            self.assertEqual(sorted(comp.keys.tolist()), sorted(students))
+            for i, sid in enumerate(comp.keys):
+                p = progs.get(students[sid] or DEFAULT_PROGRAMME, progs[DEFAULT_PROGRAMME])
+                has = {t.casefold() for t in taken[sid]}
+                missing = {r for r in p.required if r.casefold() not in has}
+                short = max(p.min_electives - len({e for e in p.electives if e.casefold() in has}), 0)
+                got = {comp.catalogue.names[j] for j in range(len(comp.catalogue.names))
+                       if int(comp.missing[i, j // 64]) >> (j % 64) & 1}
+                self.assertEqual((got, int(comp.short[i]), bool(comp.complete[i])),
+                                 (missing, short, not missing and not short), (seed, sid))
+
+    def test_inferred_default(self):
+        valid = pd.DataFrame({'student_id': ['A', 'A', 'B', 'B', 'C'], 'subject': ['Maths', 'Art', 'Maths', 'Music', 'Maths']})
+        comp, _ = assess(valid, programmes={})
+        self.assertEqual(comp.catalogue.specs[comp.catalogue.default].required, ('Maths',))
+        self.assertTrue(comp.complete.all())
+
+    def test_no_columns(self):
+        with self.assertRaises(ValueError): assess(pd.DataFrame({'name': ['A'], 'marks': [1]}), programmes={})
+
+
+if __name__ == "__main__":
+    unittest.main()
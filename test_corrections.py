@@ -0,0 +1,83 @@
+# pylint: disable=all
+"""test_corrections.py – The delta log must rebuild exactly the frames that snapshots would have kept:
+random runs of apply / undo / redo (single steps and whole-session) against a snapshot reference."""
+
+import random, unittest
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from corrections import CorrectionsMixin, _insert_rows
+
+
+class Host(CorrectionsMixin):
+    def __init__(self, error_df, valid_df):
+        self.error_df, self.valid_df, self.audit = error_df, valid_df, []
+        self.reset_corrections()
+
+    def log_fixed_error(self, sid, sname, subj, field, old, new, msg, correction_id=None):
+        self.audit.append((sid, field, old, new, correction_id))
+
+    def remap_search_index(self, *a, **kw):
+        pass
+
+
+def _frames(n_err=12, n_valid=6):
+    err = pd.DataFrame({'student_id': [f"E{i}" for i in range(n_err)], 'subject': ['Maths'] * n_err,
+                        'marks_obtained': [150.0 + i for i in range(n_err)], 'Errors': ['Marks exceed max'] * n_err})
+    val = pd.DataFrame({'student_id': [f"V{i}" for i in range(n_valid)], 'subject': ['Maths'] * n_valid,
+                        'marks_obtained': [50.0 + i for i in range(n_valid)]})
+    return err, val
+
+
+class CorrectionsTest(unittest.TestCase):
+
+    def assertFrames(self, host, snap):
+        assert_frame_equal(host.error_df.reset_index(drop=True), snap[0].reset_index(drop=True))
+        assert_frame_equal(host.valid_df.reset_index(drop=True), snap[1].reset_index(drop=True))
+
+    def apply(self, host, rng):
+        k = rng.randint(0, min(3, len(host.error_df)))
+        pos = sorted(rng.sample(range(len(host.error_df)), k))
+        fixed = host.error_df.iloc[pos].drop(columns=['Errors']).assign(marks_obtained=lambda d: d['marks_obtained'] - 100)
+        cells = [(r.student_id, '', r.subject, 'marks_obtained', r.marks_obtained + 100, r.marks_obtained, '')
+                 for r in fixed.itertuples()]
+        host.apply_correction(f"fix {pos}", pos, fixed.reset_index(drop=True), cells)
+
+    def test_random_runs_match_snapshots(self):
+        for seed in range(25):
+            rng = random.Random(seed); host = Host(*_frames())
+            done = [(host.error_df, host.valid_df)]; undone = []
+            for _ in range(30):
+                op = rng.choice(['apply', 'apply', 'undo', 'redo', 'undo_all', 'redo_all'])
+                if op == 'apply' and len(host.error_df):
+                    self.apply(host, rng); done.append((host.error_df.copy(), host.valid_df.copy())); undone.clear()
+                elif op == 'undo' and len(done) > 1:
+                    host.undo_correction(); undone.append(done.pop())
+                elif op == 'redo' and undone:
+                    host.redo_correction(); done.append(undone.pop())
+                elif op == 'undo_all' and len(done) > 1:
+                    host.undo_correction(everything=True); undone += done[:0:-1]; del done[1:]
+                elif op == 'redo_all' and undone:
+                    host.redo_correction(everything=True); done += undone[::-1]; undone.clear()
+                self.assertFrames(host, done[-1])
+                self.assertEqual((host.can_undo(), host.can_redo()), (len(done) > 1, bool(undone)))
+
+    def test_undo_audits_values_swapped(self):
+        host = Host(*_frames())
+        fixed = host.error_df.iloc[[2]].drop(columns=['Errors']).assign(marks_obtained=52.0).reset_index(drop=True)
+        c = host.apply_correction("fix E2", [2], fixed, [('E2', '', 'Maths', 'marks_obtained', 152.0, 52.0, '')])
+        host.undo_correction()
+        self.assertEqual(host.audit, [('E2', 'marks_obtained', 152.0, 52.0, c.id), ('E2', 'marks_obtained', 52.0, 152.0, c.id)])
+
+    def test_replaced_frame_clears_the_log(self):
+        host = Host(*_frames()); self.apply(host, random.Random(1))
+        host.error_df = host.error_df.copy()                   # revalidation / re-upload
+        self.assertFalse(host.can_undo())
+
+    def test_insert_rows_inverts_delete(self):
+        order = np.arange(10); pos = np.array([0, 4, 9])
+        self.assertEqual(_insert_rows(np.delete(order, pos), pos, order[pos]).tolist(), order.tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+# pylint: disable=all
+"""test_ranking.py – rank_keys against a brute-force pairwise count on random scores with ties, NaNs and groups,
+for both tie policies, with and without a precomputed order."""
+
+import random, unittest
+import numpy as np
+import pandas as pd
+from ranking import rank_keys, score_order, rank_results
+
+
+def _reference(keys, groups, dense):
+    """O(n²): rank = 1 + rows (competition) or distinct scores (dense) in the same group that score better."""
+    n = len(keys[0]); groups = np.zeros(n, dtype=int) if groups is None else groups
+    key = [tuple(-np.inf if np.isnan(k[i]) else k[i] for k in keys) for i in range(n)]
+    rank, tie, size = [], [], []
+    for i in range(n):
+        peers = [key[j] for j in range(n) if groups[j] == groups[i]]
+        better = [k for k in peers if k > key[i]]
+        rank.append(1 + len(set(better) if dense else better))
+        tie.append(peers.count(key[i])); size.append(len(peers))
+    return rank, tie, size
+
+
+def _keys(rng, n, width):
+    pool = [float(v) for v in rng.sample(range(100), 6)] + [np.nan]     # few distinct values → plenty of ties
+    return [np.array([rng.choice(pool) for _ in range(n)]) for _ in range(width)]
+
+
+class RankKeysTest(unittest.TestCase):
+
+    def test_random_against_reference(self):
+        for seed in range(60):
+            rng = random.Random(seed); n = rng.randint(1, 40)
+            keys = _keys(rng, n, rng.randint(1, 3))
+            groups = np.array([rng.randint(0, 3) for _ in range(n)]) if rng.random() > .4 else None
+            for dense in (False, True):
+                want = _reference(keys, groups, dense)
+                for order in (None, score_order(keys)):
+                    got = rank_keys(keys, groups, dense, order, sizes=True)
+                    self.assertEqual([g.tolist() for g in got], [list(w) for w in want], (seed, dense))
+                    self.assertEqual(rank_keys(keys, groups, dense, order).tolist(), want[0])
+
+    def test_policies_on_a_known_frame(self):
+        df = pd.DataFrame({'student_id': ['A', 'B', 'C', 'D'], 'Section': ['X', 'Y', 'X', 'X'],
+                           'Maths': [90, 70, 80, 60], 'Physics': [70, 90, 80, 40], 'Total': [160, 160, 160, 100],
+                           'Percentage': [80.0, 80.0, 80.0, 50.0]})
+        self.assertEqual(rank_results(df, 'competition')['Rank'].tolist(), [1, 1, 1, 4])
+        self.assertEqual(rank_results(df, 'dense')['Rank'].tolist(), [1, 1, 1, 2])
+        out = rank_results(df, 'subject_priority', priority=['Physics'])
+        self.assertEqual(out['Rank'].tolist(), [3, 1, 2, 4])
+        self.assertEqual(out['Section Rank'].tolist(), [2, 1, 1, 3])
+        self.assertEqual(rank_results(out, 'competition')['Rank'].tolist(), [1, 1, 1, 4])     # re-rank replaces
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+# pylint: disable=all
+"""test_reports.py – The stamped ('template') marksheet must draw exactly what the platypus layout draws.
+
+_stamp_marksheet replays operators captured from ReportLab's canvas internals, so a ReportLab upgrade can
+shift it silently; this renders one sheet both ways and compares every text-showing operator with its font,
+size, position and fill colour.
+"""
+
+import base64, os, re, shutil, tempfile, unittest, zlib
+import pandas as pd
+from reports import ReportsMixin
+
+try: import reportlab
+except ImportError: reportlab = None
+
+_TOKEN = re.compile(rb"\((?:\\.|[^\\)])*\)|/[^\s/\[\]()<>]+|\[|\]|[-+]?(?:\d+\.?\d*|\.\d+)|[A-Za-z'\"*]+", re.S)
+_ESC   = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f'}
+
+
+def _streams(raw):
+    for m in re.finditer(rb'<<(.*?)>>\s*stream\r?\n(.*?)\r?\n?endstream', raw, re.S):
+        head, s = m.groups()
+        if b'ASCII85Decode' in head: s = base64.a85decode(s.strip().removesuffix(b'~>'))
+        if b'FlateDecode' in head: s = zlib.decompress(s)
+        if b'BT' in s: yield s
+
+
+def _literal(tok):
+    return re.sub(rb'\\([0-7]{1,3}|.)', lambda m: bytes([int(m.group(1), 8)]) if m.group(1)[:1].isdigit()
+                  else _ESC.get(m.group(1), m.group(1)), tok[1:-1], flags=re.S)
+
+
+def text_ops(path):
+    """[(font, size, x, y, text, fill)] for every Tj in the PDF's content streams, in drawing order."""
+    with open(path, 'rb') as f: raw = f.read()
+    out = []
+    for s in _streams(raw):
+        args, font, size, fill, saved, line, lead = [], None, None, None, [], (0.0, 0.0), 0.0
+        for t in _TOKEN.findall(s):
+            if t[:1] in b'(/[]' or re.match(rb'[-+.\d]', t): args.append(t); continue
+            if   t == b'Tf': font, size = args[-2], float(args[-1])
+            elif t == b'Tm': line = (float(args[-2]), float(args[-1]))
+            elif t == b'Td': line = (line[0] + float(args[-2]), line[1] + float(args[-1]))
+            elif t == b'TL': lead = float(args[-1])
+            elif t == b'T*': line = (line[0], line[1] - lead)
+            elif t == b'rg': fill = tuple(round(float(a), 3) for a in args[-3:])
+            elif t == b'q':  saved.append(fill)
+            elif t == b'Q':  fill = saved.pop()
+            elif t == b'Tj': out.append((font, size, round(line[0], 2), round(line[1], 2), _literal(args[-1]), fill))
+            args = []
+    return out
+
+
+@unittest.skipIf(reportlab is None, "reportlab not installed")
+class MarksheetRendererTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.r = ReportsMixin(); self.r.results_df = None
+        self.r.valid_df = pd.DataFrame({'student_id': ['S1', 'S1', 'S1'], 'subject': ['Maths', 'Physics', 'Chemistry'],
+                                        'marks_obtained': [78, 64, 31], 'max_marks': [100, 100, 100]})
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def both(self, **row):
+        row = pd.Series(dict({'student_id': 'S1', 'student_name': 'Asha', 'roll_no': 'R1', 'Total': 173,
+                              'Percentage': '57.67%', 'Grade': 'C', 'Result': 'PASS'}, **row))
+        ops = []
+        for renderer in ('template', 'platypus'):
+            path = os.path.join(self.dir, f"{renderer}.pdf")
+            self.r.write_marksheet_pdf(path, row, 'student_id', 'student_name', 'roll_no', renderer=renderer)
+            ops.append(text_ops(path))
+        return ops
+
+    def test_same_text_at_same_places(self):
+        stamped, laid_out = self.both()
+        self.assertGreater(len(laid_out), 20)
+        self.assertEqual(stamped, laid_out)
+
+    def test_escaped_and_non_ascii_values(self):
+        stamped, laid_out = self.both(student_name='Zoë (O\'Neil) \\ Ünïcode', roll_no='R-42 (b)')
+        self.assertEqual(stamped, laid_out)
+
+    def test_fail_colour(self):
+        stamped, laid_out = self.both(Result='FAIL', Grade='F')
+        self.assertEqual(stamped, laid_out)
+        self.assertIn(b'FAIL', [op[4] for op in stamped])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+# pylint: disable=all
+"""test_scheduler.py – run_graph on random DAGs with failing tasks: dependency order, skip propagation,
+progress reaching the total weight, and the ValueErrors for bad graphs."""
+
+import os, random, threading, time, unittest
+from scheduler import Task, run_graph
+
+
+def _square(x):
+    return x * x, os.getpid()
+
+
+class Log:
+    def __init__(self):
+        self.lock = threading.Lock(); self.events = []
+
+    def task(self, name, fail):
+        def fn():
+            with self.lock: self.events.append(('start', name))
+            time.sleep(random.random() / 500)
+            with self.lock: self.events.append(('end', name))
+            if fail: raise RuntimeError(f"{name} broke")
+            return name.upper()
+        return fn
+
+
+class RunGraphTest(unittest.TestCase):
+
+    def test_random_graphs(self):
+        for seed in range(15):
+            rng = random.Random(seed); log = Log(); n = rng.randint(1, 20)
+            deps = {f"t{i}": tuple(rng.sample([f"t{j}" for j in range(i)], rng.randint(0, min(i, 3)))) for i in range(n)}
+            bad = {t for t in deps if rng.random() < .15}
+            tasks = [Task(t, log.task(t, t in bad), (), d, rng.randint(1, 5)) for t, d in deps.items()]
+            rng.shuffle(tasks)
+            calls = []; out = run_graph(tasks, lambda d, tot, name: calls.append((d, tot, name)), threads=3)
+            ok = {}
+            for t in deps: ok[t] = t not in bad and all(ok[d] for d in deps[t])     # deps come from earlier names
+            ran = {t for t in deps if all(ok[d] for d in deps[t])}
+            self.assertEqual({e[1] for e in log.events if e[0] == 'start'}, ran)
+            at = {e: i for i, e in enumerate(log.events)}
+            for t in ran:
+                for d in deps[t]: self.assertLess(at[('end', d)], at[('start', t)], (seed, t, d))
+            for t in deps:
+                if ok[t]: self.assertEqual((out[t].result, out[t].error), (t.upper(), None))
+                elif t in ran: self.assertEqual(out[t].error, f"{t} broke")
+                else:
+                    cause = out[t].error.removeprefix("skipped: ").removesuffix(" failed")
+                    self.assertIn(cause, deps[t]); self.assertFalse(ok[cause])
+            total = sum(t.weight for t in tasks)
+            self.assertEqual(sorted(c[2] for c in calls), sorted(deps))
+            self.assertEqual([c[0] for c in calls], sorted(c[0] for c in calls))
+            self.assertEqual(calls[-1][:2], (total, total))
+
+    def test_process_tasks(self):
+        out = run_graph([Task('a', _square, (3,), (), 1, 'process'), Task('b', _square, (4,), ('a',), 1, 'process'),
+                         Task('c', _square, (5,), ('a',))], processes=1)
+        self.assertEqual([out[n].result[0] for n in 'abc'], [9, 16, 25])
+        self.assertNotEqual(out['a'].result[1], os.getpid()); self.assertEqual(out['c'].result[1], os.getpid())
+
+    def test_bad_graphs(self):
+        f = lambda: None
+        for tasks in ([Task('a', f), Task('a', f)], [Task('a', f, (), ('zz',))],
+                      [Task('a', f, (), ('c',)), Task('b', f, (), ('a',)), Task('c', f, (), ('b',))]):
+            with self.assertRaises(ValueError): run_graph(tasks)
+
+
+if __name__ == "__main__":
+    unittest.main()
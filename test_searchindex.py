@@ -0,0 +1,62 @@
+# pylint: disable=all
+"""test_searchindex.py – SearchIndex.remap must answer every query exactly like an index built from scratch
+on the moved frame, and search() like a plain pandas filter."""
+
+import random, unittest
+import numpy as np
+import pandas as pd
+from searchindex import SearchIndex
+
+FIRST = ['Ali', 'Asha', 'Bilal', 'Chen', 'Dara', 'Émile', 'Zoë']
+LAST  = ['Khan', 'Rao', 'Li', 'Okafor', 'Smith']
+QUERIES = ['s1', 's10', 'r2', 'ali', 'a', 'kh', 'ali khan', 'émile', 'zo', 'subject:ma', 'subject:phy', 'error:missing',
+           'error:exceeds', 'error:nonnumeric', 'ali subject:math', 'nobody', '']
+
+
+def _frame(n, rng, start=0):
+    return pd.DataFrame({
+        'student_id':   [f"S{start + i}" for i in range(n)],
+        'student_name': [f"{rng.choice(FIRST)} {rng.choice(LAST)}" if rng.random() > .1 else None for _ in range(n)],
+        'roll_no':      [f"R{rng.randint(1, 40)}" for _ in range(n)],
+        'subject':      [rng.choice(['Maths', 'Physics', 'Chemistry']) for _ in range(n)],
+        'marks_obtained': [rng.randint(0, 100) for _ in range(n)],
+        'Errors':       [rng.choice(['Marks exceed max; ', 'Missing student name; ', 'Non-numeric marks; ']) for _ in range(n)]})
+
+
+class SearchIndexTest(unittest.TestCase):
+
+    def assertSameAnswers(self, ix, df):
+        fresh = SearchIndex(df)
+        for q in QUERIES:
+            self.assertEqual(ix.search(q).tolist(), fresh.search(q).tolist(), q)
+
+    def test_remap_matches_fresh_index(self):
+        for seed in range(20):
+            rng = random.Random(seed); old = _frame(rng.randint(0, 60), rng)
+            added = _frame(rng.randint(0, 8), rng, start=1000) if rng.random() > .3 else None
+            total = len(old) + (0 if added is None else len(added))
+            order = np.array(sorted(rng.sample(range(total), rng.randint(0, total))), dtype=np.int64)
+            if rng.random() > .5: rng.shuffle(order := order.copy())
+            new = pd.concat([old, added] if added is not None else [old], ignore_index=True).iloc[order].reset_index(drop=True)
+            self.assertSameAnswers(SearchIndex(old).remap(order, added), new)
+
+    def test_chained_remaps(self):
+        rng = random.Random(7); df = _frame(40, rng); ix = SearchIndex(df)
+        for step in range(10):
+            added = _frame(3, rng, start=100 * (step + 1))
+            keep  = np.array(sorted(rng.sample(range(len(df)), len(df) - 2)) + list(range(len(df), len(df) + 3)))
+            df = pd.concat([df, added], ignore_index=True).iloc[keep].reset_index(drop=True); ix = ix.remap(keep, added)
+            self.assertSameAnswers(ix, df)
+
+    def test_search_matches_pandas(self):
+        df = _frame(200, random.Random(3)); ix = SearchIndex(df)
+        name = df['student_name'].fillna('').str.lower()
+        expect = (df['student_id'].str.lower().str.startswith('s1') | df['roll_no'].str.lower().str.startswith('s1')
+                  | name.str.split().apply(lambda ws: any(w.startswith('s1') for w in ws)))
+        self.assertEqual(ix.search('s1').tolist(), np.flatnonzero(expect).tolist())
+        both = name.str.split().apply(lambda ws: any(w.startswith('ali') for w in ws)) & df['subject'].str.lower().str.startswith('ph')
+        self.assertEqual(ix.search('ali subject:ph').tolist(), np.flatnonzero(both).tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
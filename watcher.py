@@ -0,0 +1,172 @@
+# pylint: disable=all
+"""watcher.py – Headless watch-folder daemon: ingest new/changed mark files and recompute only affected students.
+
+    python watcher.py <folder> [--tenant cse] [--db result_processor.db] [--poll 5] [--debounce 3] [--once]
+
+A file is read once its size/mtime have been stable for the debounce period and its content hash differs
+from the last ingested version. Row hashes against that version give the added/removed rows; only the
+students they touch are revalidated, recomputed and rewritten in the department's SQLite tables.
+"""
+
+import argparse, hashlib, os, sys, threading, time, traceback
+import numpy as np
+import pandas as pd
+from config import (SQLITE_DB_FILE, DEFAULT_TENANT, INGEST_SOURCE_COLUMN, WATCH_POLL_SECONDS, WATCH_DEBOUNCE_SECONDS,
+                    WATCH_NICE)
+from api_server import HeadlessProcessor
+from ingest import expand_paths, read_aligned
+from metrics import METRICS, stage
+from ranking import rank_results, RANK_COLUMNS
+from sqlitestore import append_frame, connect, table_columns, update_columns, write_frame
+from tenancy import normalize_tenant, tenant_table, tenant_slot
+
+SID = 'student_id'   # canonical name after ingest.align_frame
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''): h.update(block)
+    return h.hexdigest()
+
+
+def _row_hashes(df):
+    return pd.util.hash_pandas_object(df.drop(columns=[INGEST_SOURCE_COLUMN], errors='ignore'), index=False).to_numpy()
+
+
+class FolderWatcher:
+    """Keeps the aligned rows of every file in the folder plus the current valid/error/pending/results
+    frames; each batch of changed files only touches the students whose rows changed."""
+
+    def __init__(self, folder, tenant=DEFAULT_TENANT, db_file=SQLITE_DB_FILE,
+                 poll=WATCH_POLL_SECONDS, debounce=WATCH_DEBOUNCE_SECONDS):
+        self.folder = folder; self.tenant = normalize_tenant(tenant); self.db_file = db_file
+        self.poll = poll; self.debounce = debounce
+        self.files    = {}    # path -> {'sig', 'digest', 'frame', 'hashes'} of the last ingested version
+        self.settling = {}    # path -> (sig, first seen with that sig)
+        self.proc = HeadlessProcessor(None, self.tenant, db_file)
+        self._stop = threading.Event()
+
+    # ── Change detection ──────────────────────────────────────────────────
+    def scan(self):
+        """Paths whose size/mtime changed and have been stable for `debounce` seconds; deleted files too."""
+        now, ready, present = time.time(), [], set()
+        for p in expand_paths([self.folder]):
+            try: st = os.stat(p)
+            except OSError: continue
+            present.add(p); sig = (st.st_size, st.st_mtime_ns)
+            if p in self.files and self.files[p]['sig'] == sig: self.settling.pop(p, None); continue
+            prev = self.settling.get(p)
+            if not prev or prev[0] != sig: self.settling[p] = (sig, now)
+            elif now - prev[1] >= self.debounce: ready.append(p); del self.settling[p]
+        ready += [p for p in self.files if p not in present]
+        for p in [p for p in self.settling if p not in present]: del self.settling[p]
+        return ready
+
+    # ── Incremental processing ────────────────────────────────────────────
+    def ingest(self, paths):
+        affected = set()
+        for p in paths:
+            old = self.files.get(p)
+            if not os.path.exists(p):
+                if old: affected.update(old['frame'][SID].dropna()); del self.files[p]
+                print(f"[Watch] removed {os.path.basename(p)}"); continue
+            try:
+                st = os.stat(p); digest = _file_digest(p)
+                if old and old['digest'] == digest: old['sig'] = (st.st_size, st.st_mtime_ns); continue
+                parts = read_aligned(p)
+                frame = (pd.concat([df.assign(**{INGEST_SOURCE_COLUMN: lbl}) for lbl, df in parts], ignore_index=True, sort=False)
+                         if parts else pd.DataFrame(columns=[SID]))
+                if SID not in frame.columns: raise ValueError("no student ID column")
+            except Exception as e:
+                METRICS.error("Watch", os.path.basename(p), e); continue
+            hashes = _row_hashes(frame)
+            if old is None: added, removed = frame, frame.iloc[:0]
+            else:
+                added   = frame[~np.isin(hashes, old['hashes'])]
+                removed = old['frame'][~np.isin(old['hashes'], hashes)]
+            affected.update(added[SID].dropna()); affected.update(removed[SID].dropna())
+            self.files[p] = {'sig': (st.st_size, st.st_mtime_ns), 'digest': digest, 'frame': frame, 'hashes': hashes}
+            print(f"[Watch] {os.path.basename(p)}: +{len(added)} / -{len(removed)} rows")
+        if affected: self.recompute(affected)
+        return affected
+
+    def _rows_for(self, students):
+        parts = [f['frame'][f['frame'][SID].isin(students)] for f in self.files.values()]
+        parts = [p for p in parts if not p.empty]
+        return pd.concat(parts, ignore_index=True, sort=False) if parts else pd.DataFrame(columns=[SID])
+
+    def recompute(self, affected):
+        """Revalidate and regrade just `affected` students, splice them into the running frames, persist."""
+        affected = pd.Index(sorted(map(str, affected)))
+        with tenant_slot(self.tenant), stage('watch_increment', rows=len(affected)) as st:
+            part = HeadlessProcessor(self._rows_for(affected), self.tenant, self.db_file)
+            part.cohort_df = self.proc.df    # default programme is inferred from everyone, not just these students
+            if not part.df.empty:
+                part.perform_validation_fast()
+                try: part.results_df = part.compute_results()
+                except ValueError: part.results_df = pd.DataFrame()
+            p = self.proc
+            for name in ('valid_df', 'error_df', 'pending_df', 'results_df'):
+                cur, new = getattr(p, name), getattr(part, name)
+                keep = cur[~cur[SID].astype(str).isin(affected)] if cur is not None and SID in cur.columns else None
+                pieces = [x for x in (keep, new) if x is not None and not x.empty]
+                setattr(p, name, pd.concat(pieces, ignore_index=True, sort=False) if pieces else pd.DataFrame())
+            if not p.results_df.empty: p.results_df = rank_results(p.results_df)   # ranks depend on every student
+            frames = [f['frame'] for f in self.files.values()]
+            p.df = pd.concat(frames, ignore_index=True, sort=False) if frames else None
+            st['students'] = len(affected)
+            self.persist(affected)
+        print(f"[Watch] {len(affected)} student(s) recomputed • valid {len(p.valid_df):,} • errors {len(p.error_df):,}"
+              f" • results {len(p.results_df):,}")
+
+    def persist(self, affected):
+        """Replace the affected students' rows in the tenant's results / validated_records tables. Ranks depend
+        on every student, so the rank columns of everyone else's stored results are updated too."""
+        con = connect(self.db_file)
+        try:
+            for frame, base in [('results_df', 'results'), ('valid_df', 'validated_records')]:
+                df, tbl = getattr(self.proc, frame), tenant_table(self.tenant, base)
+                if df is None or df.empty or SID not in df.columns:
+                    if df is not None:
+                        with con: con.execute(f"DROP TABLE IF EXISTS `{tbl}`")   # nothing left to show
+                    continue
+                if table_columns(tbl, con=con) != [str(c) for c in df.columns]:   # first run or layout change (e.g. new subject)
+                    write_frame(df, tbl, con=con); continue
+                with con: con.executemany(f"DELETE FROM `{tbl}` WHERE {SID}=?", [(s,) for s in affected])
+                hit = df[SID].astype(str).isin(affected)
+                append_frame(df[hit], tbl, con=con)
+                ranks = [c for c in df.columns if c in RANK_COLUMNS or str(c).endswith(' Rank')]
+                if frame == 'results_df' and ranks: update_columns(df[~hit], tbl, SID, ranks, con=con)
+                METRICS.count('db_round_trips', 3 if frame == 'results_df' and ranks else 2, table=tbl)
+        finally: con.close()
+
+    # ── Loop ──────────────────────────────────────────────────────────────
+    def run(self, once=False):
+        """Poll until stop(); the idle cost is one directory scan per poll interval."""
+        print(f"[Watch] watching {os.path.abspath(self.folder)} for department '{self.tenant}'")
+        while not self._stop.is_set():
+            try:
+                ready = self.scan()
+                if ready: self.ingest(ready)
+                elif once and not self.settling: return
+            except Exception as e: METRICS.error("Watch", "loop", e); traceback.print_exc()
+            self._stop.wait(self.poll if not self.settling else min(self.poll, self.debounce))
+
+    def stop(self):
+        self._stop.set()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Watch a folder of mark files and keep results up to date")
+    ap.add_argument('folder'); ap.add_argument('--tenant', default=DEFAULT_TENANT); ap.add_argument('--db', default=SQLITE_DB_FILE)
+    ap.add_argument('--poll', type=float, default=WATCH_POLL_SECONDS); ap.add_argument('--debounce', type=float, default=WATCH_DEBOUNCE_SECONDS)
+    ap.add_argument('--once', action='store_true', help="process what is there now, then exit")
+    a = ap.parse_args()
+    if not os.path.isdir(a.folder): sys.exit(f"Not a folder: {a.folder}")
+    if hasattr(os, 'nice'):
+        try: os.nice(WATCH_NICE)
+        except OSError: pass
+    w = FolderWatcher(a.folder, a.tenant, a.db, a.poll, a.debounce)
+    try: w.run(once=a.once)
+    except KeyboardInterrupt: w.stop()